@@ -0,0 +1,117 @@
+"""Microbenchmark of the compiled case filter against the original filter_cases.
+Synthetic case lists of growing size are filtered with both implementations, the
+results are compared case by case and the run fails if they differ.
+
+Usage:
+    python -m benchmarks.case_filter_benchmark --sizes 1000 10000 100000 --repeat 5
+"""
+
+import argparse
+from datetime import date, datetime, timedelta
+import random
+import sys
+import time
+
+from itk_dev_shared_components.eflyt.eflyt_case import Case
+
+from robot_framework import case_filter
+
+# Case types seen in eFlyt. Some are required by the rules, some are skipped and the rest are neither.
+CASE_TYPES = (
+    "Logivært", "Boligselskab", "Ejer", "Lejer", "Fremlejer", "Institution",
+    "Børneflytning 1", "Børneflytning 2", "Børneflytning 3", "Barn", "Mindreårig", "Sommerhus", "Nordisk land",
+)
+
+
+def reference_filter_cases(cases: list[Case]) -> list[Case]:
+    """The original implementation of eflyt.filter_cases."""
+    case_types_to_skip = ("Børneflytning 1", "Børneflytning 2", "Børneflytning 3", "Barn", "Mindreårig", "Sommerhus", "Nordisk land")
+
+    filtered_cases = [
+        case for case in cases
+        if case.deadline and case.deadline.date() < date.today()
+        and ("Logivært" in case.case_types or "Boligselskab" in case.case_types)
+        and not any(case_type in case_types_to_skip for case_type in case.case_types)
+    ]
+
+    return filtered_cases
+
+
+def make_cases(count: int, seed: int = 0) -> list[Case]:
+    """Make synthetic cases with deadlines around today and one to four case types.
+    Some cases have no deadline.
+
+    Args:
+        count: The number of cases.
+        seed: The seed of the random generator.
+
+    Returns:
+        The cases.
+    """
+    rng = random.Random(seed)
+    today = datetime.combine(date.today(), datetime.min.time())
+    cases = []
+    for i in range(count):
+        deadline = None if rng.random() < 0.05 else today + timedelta(days=rng.randint(-60, 30))
+        case_types = rng.sample(CASE_TYPES, rng.randint(1, 4))
+        cases.append(Case(f"{i:07d}", deadline, case_types, "Svarfrist overskredet", "010101-0000", "Navn", "Robot"))
+    return cases
+
+
+def compiled_filter_cases(cases: list[Case]) -> list[Case]:
+    """Filter the cases with a filter compiled from the configured rules, like one run of the robot."""
+    return list(case_filter.compile_rules().filter(cases))
+
+
+def time_function(function, cases: list[Case], repeat: int) -> float:
+    """Time the function over the cases and return the best time in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(cases)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    """Run the benchmark.
+
+    Returns:
+        The exit code. 1 if the outputs differ for any size.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", maxsplit=1)[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000], help="The sizes of the case lists.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    mismatches = 0
+    print(f"{'Cases':>8}{'Kept':>8}{'Reference ms':>14}{'Compiled ms':>13}{'Speedup':>9}  Mismatch")
+    for size in args.sizes:
+        cases = make_cases(size)
+
+        expected = reference_filter_cases(cases)
+        actual = compiled_filter_cases(cases)
+        # The same case objects must be kept in the same order
+        mismatch = [id(case) for case in expected] != [id(case) for case in actual]
+        mismatches += mismatch
+
+        reference_time = time_function(reference_filter_cases, cases, args.repeat)
+        compiled_time = time_function(compiled_filter_cases, cases, args.repeat)
+        print(f"{size:>8}{len(expected):>8}{reference_time * 1000:>14.2f}{compiled_time * 1000:>13.2f}"
+              f"{reference_time / compiled_time:>8.2f}x  {'yes' if mismatch else 'no'}")
+
+    rules = case_filter.compile_rules()
+    for _ in rules.filter(make_cases(args.sizes[-1])):
+        pass
+    print()
+    print(f"Rejections of {args.sizes[-1]} cases by rule ({rules.accepted} accepted):")
+    for name, count in rules.rejections.items():
+        print(f"  {name}: {count}")
+
+    print()
+    print(f"Mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
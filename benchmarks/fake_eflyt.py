@@ -0,0 +1,513 @@
+"""A local stand-in for the parts of eFlyt the robot uses.
+
+The server serves synthetic versions of the login page, the search page and the
+four tabs of the case page with the element ids the robot looks for. Postbacks are
+simulated with plain form posts, letters are served as PDF files, and every
+request can be delayed to simulate a slow eFlyt.
+
+Run it on its own to click around in it:
+    python -m benchmarks.fake_eflyt --cases 20 --port 8080
+"""
+
+import argparse
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+import uuid
+
+from benchmarks.sample_letters import make_letter, random_name
+
+ANMELDER_TEMPLATE = "- Logivært svarer ikke - brev til anmelder - partshø"
+LOGIVAERT_TEMPLATES = (
+    "- Rykker - Logiværtserklæring beboer - Manuel",
+    "- Rykker - Logiværtserklæring beboer",
+    "- Rykker - Logiværtserklæring ejer - Manuel",
+    "- Rykker - Logiværtserklæring ejer",
+)
+OTHER_TEMPLATES = ("- Partshøring", "- Afgørelse - Godkendt", "- Anmodning om dokumentation")
+
+CASE_STATES = ("Alle", "Afsluttet", "Fraflytning", "I gang", "Ubehandlet")
+CASE_STATUSES = ("(vælg status)", "Afsluttet", "Afventer CPR", "Afvist", "Fejl", "Godkendt", "I gang",
+                 "Partshøring", "Sendt til CPR", "Svarfrist overskredet", "Ubehandlet")
+
+_PREFIX = "ctl00_ContentPlaceHolder2_ptFanePerson_"
+
+
+@dataclass
+class FakeCase:  # pylint: disable=too-many-instance-attributes
+    """A synthetic case and everything the robot did to it."""
+    case_number: str
+    deadline: date
+    case_types: list[str]
+    name: str
+    cpr: str
+    letter_title: str
+    logivaert_name: str
+    beboere: list[str]
+    sagslog: list[tuple[str, str]]
+    receiver_as_label: bool
+    digital_post: bool
+    letters_sent: list[str] = field(default_factory=list)
+    notes: str = ""
+    deadline_moved_to: str | None = None
+    original_letter_checked: bool = False
+
+
+@dataclass
+class _Session:
+    """The state of a logged in browser session."""
+    case: FakeCase | None = None
+    tab: int = 0
+    note_open: bool = False
+    template: str | None = None
+    letter_step: str = "templates"
+    search_done: bool = False
+
+
+def make_cases(count: int, seed: int = 0) -> list[FakeCase]:
+    """Make a list of synthetic cases. Most of them are cases the robot should handle,
+    the rest are filtered out by their case type.
+
+    Args:
+        count: The number of cases.
+        seed: The seed of the random generator.
+
+    Returns:
+        The synthetic cases.
+    """
+    rng = random.Random(seed)
+    cases = []
+    for i in range(count):
+        logivaert_name = random_name(rng)
+        kind = rng.choice(("beboer", "ejer"))
+        language = rng.choice(("DA", "DA", "DA", "EN", "TY"))
+        case_types = ["Logivært"] if rng.random() < 0.9 else ["Logivært", "Sommerhus"]
+        cases.append(FakeCase(
+            case_number=str(100000 + i),
+            deadline=date.today() - timedelta(days=rng.randint(1, 60)),
+            case_types=case_types,
+            name=random_name(rng),
+            cpr=f"{rng.randint(10000, 311299):06d}-{rng.randint(0, 9999):04d}",
+            letter_title=f"Logiværtserklæring {kind} ({language})",
+            logivaert_name=logivaert_name,
+            beboere=[logivaert_name] + [random_name(rng) for _ in range(rng.randint(0, 3))],
+            sagslog=[("Sag oprettet", ""), ("Brev sendt", "Logiværtserklæring")] + [("Notat", "") for _ in range(rng.randint(0, 20))],
+            receiver_as_label=rng.random() < 0.2,
+            digital_post=True,
+        ))
+    return cases
+
+
+class FakeEflyt:  # pylint: disable=too-many-instance-attributes
+    """The state of the fake eFlyt server shared by all request handlers."""
+
+    def __init__(self, cases: list[FakeCase], latency: float = 0, letter_body_lines: int = 40):
+        """
+        Args:
+            cases: The cases served by the server.
+            latency: Seconds to delay every request.
+            letter_body_lines: The number of body lines in the served letters.
+        """
+        self.cases = {case.case_number: case for case in cases}
+        self.latency = latency
+        self.letter_body_lines = letter_body_lines
+        self.request_count = 0
+        self._sessions: dict[str, _Session] = {}
+        self._letters: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+
+    @property
+    def url(self) -> str:
+        """The base url of the running server."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, port: int = 0) -> None:
+        """Start the server on a background thread.
+
+        Args:
+            port: The port to listen on. 0 picks a free port.
+        """
+        fake = self
+
+        class Handler(_Handler):
+            """Request handler bound to this server."""
+            server_state = fake
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop the server."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def get_letter(self, case: FakeCase) -> bytes:
+        """Get the PDF of the original letter of a case.
+
+        Args:
+            case: The case.
+
+        Returns:
+            The PDF file.
+        """
+        with self._lock:
+            if case.case_number not in self._letters:
+                self._letters[case.case_number] = make_letter(case.logivaert_name, self.letter_body_lines)
+            return self._letters[case.case_number]
+
+    def new_session(self) -> str:
+        """Create a logged in session.
+
+        Returns:
+            The id of the session.
+        """
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = _Session()
+        return session_id
+
+    def get_session(self, session_id: str | None) -> _Session | None:
+        """Get a logged in session by id.
+
+        Args:
+            session_id: The id from the session cookie.
+
+        Returns:
+            The session or None if the id isn't logged in.
+        """
+        with self._lock:
+            return self._sessions.get(session_id)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves the pages of the fake eFlyt."""
+    server_state: FakeEflyt
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handle a GET request."""
+        self._delay()
+        path = urlparse(self.path).path
+
+        # The login page and static files are served without a login like in eFlyt
+        if path == "/":
+            self._send_html(_page("Login", _LOGIN_FORM))
+            return
+        if path == "/css/eflyt.css":
+            self._send(200, "text/css", _STYLESHEET.encode())
+            return
+        if path.startswith("/img/"):
+            self._send(200, "image/gif", _ASSET.ljust(_IMAGE_SIZE, b"\0"))
+            return
+        if path.startswith("/fonts/"):
+            self._send(200, "font/woff2", _ASSET.ljust(_FONT_SIZE, b"\0"))
+            return
+
+        session = self._require_session()
+        if not session:
+            return
+
+        if path == "/web/Main.aspx":
+            self._send_html(_page("Forside", '<img id="ctl00_imgLogo" src="/img/logo.gif">'))
+        elif path == "/web/SearchResulteFlyt.aspx":
+            session.search_done = False
+            self._send_html(_search_page(self.server_state, session))
+        elif path == "/web/Case.aspx" and session.case:
+            self._send_html(_case_page(session))
+        else:
+            self._send(404, "text/plain", b"Not found")
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handle a POST request."""
+        self._delay()
+        path = urlparse(self.path).path
+        length = int(self.headers.get("Content-Length", 0))
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode(), keep_blank_values=True).items()}
+
+        if path == "/":
+            if form.get("Login1$UserName") and form.get("Login1$Password"):
+                session_id = self.server_state.new_session()
+                self._redirect("/web/Main.aspx", session_id)
+            else:
+                self._send_html(_page("Login", _LOGIN_FORM))
+            return
+
+        session = self._require_session()
+        if not session:
+            return
+
+        if path == "/web/SearchResulteFlyt.aspx":
+            case_number = form.get("ctl00$ContentPlaceHolder1$SearchControl$txtSagNr", "")
+            if case_number:
+                session.case = self.server_state.cases[case_number]
+                session.tab = 0
+                session.note_open = False
+                session.template = None
+                session.letter_step = "templates"
+                self._redirect("/web/Case.aspx")
+            else:
+                session.search_done = True
+                self._send_html(_search_page(self.server_state, session))
+        elif path == "/web/Case.aspx" and session.case:
+            if _post_case_page(session, form):
+                self._send(200, "application/pdf", self.server_state.get_letter(session.case),
+                           {"Content-Disposition": f'attachment; filename="brev_{session.case.case_number}.pdf"'})
+            else:
+                self._send_html(_case_page(session))
+        else:
+            self._send(404, "text/plain", b"Not found")
+
+    def _delay(self) -> None:
+        with self.server_state._lock:  # pylint: disable=protected-access
+            self.server_state.request_count += 1
+        if self.server_state.latency:
+            time.sleep(self.server_state.latency)
+
+    def _require_session(self) -> _Session | None:
+        cookies = dict(part.strip().split("=", 1) for part in self.headers.get("Cookie", "").split(";") if "=" in part)
+        session = self.server_state.get_session(cookies.get("session"))
+        if not session:
+            self._redirect("/")
+        return session
+
+    def _redirect(self, location: str, session_id: str | None = None) -> None:
+        self.send_response(302)
+        self.send_header("Location", location)
+        if session_id:
+            self.send_header("Set-Cookie", f"session={session_id}; Path=/")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_html(self, html: str) -> None:
+        self._send(200, "text/html; charset=utf-8", html.encode())
+
+    def _send(self, status: int, content_type: str, body: bytes, headers: dict[str, str] | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_LOGIN_FORM = """
+<form method="post" action="/">
+    <input id="Login1_UserName" name="Login1$UserName">
+    <input id="Login1_Password" name="Login1$Password" type="password">
+    <input id="Login1_LoginImageButton" name="Login1$LoginImageButton" type="submit" value="Log ind">
+</form>
+"""
+
+_POSTBACK_SCRIPT = """
+<script>
+function __doPostBack(target, argument) {
+    const form = document.forms[0];
+    form.__EVENTTARGET.value = target;
+    form.__EVENTARGUMENT.value = argument;
+    form.submit();
+}
+</script>
+"""
+
+
+# Stand-ins for the images and fonts of eFlyt, so the cost of loading them shows in the benchmarks.
+_ASSET = b"GIF89a"
+_IMAGE_SIZE = 8 * 1024
+_FONT_SIZE = 60 * 1024
+
+_STYLESHEET = """
+@font-face { font-family: "eFlyt"; src: url("/fonts/eflyt.woff2") format("woff2"); }
+body { font-family: "eFlyt", sans-serif; background: url("/img/background.gif"); }
+"""
+
+
+def _page(title: str, body: str) -> str:
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>'
+            f'<link rel="stylesheet" href="/css/eflyt.css"></head><body>{body}</body></html>')
+
+
+def _control(control_id: str, tag: str = "input", content: str = "", **attributes) -> str:
+    """Render a form control with an ASP.NET style id and name."""
+    attributes = {"id": control_id, "name": control_id.replace("_", "$"), **attributes}
+    rendered = " ".join(f'{key}="{escape(str(value))}"' for key, value in attributes.items())
+    if tag == "input":
+        return f"<input {rendered}>"
+    return f"<{tag} {rendered}>{content}</{tag}>"
+
+
+def _options(values, selected: str | None = None) -> str:
+    return "".join(f'<option{" selected" if value == selected else ""}>{escape(value)}</option>' for value in values)
+
+
+def _search_page(server: FakeEflyt, session: _Session) -> str:
+    prefix = "ctl00_ContentPlaceHolder1_SearchControl_"
+    form = "".join((
+        _control(prefix + "ddlTilstand", "select", _options(CASE_STATES)),
+        _control(prefix + "ddlStatus", "select", _options(CASE_STATUSES)),
+        _control(prefix + "txtFlytteStartDato"),
+        _control(prefix + "txtFlytteEndDato"),
+        _control(prefix + "txtSagNr"),
+        _control(prefix + "btnSearch", type="submit", value="Søg"),
+    ))
+
+    table = ""
+    if session.search_done:
+        rows = ["<tr><th>Sagsnr.</th><th>Deadline</th><th>Flyttetype</th><th>Status</th><th>CPR-nr.</th><th>Navn</th><th></th><th>Sagsbehandler</th></tr>"]
+        for case in server.cases.values():
+            rows.append(
+                f"<tr><td>{case.case_number}</td><td><a>{case.deadline.strftime('%d-%m-%Y')}</a></td>"
+                f'<td title="{escape(", ".join(case.case_types))}">{escape(", ".join(case.case_types))}</td>'
+                f"<td>Svarfrist overskredet</td><td><a>{case.cpr}</a></td><td>{escape(case.name)}</td><td></td><td>Robot</td></tr>"
+            )
+        table = f'<table id="ctl00_ContentPlaceHolder2_GridViewSearchResult">{"".join(rows)}</table>'
+
+    return _page("Søg", f'<form method="post" action="/web/SearchResulteFlyt.aspx">{form}</form>{table}')
+
+
+def _case_page(session: _Session) -> str:
+    case = session.case
+    hidden = '<input type="hidden" name="__EVENTTARGET" value=""><input type="hidden" name="__EVENTARGUMENT" value="">'
+    tab_image = f'<img id="{_PREFIX}ImgJournalMap" src="/img/fane{session.tab + 1}.gif" usemap="#faner">'
+    tab_content = (_status_tab, _beboer_tab, _sagslog_tab, _letter_tab)[session.tab](session, case)
+    body = f'{_POSTBACK_SCRIPT}<form method="post" action="/web/Case.aspx">{hidden}<h1>Sag {case.case_number}</h1>{tab_image}{tab_content}</form>'
+    return _page(f"Sag {case.case_number}", body)
+
+
+def _status_tab(session: _Session, case: FakeCase) -> str:
+    table = _control(
+        _PREFIX + "moPersonTab_gvManuelOpfolgning", "table",
+        "<tr><th>Opgave</th><th>Brev</th><th>Svar modtaget</th></tr>"
+        f"<tr><td><span>{escape(case.letter_title)}</span></td>"
+        f"<td>{_control(_PREFIX + 'moPersonTab_gvManuelOpfolgning_ctl02_imbOpgave', type='image', src='/img/pdf.gif')}</td>"
+        f"<td>{_control(_PREFIX + 'moPersonTab_gvManuelOpfolgning_ctl02_chkSvarmodtaget', type='checkbox', **({'checked': 'checked'} if case.original_letter_checked else {}))}</td></tr>"
+    )
+    deadline = (_control(_PREFIX + "ncPersonTab_txtDeadline", value=case.deadline.strftime("%d-%m-%Y"))
+                + _control(_PREFIX + "ncPersonTab_btnDeadline", type="submit", value="Gem deadline"))
+    note = _control(_PREFIX + "ncPersonTab_ButtonVisOpdater", type="submit", value="Notat")
+    if session.note_open:
+        note += (_control(_PREFIX + "ncPersonTab_txtVisOpdaterNote", "textarea", escape(case.notes))
+                 + _control(_PREFIX + "ncPersonTab_btnLongNoteUpdater", type="submit", value="Gem")
+                 + _control(_PREFIX + "ncPersonTab_btnLuk", type="submit", value="Luk"))
+    return f"{table}<div>{deadline}</div><div>{note}</div>"
+
+
+def _beboer_tab(_: _Session, case: FakeCase) -> str:
+    rows = "".join(f"<tr><td><span>01-01-2020</span></td><td>010101-0000</td><td>{escape(name)}</td><td></td></tr>" for name in case.beboere)
+    return _control(_PREFIX + "becPersonTab_GridViewBeboere", "table", f"<tr><th>Indflyttet</th><th>CPR</th><th>Navn</th><th>Relationer</th></tr>{rows}")
+
+
+def _sagslog_tab(_: _Session, case: FakeCase) -> str:
+    rows = "".join(f"<tr><td>{escape(activity)}</td><td>01-01-2024</td><td>Robot</td><td><span>{escape(handling)}</span></td></tr>"
+                   for activity, handling in case.sagslog)
+    return _control(_PREFIX + "sgcPersonTab_GridViewSagslog", "table", f"<tr><th>Aktivitet</th><th>Dato</th><th>Bruger</th><th>Handling</th></tr>{rows}")
+
+
+def _letter_tab(session: _Session, case: FakeCase) -> str:
+    prefix = _PREFIX + "bcPersonTab_"
+
+    if session.letter_step == "templates":
+        templates = OTHER_TEMPLATES + LOGIVAERT_TEMPLATES + (ANMELDER_TEMPLATE,)
+        rows = "".join(f"<tr><td>{_control(f'{prefix}GridViewBreveNew_ctl{i + 2:02d}_imgSelect', type='image', src='/img/select.gif')}</td><td>{escape(name)}</td></tr>"
+                       for i, name in enumerate(templates))
+        return _control(prefix + "GridViewBreveNew", "table", f"<tr><th></th><th>Skabelon</th></tr>{rows}")
+
+    if session.letter_step == "receiver":
+        receiver = "Anders Anmelder (anmelder)" if session.template == ANMELDER_TEMPLATE else f"{case.logivaert_name} (logivært)"
+        if case.receiver_as_label:
+            receiver_html = _control(prefix + "lblModtagerName", "span", escape(receiver))
+        else:
+            receiver_html = _control(prefix + "ddlModtager", "select", _options(("(vælg modtager)", receiver, "Anden modtager")))
+        return (f"<p>{escape(session.template)}</p>{receiver_html}"
+                + _control(prefix + "ddlSprog", "select", _options(("Dansk", "Engelsk", "Tysk")))
+                + _control(prefix + "btnSendBrev", type="submit", value="Send brev"))
+
+    if session.letter_step == "text":
+        return (_control(prefix + "txtStandardText", "textarea", "Standardtekst")
+                + _control(prefix + "btnOK", type="submit", value="Ok"))
+
+    warning = "" if case.digital_post else '<font color="red">Dokumentet skal sendes manuelt</font>'
+    return (f"{warning}<p>Vil du gemme brevet?</p>"
+            + _control(prefix + "btnSaveLetter", type="submit", value="Ja")
+            + _control(prefix + "btnDeleteLetter", type="submit", value="Nej"))
+
+
+def _post_case_page(session: _Session, form: dict[str, str]) -> bool:
+    """Apply a postback of the case page to the session.
+
+    Returns:
+        True if the post was a letter download.
+    """
+    case = session.case
+    checkbox = _PREFIX.replace("_", "$") + "moPersonTab$gvManuelOpfolgning$ctl02$chkSvarmodtaget"
+    if session.tab == 0 and checkbox in form:
+        case.original_letter_checked = True
+
+    if form.get("__EVENTTARGET", "").endswith("ImgJournalMap"):
+        session.tab = int(form["__EVENTARGUMENT"])
+        session.note_open = False
+        session.letter_step = "templates"
+        return False
+
+    # Image buttons post their position, submit buttons their value
+    buttons = {key.removesuffix(".x") for key in form if key.endswith(".x")}
+    buttons |= {key for key, value in form.items() if key.split("$")[-1].startswith("btn") or key.endswith("ButtonVisOpdater")}
+
+    for button in buttons:
+        name = button.split("$")[-1]
+        if name == "imbOpgave":
+            return True
+        if name == "ButtonVisOpdater":
+            session.note_open = True
+        elif name == "btnLongNoteUpdater":
+            case.notes = form.get(_PREFIX.replace("_", "$") + "ncPersonTab$txtVisOpdaterNote", "")
+            session.note_open = False
+        elif name == "btnDeadline":
+            case.deadline_moved_to = form.get(_PREFIX.replace("_", "$") + "ncPersonTab$txtDeadline")
+        elif name == "imgSelect":
+            index = int(button.split("$")[-2].removeprefix("ctl")) - 2
+            session.template = (OTHER_TEMPLATES + LOGIVAERT_TEMPLATES + (ANMELDER_TEMPLATE,))[index]
+            session.letter_step = "receiver"
+        elif name == "btnSendBrev":
+            session.letter_step = "text" if session.template == ANMELDER_TEMPLATE else "confirm"
+        elif name == "btnOK":
+            session.letter_step = "confirm"
+        elif name == "btnSaveLetter":
+            case.letters_sent.append(session.template)
+            session.letter_step = "templates"
+        elif name == "btnDeleteLetter":
+            session.letter_step = "templates"
+
+    return False
+
+
+def main() -> None:
+    """Run the fake eFlyt until interrupted."""
+    parser = argparse.ArgumentParser(description="Run a local stand-in for eFlyt.")
+    parser.add_argument("--cases", type=int, default=20, help="The number of synthetic cases.")
+    parser.add_argument("--port", type=int, default=8080, help="The port to listen on.")
+    parser.add_argument("--latency", type=float, default=0, help="Milliseconds to delay every request.")
+    arguments = parser.parse_args()
+
+    fake_eflyt = FakeEflyt(make_cases(arguments.cases), latency=arguments.latency / 1000)
+    fake_eflyt.start(arguments.port)
+    print(f"Fake eFlyt running on {fake_eflyt.url}. Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        fake_eflyt.stop()
+
+
+if __name__ == '__main__':
+    main()
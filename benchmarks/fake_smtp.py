@@ -0,0 +1,223 @@
+"""A local stand-in for the SMTP server the robot sends error screenshots to.
+
+The server accepts every mail and keeps it in memory together with the number of
+connections made to it. It offers STARTTLS with a self-signed certificate, since the
+robot never sends a mail over an unencrypted connection. Run on its own it sends a burst of errors through the
+robot's error mailer and reports how many mails and connections it took:
+    python -m benchmarks.fake_smtp --errors 20 --window 2
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+from io import BytesIO
+import os
+import random
+import socketserver
+import ssl
+import tempfile
+import threading
+import time
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from PIL import Image, ImageDraw
+
+from robot_framework import config, error_screenshot
+
+
+class FakeSmtp:
+    """A minimal SMTP server that stores the mails it receives."""
+
+    def __init__(self):
+        self.messages: list[EmailMessage] = []
+        self.connection_count = 0
+        self.tls_count = 0
+        self.tls_context = _make_tls_context()
+        self._server: socketserver.ThreadingTCPServer | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        """The port the server listens on."""
+        return self._server.server_address[1]
+
+    def start(self, port: int = 0) -> None:
+        """Start the server in a background thread.
+
+        Args:
+            port: The port to listen on. 0 picks a free port.
+        """
+        fake_smtp = self
+
+        class Handler(_Handler):
+            """A handler bound to this server."""
+            server_state = fake_smtp
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def add_message(self, data: bytes) -> None:
+        """Store a received mail."""
+        with self._lock:
+            self.messages.append(message_from_bytes(data, policy=policy.default))
+
+    def add_connection(self) -> None:
+        """Count a new connection."""
+        with self._lock:
+            self.connection_count += 1
+
+    def add_tls(self) -> None:
+        """Count a connection upgraded with STARTTLS."""
+        with self._lock:
+            self.tls_count += 1
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server_state: FakeSmtp
+
+    def handle(self):
+        self.server_state.add_connection()
+        self._reply("220 localhost fake SMTP")
+
+        while line := self.rfile.readline():
+            command = line.decode("ascii", errors="replace").strip().upper()
+
+            if command.startswith("EHLO"):
+                self._reply("250-localhost", "250-8BITMIME", "250-STARTTLS", "250 SIZE 10000000")
+            elif command == "STARTTLS":
+                self._reply("220 Ready to start TLS")
+                self._start_tls()
+            elif command.startswith(("HELO", "MAIL", "RCPT", "RSET", "NOOP")):
+                self._reply("250 OK")
+            elif command == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                self.server_state.add_message(self._read_data())
+                self._reply("250 OK")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+    def _start_tls(self) -> None:
+        """Upgrade the connection to TLS and read and write through it from now on."""
+        self.connection = self.server_state.tls_context.wrap_socket(self.connection, server_side=True)
+        self.rfile = self.connection.makefile("rb")
+        self.wfile = self.connection.makefile("wb", buffering=0)
+        self.server_state.add_tls()
+
+    def _read_data(self) -> bytes:
+        lines = []
+        while (line := self.rfile.readline()) not in (b".\r\n", b""):
+            lines.append(line[1:] if line.startswith(b"..") else line)
+        return b"".join(lines)
+
+    def _reply(self, *lines: str) -> None:
+        self.wfile.write("".join(f"{line}\r\n" for line in lines).encode("ascii"))
+
+
+def _make_tls_context() -> ssl.SSLContext:
+    """Make a server TLS context with a new self-signed certificate for localhost."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.utcnow()
+    certificate = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+                   .serial_number(x509.random_serial_number()).not_valid_before(now).not_valid_after(now + timedelta(days=1))
+                   .sign(key, hashes.SHA256()))
+
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    with tempfile.TemporaryDirectory() as folder:
+        cert_path, key_path = os.path.join(folder, "cert.pem"), os.path.join(folder, "key.pem")
+        with open(cert_path, "wb") as file:
+            file.write(certificate.public_bytes(serialization.Encoding.PEM))
+        with open(key_path, "wb") as file:
+            file.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+        context.load_cert_chain(cert_path, key_path)
+    return context
+
+
+def make_screenshot(width: int = 1920, height: int = 1080) -> bytes:
+    """Make a synthetic browser screenshot with some text and boxes on it.
+
+    Returns:
+        The screenshot as PNG.
+    """
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    for y in range(0, height, 24):
+        draw.text((20, y), " ".join(random.choice(("Sag", "Frist", "Beboer", "Logivært", "2024-01-01")) for _ in range(30)), fill="black")
+    for _ in range(20):
+        x, y = random.randrange(width), random.randrange(height)
+        draw.rectangle((x, y, x + 200, y + 40), outline="navy", fill="lightblue")
+
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _raise_error(kind: int) -> None:
+    """Raise one of a few different errors."""
+    if kind == 0:
+        raise ValueError("Case 12345 couldn't be read.")
+    if kind == 1:
+        raise TimeoutError("Letter download timed out.")
+    raise RuntimeError("Login failed")
+
+
+def main() -> None:
+    """Send a burst of errors through the error mailer and report the result."""
+    parser = argparse.ArgumentParser(description="Send errors through the error mailer to a local SMTP stand-in.")
+    parser.add_argument("--errors", type=int, default=20, help="The number of errors to report.")
+    parser.add_argument("--kinds", type=int, default=3, help="The number of different error signatures.")
+    parser.add_argument("--window", type=float, default=2, help="ERROR_MAIL_WINDOW in seconds.")
+    arguments = parser.parse_args()
+
+    fake_smtp = FakeSmtp()
+    fake_smtp.start()
+    config.SMTP_SERVER = "127.0.0.1"
+    config.SMTP_PORT = fake_smtp.port
+    config.ERROR_MAIL_WINDOW = arguments.window
+
+    screenshot = make_screenshot()
+    error_screenshot.take_screenshot = lambda browser=None: screenshot
+
+    blocking_time = 0.0
+    for i in range(arguments.errors):
+        try:
+            _raise_error(i % arguments.kinds)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            start = time.perf_counter()
+            error_screenshot.send_error_screenshot("robot@example.com", exc, "Fake SMTP benchmark")
+            blocking_time += time.perf_counter() - start
+
+    start = time.perf_counter()
+    error_screenshot.mailer.close()
+    close_time = time.perf_counter() - start
+    fake_smtp.stop()
+
+    attachment_sizes = [len(part.get_content()) for msg in fake_smtp.messages for part in msg.iter_attachments()]
+
+    print(f"Errors reported:       {arguments.errors}")
+    print(f"Time blocked per error: {blocking_time / arguments.errors * 1000:.2f} ms")
+    print(f"Time to flush on close: {close_time * 1000:.0f} ms")
+    print(f"Mails received:        {len(fake_smtp.messages)}")
+    print(f"SMTP connections:      {fake_smtp.connection_count} ({fake_smtp.tls_count} with STARTTLS)")
+    print(f"Screenshot PNG:        {len(screenshot) / 1024:.0f} KiB")
+    if attachment_sizes:
+        print(f"Attachment size:       {max(attachment_sizes) / 1024:.0f} KiB")
+    for msg in fake_smtp.messages:
+        print(f"  {msg['subject']}")
+
+
+if __name__ == '__main__':
+    main()
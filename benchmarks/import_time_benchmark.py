@@ -0,0 +1,166 @@
+"""Import-time benchmark of the robot's cold start.
+
+The cold start is measured in two phases in fresh interpreters with `python -X importtime`:
+- startup: robot_framework.linear_framework, everything `python -m robot_framework`
+  imports before the exception hook is set.
+- process: the same plus robot_framework.process and reset, which main() imports right
+  after, so the whole cold start until the process runs. This includes selenium.
+
+It reports the median total import time and the heaviest imports of each phase. It fails
+when a phase is over its budget, or when a dependency that should only be loaded on first
+use is imported in a phase.
+
+Usage:
+    python -m benchmarks.import_time_benchmark --runs 5 --budget-ms 600 --process-budget-ms 1000
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ENTRY_MODULE = "robot_framework.linear_framework"
+
+# The modules main() imports once the exception hook is set, before the process runs.
+PROCESS_MODULES = ("robot_framework.process", "robot_framework.reset")
+
+# The default budgets for the total import time of each phase in milliseconds.
+DEFAULT_BUDGET_MS = 600
+DEFAULT_PROCESS_BUDGET_MS = 1000
+
+# Dependencies that are only needed once the process runs, a letter is read or an error is mailed.
+DEFERRED_MODULES = ("selenium", "pypdf", "PIL", "smtplib", "itk_dev_shared_components", "itk_dev_event_log")
+
+# Dependencies that are only needed once a letter is read or an error is mailed.
+DEFERRED_PROCESS_MODULES = ("pypdf", "PIL", "smtplib")
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_imports(modules: tuple[str, ...]) -> dict[str, tuple[int, int]]:
+    """Import modules in a fresh interpreter with -X importtime.
+
+    Args:
+        modules: The modules to import, in order.
+
+    Returns:
+        A dict of every imported module to its (self, cumulative) import time in microseconds,
+        in the order they finished importing.
+
+    Raises:
+        RuntimeError: If the import failed.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "; ".join(f"import {module}" for module in modules)],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=False
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {', '.join(modules)} failed:\n{result.stderr}")
+
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative, name = line.removeprefix("import time:").split("|")
+        # Nested imports are indented by two spaces per level after the separator
+        imports[name[1:].rstrip()] = (int(self_time), int(cumulative))
+    return imports
+
+
+def get_total_ms(imports: dict[str, tuple[int, int]]) -> float:
+    """Sum the cumulative time of all top-level imports.
+
+    Args:
+        imports: The imports of a run.
+
+    Returns:
+        The total import time in milliseconds.
+    """
+    return sum(cumulative for name, (_, cumulative) in imports.items() if not name.startswith(" ")) / 1000
+
+
+def get_direct_imports(imports: dict[str, tuple[int, int]], module: str) -> list[tuple[int, str]]:
+    """Get the imports made directly by a top-level import.
+    -X importtime lists the imports of a module right before the module itself.
+
+    Args:
+        imports: The imports of a run.
+        module: The top-level module.
+
+    Returns:
+        (cumulative, name) of each direct import, heaviest first.
+    """
+    children = []
+    for name, (_, cumulative) in imports.items():
+        if not name.startswith(" "):
+            if name == module:
+                return sorted(children, reverse=True)
+            children = []
+        elif not name.startswith("    "):
+            children.append((cumulative, name.strip()))
+    return []
+
+
+def check_phase(phase: str, modules: tuple[str, ...], deferred_modules: tuple[str, ...], budget_ms: float, runs: int, top: int) -> bool:
+    """Measure a phase of the cold start and print the results.
+
+    Args:
+        phase: The name of the phase.
+        modules: The modules imported in the phase, in order.
+        deferred_modules: The dependencies that must not be imported in the phase.
+        budget_ms: The max median import time in milliseconds.
+        runs: The number of fresh interpreters to measure.
+        top: The number of heaviest imports to show.
+
+    Returns:
+        True if the phase is within its budget and imports no deferred module.
+    """
+    measured = [measure_imports(modules) for _ in range(runs)]
+    totals = [get_total_ms(imports) for imports in measured]
+    median_total = statistics.median(totals)
+    median_run = measured[totals.index(sorted(totals)[len(totals) // 2])]
+
+    print(f"Import time of the {phase} phase ({', '.join(modules)}) over {runs} runs:")
+    print(f"  Median: {median_total:.0f} ms (min {min(totals):.0f} ms, max {max(totals):.0f} ms)")
+    print(f"  Budget: {budget_ms:.0f} ms")
+    for module in modules:
+        print(f"  Heaviest imports of {module} in the median run:")
+        for cumulative, name in get_direct_imports(median_run, module)[:top]:
+            print(f"    {cumulative / 1000:>7.1f} ms  {name}")
+
+    passed = True
+    loaded = sorted({name.strip().split(".")[0] for name in median_run} & set(deferred_modules))
+    if loaded:
+        print(f"  Deferred modules imported in the {phase} phase: {', '.join(loaded)}")
+        passed = False
+
+    if median_total > budget_ms:
+        print(f"  Over budget by {median_total - budget_ms:.0f} ms.")
+        passed = False
+
+    print()
+    return passed
+
+
+def main() -> int:
+    """Run the benchmark.
+
+    Returns:
+        The exit code. 1 if a budget was exceeded or a deferred module was imported.
+    """
+    parser = argparse.ArgumentParser(description="Measure the import time of the robot's cold start.")
+    parser.add_argument("--runs", type=int, default=5, help="The number of fresh interpreters to measure.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="The max median import time of the startup phase in milliseconds.")
+    parser.add_argument("--process-budget-ms", type=float, default=DEFAULT_PROCESS_BUDGET_MS, help="The max median import time until the process runs in milliseconds.")
+    parser.add_argument("--top", type=int, default=10, help="The number of heaviest imports to show.")
+    arguments = parser.parse_args()
+
+    startup_ok = check_phase("startup", (ENTRY_MODULE,), DEFERRED_MODULES, arguments.budget_ms, arguments.runs, arguments.top)
+    process_ok = check_phase("process", (ENTRY_MODULE, *PROCESS_MODULES), DEFERRED_PROCESS_MODULES, arguments.process_budget_ms, arguments.runs, arguments.top)
+
+    return 0 if startup_ok and process_ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Microbenchmark of the logivært name extraction against the original implementation.
+Every letter is read with both implementations, the results are compared and the
+run fails if any result differs.
+
+Usage:
+    python -m benchmarks.letter_text_benchmark <folder with sample letters> [--repeat N]
+    python -m benchmarks.letter_text_benchmark --synthetic 200
+"""
+
+import argparse
+from io import BytesIO
+import os
+import sys
+import tempfile
+import time
+
+import pypdf
+
+from robot_framework import letter_text
+from benchmarks import sample_letters
+
+
+def reference_top_text(pdf_bytes: bytes) -> str:
+    """The original implementation that collects and sorts every text run."""
+    reader = pypdf.PdfReader(BytesIO(pdf_bytes))
+
+    text_parts = []
+
+    # pylint: disable-next=unused-argument
+    def visitor(text, cm, tm, fd, fs):
+        y = tm[5]
+        if text.strip():
+            text = text.replace("\xa0", " ").strip()
+            text_parts.append((y, text))
+
+    reader.pages[0].extract_text(visitor_text=visitor)
+
+    return sorted(text_parts)[0][1]
+
+
+def time_function(function, letters: list[bytes], repeat: int) -> float:
+    """Time the function over all letters and return the best total in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for pdf_bytes in letters:
+            function(pdf_bytes)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", maxsplit=1)[0])
+    parser.add_argument("folder", nargs="?", help="A folder of sample letters.")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generate this many synthetic letters instead.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    folder = args.folder
+    if args.synthetic:
+        folder = tempfile.mkdtemp(prefix="letters_")
+        sample_letters.write_corpus(folder, args.synthetic)
+    if not folder:
+        parser.error("Give a folder of letters or --synthetic N.")
+
+    letters = []
+    for file_name in sorted(os.listdir(folder)):
+        if file_name.lower().endswith(".pdf"):
+            with open(os.path.join(folder, file_name), "rb") as file:
+                letters.append(file.read())
+
+    mismatches = 0
+    for pdf_bytes in letters:
+        if reference_top_text(pdf_bytes) != letter_text.read_top_text(pdf_bytes):
+            mismatches += 1
+
+    reference_time = time_function(reference_top_text, letters, args.repeat)
+    fast_time = time_function(letter_text.read_top_text, letters, args.repeat)
+
+    print(f"Letters:    {len(letters)}")
+    print(f"Reference:  {reference_time * 1000 / len(letters):.3f} ms per letter")
+    print(f"Extractor:  {fast_time * 1000 / len(letters):.3f} ms per letter")
+    print(f"Speedup:    {reference_time / fast_time:.2f}x")
+    print(f"Mismatches: {mismatches}")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Simulation of the load controller against an eFlyt with changing latency.
+
+A number of worker threads handle cases against a simulated eFlyt. Each case opens
+the case, changes tab and sends a letter, the same controlled calls as the robot.
+The simulated eFlyt serves CAPACITY calls at the base latency and gets slower as more
+calls run at the same time. Halfway through it degrades, and then it fails every
+call for a while before it recovers.
+
+The run is done with and without the controller. The state of the controller is
+printed over time, followed by the cases, errors and call latency of each run.
+Times are scaled down so a run takes seconds.
+
+Usage:
+    python -m benchmarks.load_controller_benchmark --workers 4 --seconds 8
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+from robot_framework import config, load_controller
+
+BASE_LATENCY = 0.02  # Seconds per call when eFlyt isn't loaded.
+CAPACITY = 2  # The number of calls eFlyt serves at the same time at the base latency.
+
+# The phases of the simulated eFlyt as (share of the run, capacity, fails every call).
+PHASES = (
+    (0.3, CAPACITY, False),
+    (0.3, 1, False),
+    (0.15, CAPACITY, True),
+    (0.25, CAPACITY, False),
+)
+
+
+class SimulatedEflyt:
+    """An eFlyt whose latency grows with the number of calls running at the same time."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.start_time = time.monotonic()
+        self.in_flight = 0
+        self.latencies: list[float] = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def get_phase(self) -> tuple[int, bool]:
+        """Get the capacity of eFlyt right now and whether it fails every call."""
+        elapsed = (time.monotonic() - self.start_time) / self.seconds
+        for share, capacity, failing in PHASES:
+            if elapsed < share:
+                return capacity, failing
+            elapsed -= share
+        return PHASES[-1][1:]
+
+    def call(self, steps: int = 1) -> None:
+        """Do a call that takes a number of round trips.
+
+        Raises:
+            WebDriverException: If eFlyt is failing.
+        """
+        capacity, failing = self.get_phase()
+        with self._lock:
+            self.in_flight += 1
+            load = self.in_flight
+        try:
+            latency = BASE_LATENCY * steps * max(1.0, load / capacity)
+            time.sleep(latency if not failing else BASE_LATENCY)
+            with self._lock:
+                self.latencies.append(latency)
+                if failing:
+                    self.errors += 1
+            if failing:
+                raise WebDriverException("eFlyt is down")
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def run(eflyt: SimulatedEflyt, workers: int, use_controller: bool, timeline: list[tuple]) -> tuple[int, dict, str]:
+    """Handle cases on the simulated eFlyt until the time is up.
+
+    Args:
+        eflyt: The simulated eFlyt.
+        workers: The number of worker threads.
+        use_controller: Whether the calls go through the load controller.
+        timeline: A list the state of the controller is appended to over time.
+
+    Returns:
+        The number of cases completed, and the statistics and summary of the controller.
+    """
+    config.USE_LOAD_CONTROLLER = use_controller
+    load_controller.start(None, workers)
+
+    def open_case():
+        eflyt.call()
+
+    def change_tab():
+        eflyt.call()
+
+    def send_letter_to_logivaert():
+        load_controller.controlled(change_tab)()
+        eflyt.call(steps=4)
+
+    completed = []
+    stop = threading.Event()
+
+    def worker():
+        while not stop.is_set():
+            try:
+                with load_controller.case_slot():
+                    if stop.is_set():
+                        return
+                    load_controller.controlled(open_case)()
+                    load_controller.controlled(change_tab)()
+                    load_controller.controlled(send_letter_to_logivaert)()
+                completed.append(1)
+            except WebDriverException:
+                time.sleep(BASE_LATENCY)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    while time.monotonic() - eflyt.start_time < eflyt.seconds:
+        controller = load_controller.controller
+        timeline.append((time.monotonic() - eflyt.start_time, int(controller.limit), controller.in_flight, controller.state, eflyt.get_phase()))
+        time.sleep(eflyt.seconds / 40)
+
+    stop.set()
+    stats, summary = dict(load_controller.controller.stats), load_controller.controller.get_summary()
+    # Let workers waiting for the breaker or a slot out
+    load_controller.start(None, workers)
+    for thread in threads:
+        thread.join()
+    return len(completed), stats, summary
+
+
+def main() -> int:
+    """Run the simulation.
+
+    Returns:
+        The exit code. 1 if the controller didn't lower the load or open the breaker.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", maxsplit=1)[0])
+    parser.add_argument("--workers", type=int, default=4, help="The number of parallel sessions.")
+    parser.add_argument("--seconds", type=float, default=8, help="The length of each run.")
+    args = parser.parse_args()
+
+    # Scale the targets and pauses down to the simulated latency
+    config.LOAD_LATENCY_TARGETS = {"open_case": BASE_LATENCY * 1.5, "change_tab": BASE_LATENCY * 1.5, "send_letter_to_logivaert": BASE_LATENCY * 8}
+    config.BREAKER_PAUSE = args.seconds / 20
+    load_controller.DECREASE_COOLDOWN = BASE_LATENCY * 10
+
+    results = {}
+    for use_controller in (False, True):
+        eflyt = SimulatedEflyt(args.seconds)
+        timeline = []
+        cases, stats, summary = run(eflyt, args.workers, use_controller, timeline)
+        results[use_controller] = (cases, eflyt, stats)
+
+        if use_controller:
+            print(f"{'Time s':>7}{'Limit':>7}{'Active':>7}  {'Breaker':<10}eFlyt")
+            for elapsed, limit, in_flight, state, (capacity, failing) in timeline[::2]:
+                print(f"{elapsed:>7.2f}{limit:>7}{in_flight:>7}  {state:<10}{'down' if failing else f'capacity {capacity}'}")
+            print()
+
+    print(f"{'Controller':<12}{'Cases':>7}{'Calls':>7}{'Errors':>8}{'p50 ms':>8}{'p95 ms':>8}")
+    for use_controller, (cases, eflyt, _) in results.items():
+        latencies = sorted(eflyt.latencies)
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+        print(f"{'on' if use_controller else 'off':<12}{cases:>7}{len(latencies):>7}{eflyt.errors:>8}"
+              f"{statistics.median(latencies) * 1000 if latencies else 0:>8.0f}{p95 * 1000:>8.0f}")
+
+    stats = results[True][2]
+    print()
+    print(summary)
+
+    return 0 if stats["decreases"] and stats["trips"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""This module builds synthetic letters shaped like the logiværtserklæringer from eFlyt.
+The page uses a flipped coordinate system so the receiver's name at the top of the page
+has the lowest y coordinate in the text matrix, as in the real letters.
+"""
+
+import os
+import random
+
+BODY_LINES = (
+    "Du er registreret som logivært på adressen.",
+    "Vi har modtaget en anmeldelse af flytning til din bolig.",
+    "Du bedes bekræfte at personen er flyttet ind hos dig.",
+    "Svar venligst inden for den angivne frist.",
+)
+
+
+def _escape(text: str) -> str:
+    """Escape a string for use in a PDF literal string."""
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_letter(receiver_name: str, body_line_count: int = 40) -> bytes:
+    """Build a one page PDF letter with the receiver's name at the top.
+
+    Args:
+        receiver_name: The name printed at the top of the letter.
+        body_line_count: The number of body text lines below the name.
+
+    Returns:
+        The content of the PDF file.
+    """
+    lines = [f"BT /F1 12 Tf 1 0 0 -1 60 80 Tm ({_escape(receiver_name)}) Tj ET"]
+    for i in range(body_line_count):
+        text = _escape(BODY_LINES[i % len(BODY_LINES)])
+        lines.append(f"BT /F1 10 Tf 1 0 0 -1 60 {140 + i * 14} Tm ({text}) Tj ET")
+    stream = ("1 0 0 -1 0 842 cm\n" + "\n".join(lines)).encode("latin-1")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{i} 0 obj\n".encode() + obj + b"\nendobj\n"
+
+    xref_offset = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        pdf += f"{offset:010d} 00000 n \n".encode()
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+
+    return bytes(pdf)
+
+
+def random_name(rng: random.Random) -> str:
+    """Make up a Danish looking name."""
+    first_names = ("Anne", "Mette", "Jens", "Søren", "Ida", "Mads", "Lærke", "Ørjan")
+    last_names = ("Jensen", "Nielsen", "Hansen", "Pedersen", "Ærø-Møller", "Andersen")
+    return f"{rng.choice(first_names)} {rng.choice(last_names)}"
+
+
+def write_corpus(folder: str, count: int, seed: int = 1) -> list[str]:
+    """Write a corpus of synthetic letters to a folder.
+
+    Args:
+        folder: The folder to write to. It is created if it doesn't exist.
+        count: The number of letters to write.
+        seed: The seed for the random names and letter lengths.
+
+    Returns:
+        The paths of the written files.
+    """
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"letter_{i:04d}.pdf")
+        with open(path, "wb") as file:
+            file.write(make_letter(random_name(rng), body_line_count=rng.randint(10, 80)))
+        paths.append(path)
+    return paths
@@ -0,0 +1,387 @@
+"""End-to-end throughput benchmark of the robot against the fake eFlyt server.
+
+Runs process.process with headless Chrome against benchmarks.fake_eflyt and a stub
+OrchestratorConnection, and reports cases per minute, WebDriver commands per case
+and the time spent in each step of handle_case. Every handled case is checked
+afterwards to make sure the robot did the right things to it.
+
+The benchmark only ever runs against the local stand-in, never against eFlyt. The
+stand-in has the same pages, element ids and postbacks as eFlyt, so the robot does the
+same WebDriver calls and round trips as in production, and --latency adds the delay of
+the real server to each of them. The numbers are relative: they show whether a change
+makes the robot do less work per case, not how fast eFlyt itself is. Real Chrome and
+chromedriver are needed, since the browser's own work is part of what's measured.
+
+A run is compared with an earlier one by saving the results of the earlier run with
+--save and passing the file to --compare, e.g. before and after a change, or with
+--profile default and --profile lean to compare the browser profiles.
+
+Usage:
+    python -m benchmarks.throughput_benchmark --cases 20 --latency 50 --profile default --save default.json
+    python -m benchmarks.throughput_benchmark --cases 20 --latency 50 --compare default.json
+"""
+
+import argparse
+from collections import defaultdict
+from datetime import datetime
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+import uuid
+
+from selenium import webdriver
+from selenium.common.exceptions import NoSuchDriverException
+from selenium.webdriver.remote.remote_connection import RemoteConnection
+from OpenOrchestrator.database.queues import QueueElement, QueueStatus
+from itk_dev_shared_components.eflyt import eflyt_login, eflyt_search
+import itk_dev_event_log
+
+from benchmarks.fake_eflyt import ANMELDER_TEMPLATE, FakeEflyt, make_cases
+from robot_framework import checkpoint_journal, config, eflyt, process, session_manager
+from robot_framework.session_manager import sessions
+
+EFLYT_URL = "https://notuskommunal.scandihealth.net"
+
+# The steps of handle_case that are timed, as (module, function name).
+STEPS = (
+    (eflyt, "check_queue"),
+    (eflyt_search, "open_case"),
+    (eflyt, "read_letter"),
+    (eflyt, "check_sagslog"),
+    (eflyt, "check_beboer"),
+    (eflyt, "send_letter_to_logivaert"),
+    (eflyt, "send_letter_to_anmelder"),
+    (eflyt, "check_off_original_letter"),
+    (eflyt, "change_deadline"),
+)
+
+
+class StubOrchestratorConnection:
+    """An in-memory stand-in for OrchestratorConnection with the methods the robot uses."""
+
+    def __init__(self):
+        self.process_name = "Throughput benchmark"
+        self.logs: list[tuple[str, str]] = []
+        self.queue: list[QueueElement] = []
+        self._lock = threading.Lock()
+
+    def log_trace(self, message: str) -> None:
+        """Store a trace log."""
+        self.logs.append(("trace", message))
+
+    def log_info(self, message: str) -> None:
+        """Store an info log."""
+        self.logs.append(("info", message))
+
+    def log_error(self, message: str) -> None:
+        """Store an error log."""
+        self.logs.append(("error", message))
+
+    def get_constant(self, _: str) -> SimpleNamespace:
+        """Get an empty constant."""
+        return SimpleNamespace(value="")
+
+    def get_credential(self, _: str) -> SimpleNamespace:
+        """Get a dummy credential."""
+        return SimpleNamespace(username="robot", password="secret")
+
+    def get_queue_elements(self, queue_name: str, reference: str | None = None, status: QueueStatus | None = None, offset: int = 0, limit: int = 100) -> list[QueueElement]:
+        """Get queue elements, newest first."""
+        with self._lock:
+            elements = [element for element in reversed(self.queue)
+                        if element.queue_name == queue_name
+                        and (reference is None or element.reference == reference)
+                        and (status is None or element.status == status)]
+        return elements[offset:offset + limit]
+
+    def create_queue_element(self, queue_name: str, reference: str | None = None, **_) -> QueueElement:
+        """Create a queue element."""
+        element = QueueElement(id=uuid.uuid4(), queue_name=queue_name, reference=reference, status=QueueStatus.NEW, created_date=datetime.now())
+        with self._lock:
+            self.queue.append(element)
+        return element
+
+    def set_queue_element_status(self, element_id: uuid.UUID, status: QueueStatus, message: str | None = None) -> None:
+        """Set the status of a queue element."""
+        with self._lock:
+            for element in self.queue:
+                if element.id == element_id:
+                    element.status = status
+                    element.message = message
+
+
+class Recorder:
+    """Collects WebDriver command counts per case and step timings."""
+
+    def __init__(self):
+        self.commands: dict[str, int] = defaultdict(int)
+        self.step_times: dict[str, list[float]] = defaultdict(list)
+        self.case_times: list[tuple[float, float]] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def current_case(self) -> str:
+        """The case handled by the calling thread."""
+        return getattr(self._local, "case", "(no case)")
+
+    def count_command(self) -> None:
+        """Count a WebDriver command for the current case."""
+        with self._lock:
+            self.commands[self.current_case] += 1
+
+    def wrap_handle_case(self, function):
+        """Wrap handle_case to track the current case and its duration."""
+        @functools.wraps(function)
+        def wrapper(browser, case, *args, **kwargs):
+            self._local.case = case.case_number
+            start = time.perf_counter()
+            try:
+                return function(browser, case, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self.case_times.append((start, time.perf_counter()))
+                self._local.case = "(no case)"
+        return wrapper
+
+    def wrap_step(self, name: str, function):
+        """Wrap a step function to time it."""
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.step_times[name].append(time.perf_counter() - start)
+        return wrapper
+
+
+def make_browser_class(base_url: str, download_dir: str, headless: bool) -> type:
+    """Make a browser class that sends the robot's eFlyt urls to the fake server.
+
+    Args:
+        base_url: The url of the fake server.
+        download_dir: The folder letters are downloaded to.
+        headless: Whether Chrome runs headless.
+
+    Returns:
+        A subclass of the shared components' ResilientBrowser.
+    """
+    class LocalBrowser(eflyt_login.ResilientBrowser):
+        """A ResilientBrowser pointed at the fake server."""
+        def __init__(self, options: webdriver.ChromeOptions | None = None, **kwargs):
+            options = options or webdriver.ChromeOptions()
+            if headless:
+                options.add_argument("--headless=new")
+            super().__init__(options=options, **kwargs)
+            self.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_dir})
+
+        def get(self, url: str) -> None:
+            super().get(url.replace(EFLYT_URL, base_url))
+
+    return LocalBrowser
+
+
+def patch_robot(fake: FakeEflyt, recorder: Recorder, work_dir: str, headless: bool) -> None:
+    """Point the robot at the fake server and instrument it.
+    Everything the robot writes to disk is sent to the work folder.
+
+    Args:
+        fake: The running fake server.
+        recorder: The recorder to instrument the robot with.
+        work_dir: A temporary folder.
+        headless: Whether Chrome runs headless.
+    """
+    download_dir = os.path.join(work_dir, "downloads")
+    os.makedirs(download_dir)
+
+    eflyt_login.ResilientBrowser = make_browser_class(fake.url, download_dir, headless)
+    session_manager.LOGIN_URL = session_manager.LOGIN_URL.replace(EFLYT_URL, fake.url)
+    session_manager.PROBE_URL = session_manager.PROBE_URL.replace(EFLYT_URL, fake.url)
+
+    eflyt.DOWNLOAD_DIR = download_dir
+    clear_downloads = eflyt.clear_downloads
+    eflyt.clear_downloads = lambda orchestrator_connection, dir_path=download_dir: clear_downloads(orchestrator_connection, dir_path)
+    process.load_journal = functools.partial(checkpoint_journal.load_journal, os.path.join(work_dir, "journal.jsonl"))
+    config.USE_LETTER_CACHE = False
+
+    itk_dev_event_log.setup_logging = lambda *_: None
+    itk_dev_event_log.emit = lambda *_, **__: None
+
+    original_execute = RemoteConnection.execute
+
+    def counting_execute(connection, command, params):
+        recorder.count_command()
+        return original_execute(connection, command, params)
+
+    RemoteConnection.execute = counting_execute
+
+    eflyt.handle_case = recorder.wrap_handle_case(eflyt.handle_case)
+    for module, name in STEPS:
+        setattr(module, name, recorder.wrap_step(name, getattr(module, name)))
+
+
+def check_cases(fake: FakeEflyt, orchestrator_connection: StubOrchestratorConnection) -> list[str]:
+    """Check that every handled case got both letters, the notes, the check-off and the new deadline.
+
+    Args:
+        fake: The fake server after the run.
+        orchestrator_connection: The stub connection after the run.
+
+    Returns:
+        A list of problems found.
+    """
+    problems = []
+    done = {element.reference for element in orchestrator_connection.queue if element.status == QueueStatus.DONE}
+
+    for case in fake.cases.values():
+        should_handle = "Sommerhus" not in case.case_types
+        if should_handle != (case.case_number in done):
+            problems.append(f"{case.case_number}: handled={case.case_number in done}, expected {should_handle}")
+            continue
+
+        if not should_handle:
+            continue
+
+        if len(case.letters_sent) != 2 or case.letters_sent[1] != ANMELDER_TEMPLATE:
+            problems.append(f"{case.case_number}: letters sent {case.letters_sent}")
+        if not case.deadline_moved_to or not case.original_letter_checked:
+            problems.append(f"{case.case_number}: deadline {case.deadline_moved_to}, checked off {case.original_letter_checked}")
+        if case.notes.count("Besked fra Robot") != 3:
+            problems.append(f"{case.case_number}: notes {case.notes!r}")
+
+    return problems
+
+
+def get_results(recorder: Recorder, fake: FakeEflyt, wall_time: float) -> dict[str, float]:
+    """Get the results of the run that can be compared with another run.
+
+    Args:
+        recorder: The recorder after the run.
+        fake: The fake server after the run.
+        wall_time: The seconds the whole process took.
+
+    Returns:
+        The results by name, or an empty dict if no cases were handled.
+    """
+    case_count = len(recorder.case_times)
+    if case_count == 0:
+        return {}
+
+    handling_time = max(end for _, end in recorder.case_times) - min(start for start, _ in recorder.case_times)
+    case_commands = [count for case, count in recorder.commands.items() if case != "(no case)"]
+
+    return {
+        "Cases handled": case_count,
+        "Total time s": wall_time,
+        "Case handling time s": handling_time,
+        "Cases per minute": case_count / handling_time * 60,
+        "Time per case ms": handling_time / case_count * 1000,
+        "WebDriver calls per case": sum(case_commands) / case_count,
+        "WebDriver calls outside": recorder.commands.get("(no case)", 0),
+        "HTTP requests to eFlyt": fake.request_count,
+    }
+
+
+def report(results: dict[str, float], recorder: Recorder, baseline: dict[str, float] | None) -> None:
+    """Print the results of the run, next to the results of an earlier run if given.
+
+    Args:
+        results: The results of the run.
+        recorder: The recorder after the run.
+        baseline: The results of an earlier run to compare with, if any.
+    """
+    if not results:
+        print("No cases were handled.")
+        return
+
+    if baseline:
+        print(f"{'':<26}{'Baseline':>10}{'This run':>10}{'Change':>9}")
+    for name, value in results.items():
+        if not baseline:
+            print(f"{name + ':':<26}{value:>10.1f}")
+            continue
+        before = baseline.get(name, 0)
+        change = f"{(value / before - 1) * 100:>+8.0f}%" if before else ""
+        print(f"{name + ':':<26}{before:>10.1f}{value:>10.1f}{change}")
+    print()
+    print(f"{'Step':<28}{'Calls':>7}{'Mean ms':>10}{'Max ms':>10}{'Total s':>10}")
+    for _, name in STEPS:
+        times = recorder.step_times.get(name, [])
+        if times:
+            print(f"{name:<28}{len(times):>7}{sum(times) / len(times) * 1000:>10.0f}{max(times) * 1000:>10.0f}{sum(times):>10.1f}")
+
+
+def main() -> int:
+    """Run the benchmark.
+
+    Returns:
+        The exit code. 1 if any handled case wasn't handled correctly, 2 if Chrome isn't available.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the robot against a local fake eFlyt.")
+    parser.add_argument("--cases", type=int, default=20, help="The number of synthetic cases.")
+    parser.add_argument("--latency", type=float, default=0, help="Milliseconds to delay every request to the fake eFlyt.")
+    parser.add_argument("--workers", type=int, default=1, help="The number of parallel sessions (WORKER_COUNT).")
+    parser.add_argument("--in-memory", action="store_true", help="Fetch letters into memory (FETCH_LETTERS_IN_MEMORY).")
+    parser.add_argument("--prefetch", action="store_true", help="Read the next cases in a second session (PREFETCH_NEXT_CASE).")
+    parser.add_argument("--profile", choices=("lean", "default"), default="default", help="The browser profile (USE_LEAN_BROWSER).")
+    parser.add_argument("--headed", action="store_true", help="Show the browser window.")
+    parser.add_argument("--save", help="Save the results to this JSON file to compare later runs with.")
+    parser.add_argument("--compare", help="Compare with the results saved by an earlier run.")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    fake = FakeEflyt(make_cases(args.cases), latency=args.latency / 1000)
+    fake.start()
+
+    recorder = Recorder()
+    orchestrator_connection = StubOrchestratorConnection()
+    config.WORKER_COUNT = args.workers
+    config.FETCH_LETTERS_IN_MEMORY = args.in_memory
+    config.PREFETCH_NEXT_CASE = args.prefetch
+    config.USE_LEAN_BROWSER = args.profile == "lean"
+    config.HEADLESS_BROWSER = not args.headed
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        patch_robot(fake, recorder, work_dir, headless=not args.headed)
+
+        start = time.perf_counter()
+        try:
+            process.process(orchestrator_connection)
+        except NoSuchDriverException:
+            print("Chrome or chromedriver couldn't be found. The benchmark needs a real Chrome to drive the stand-in.")
+            return 2
+        finally:
+            wall_time = time.perf_counter() - start
+            sessions.close_all()
+            fake.stop()
+
+    results = get_results(recorder, fake, wall_time)
+    print(f"Browser profile:          {args.profile}")
+    report(results, recorder, baseline)
+
+    if args.save and results:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    problems = check_cases(fake, orchestrator_connection)
+    print()
+    print(f"Problems: {len(problems)}")
+    for problem in problems:
+        print(f"  {problem}")
+
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,17 +1,115 @@
 """The main file of the robot which will install all requirements in
 a virtual environment and then start the actual process.
+
+The virtual environment is only rebuilt when pyproject.toml or the Python version changes.
+A hash of both is written to a stamp file in the environment after a successful install,
+so an interrupted install is rebuilt on the next run. The local wheel cache is refreshed
+from the package index on every rebuild, so wildcard pins still pick up new releases, and
+the dependencies are installed from it. If the index can't be reached the cached wheels are used.
 """
 
-import subprocess
+import hashlib
 import os
+import shutil
+import subprocess
 import sys
+import time
+import tomllib
+
+START_TIME = time.perf_counter()
+
+VENV_DIR = ".venv"
+WHEEL_DIR = ".wheelhouse"
+STAMP_FILE = os.path.join(VENV_DIR, "bootstrap.stamp")
+
+if sys.platform == "win32":
+    VENV_PYTHON = os.path.join(VENV_DIR, "Scripts", "python.exe")
+else:
+    VENV_PYTHON = os.path.join(VENV_DIR, "bin", "python")
+
+
+def get_environment_hash() -> str:
+    """Hash pyproject.toml and the Python version the environment is built with.
+
+    Returns:
+        The hash as a hex string.
+    """
+    with open("pyproject.toml", "rb") as file:
+        content = file.read()
+    return hashlib.sha256(content + sys.version.encode()).hexdigest()
+
+
+def is_environment_current(environment_hash: str) -> bool:
+    """Check if the virtual environment was fully installed with the current hash.
+
+    Args:
+        environment_hash: The hash of the current requirements.
+
+    Returns:
+        True if the environment can be reused.
+    """
+    if not os.path.isfile(VENV_PYTHON) or not os.path.isfile(STAMP_FILE):
+        return False
+    with open(STAMP_FILE, encoding="utf-8") as file:
+        return file.read().strip() == environment_hash
+
+
+def get_dependencies() -> list[str]:
+    """Read the dependencies of the robot from pyproject.toml.
+
+    Returns:
+        The dependency specifiers.
+    """
+    with open("pyproject.toml", "rb") as file:
+        return tomllib.load(file)["project"]["dependencies"]
+
+
+def build_environment(environment_hash: str) -> None:
+    """Build the virtual environment from scratch and stamp it when it's done.
+    The robot itself is run from this folder, so only its dependencies are installed.
+
+    Args:
+        environment_hash: The hash of the current requirements.
+    """
+    if os.path.isdir(VENV_DIR):
+        shutil.rmtree(VENV_DIR)
+    subprocess.run([sys.executable, "-m", "venv", VENV_DIR], check=True)
+
+    dependencies = get_dependencies()
+
+    # Refresh the cache first, since an install from it alone would keep the versions it was first filled with
+    refresh = [VENV_PYTHON, "-m", "pip", "wheel", "--disable-pip-version-check", "--find-links", WHEEL_DIR, "--wheel-dir", WHEEL_DIR]
+    if subprocess.run(refresh + dependencies, check=False).returncode != 0:
+        print("Couldn't refresh the wheel cache. Installing from the cached wheels.")
+
+    pip = [VENV_PYTHON, "-m", "pip", "install", "--disable-pip-version-check", "--no-index", "--find-links", WHEEL_DIR]
+    subprocess.run(pip + dependencies, check=True)
+
+    # Write the stamp atomically as the last step so a half-built environment is never reused
+    with open(STAMP_FILE + ".tmp", "w", encoding="utf-8") as file:
+        file.write(environment_hash)
+    os.replace(STAMP_FILE + ".tmp", STAMP_FILE)
+
+
+def main() -> None:
+    """Make sure the virtual environment is current and start the robot in it."""
+    script_directory = os.path.dirname(os.path.realpath(__file__))
+    os.chdir(script_directory)
+
+    environment_hash = get_environment_hash()
+    if is_environment_current(environment_hash):
+        print("Reusing virtual environment.")
+    else:
+        print("Requirements changed or last install was interrupted. Building virtual environment.")
+        build_environment(environment_hash)
+        print(f"Built virtual environment in {time.perf_counter() - START_TIME:.1f} s.")
 
-script_directory = os.path.dirname(os.path.realpath(__file__))
-os.chdir(script_directory)
+    command_args = [VENV_PYTHON, "-m", "robot_framework"] + sys.argv[1:]
 
-subprocess.run("python -m venv .venv", check=True)
-subprocess.run(r'.venv\Scripts\pip install .', check=True)
+    print(f"Starting robot after {time.perf_counter() - START_TIME:.2f} s.")
+    sys.stdout.flush()
+    subprocess.run(command_args, check=True)
 
-command_args = [r".venv\Scripts\python", "-m", "robot_framework"] + sys.argv[1:]
 
-subprocess.run(command_args, check=True)
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""This module launches the browser sessions of the robot with a lean Chrome profile.
+
+The robot only reads and fills in forms, so the profile leaves out everything a person
+at the screen would need: the window, web fonts, and Chrome's background services
+like sync, updates and extensions. Pages are handed over as soon as their HTML is parsed
+instead of after every resource is loaded. Each session downloads letters to its own folder.
+"""
+
+import os
+
+from selenium import webdriver
+from itk_dev_shared_components.eflyt import eflyt_login
+
+from robot_framework import config, eflyt, waits
+
+# The window size of a headless browser. eflyt_login.login maximizes the window instead.
+WINDOW_SIZE = "1920,1080"
+
+# Chrome switches that turn off services the robot doesn't use.
+BACKGROUND_SERVICE_SWITCHES = (
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-extensions",
+    "--disable-sync",
+    "--disable-features=Translate,OptimizationHints,MediaRouter",
+    "--disable-search-engine-choice-screen",
+    "--no-first-run",
+    "--no-default-browser-check",
+)
+
+
+def get_download_dir(slot: str) -> str:
+    """Get the download folder of a browser session.
+    The main session downloads to the user's download folder and other sessions to a folder of their own,
+    the same folders the worker and prefetch sessions use.
+
+    Args:
+        slot: The name of the session.
+
+    Returns:
+        The absolute path to the download folder.
+    """
+    if slot == "main":
+        return eflyt.DOWNLOAD_DIR
+    return os.path.join(eflyt.DOWNLOAD_DIR, f"eflyt_{slot}")
+
+
+def create_options(download_dir: str) -> webdriver.ChromeOptions:
+    """Create the Chrome options of the lean profile.
+
+    Args:
+        download_dir: The folder the browser downloads to.
+
+    Returns:
+        The Chrome options.
+    """
+    options = webdriver.ChromeOptions()
+    options.page_load_strategy = "eager"
+
+    if config.HEADLESS_BROWSER:
+        options.add_argument("--headless=new")
+        options.add_argument(f"--window-size={WINDOW_SIZE}")
+
+    for switch in BACKGROUND_SERVICE_SWITCHES:
+        options.add_argument(switch)
+
+    options.add_experimental_option("prefs", {
+        "download.default_directory": download_dir,
+        "download.prompt_for_download": False,
+        "plugins.always_open_pdf_externally": True,
+    })
+    return options
+
+
+def create_browser(download_dir: str) -> webdriver.Chrome:
+    """Launch a browser with the lean profile. The browser isn't logged in.
+    Requests matching BLOCKED_URL_PATTERNS in config are blocked for the lifetime of the browser.
+
+    Args:
+        download_dir: The folder the browser downloads to. It's created if it doesn't exist.
+
+    Returns:
+        The browser.
+    """
+    os.makedirs(download_dir, exist_ok=True)
+
+    browser = eflyt_login.ResilientBrowser(options=create_options(download_dir))
+    if not config.HEADLESS_BROWSER:
+        browser.maximize_window()
+    browser.implicitly_wait(waits.IMPLICIT_WAIT)
+
+    browser.execute_cdp_cmd("Network.enable", {})
+    browser.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(config.BLOCKED_URL_PATTERNS)})
+    # Headless Chrome ignores the download preference, so the folder is also set through CDP
+    browser.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_dir})
+    return browser
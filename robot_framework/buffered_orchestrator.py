@@ -0,0 +1,318 @@
+"""This module buffers the robot's writes to Orchestrator and sends them in batches from a background thread.
+Logs and queue element status changes are otherwise each a blocking database round trip on the browser thread.
+
+Writes are sent in the order they were made, and their timestamps are taken when they are made.
+Every other call to Orchestrator, e.g. reading constants or queue elements, first waits for the
+buffered writes so it always sees them. Queue elements are still created right away since their id is needed,
+and status changes wait until they are sent, so a crash never leaves a finished case in progress in Orchestrator.
+
+Each write is also appended to a local spool file before it's buffered. When all writes have been handled
+the spool is rewritten with only the writes that couldn't be sent, so writes left in the spool after a crash
+or a database outage are sent the next time the robot starts.
+"""
+
+import atexit
+from dataclasses import asdict, dataclass
+from datetime import datetime
+import functools
+from importlib import metadata
+import inspect
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any
+from uuid import UUID
+
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+from OpenOrchestrator.database import db_util
+from OpenOrchestrator.database.logs import Log, LogLevel
+from OpenOrchestrator.database.queues import QueueElement, QueueStatus
+from OpenOrchestrator.database.truncated_string import truncate_message
+from sqlalchemy.orm import Session
+
+# The file writes are spooled to until they have been sent.
+SPOOL_PATH = os.path.join(os.path.expanduser("~"), ".eflyt_orchestrator_spool.jsonl")
+
+# The max number of writes sent in a single database transaction.
+MAX_BATCH_SIZE = 100
+
+# The number of times a batch is tried before it's left in the spool for the next run.
+WRITE_ATTEMPTS = 3
+
+# The OpenOrchestrator versions whose database session is used to send a batch in a single transaction.
+# Other versions get one transaction per write through the public db_util functions.
+# The robot refuses to start if the private session of one of these versions has changed.
+BATCH_SESSION_VERSIONS = ("2.",)
+
+
+@dataclass
+class _Write:
+    """A single buffered write to Orchestrator."""
+    sequence: int
+    time: str
+    level: str | None = None
+    message: str | None = None
+    element_id: str | None = None
+    status: str | None = None
+
+
+class BufferedOrchestratorConnection:
+    """A stand-in for OrchestratorConnection that buffers logs and status changes.
+    All other attributes are passed on to the wrapped connection.
+    """
+
+    def __init__(self, orchestrator_connection: OrchestratorConnection, spool_path: str = SPOOL_PATH):
+        """
+        Args:
+            orchestrator_connection: The connection to wrap.
+            spool_path: The file writes are spooled to until they have been sent.
+
+        Raises:
+            RuntimeError: If the private database session of OpenOrchestrator has changed in a version in BATCH_SESSION_VERSIONS.
+        """
+        _supports_batch_session()
+
+        self._connection = orchestrator_connection
+        self.process_name = orchestrator_connection.process_name
+        self._spool_path = spool_path
+        self._queue: queue.Queue[_Write] = queue.Queue()
+        self._sequence = 0
+        self._failed: list[_Write] = []
+        self._lock = threading.Lock()
+
+        leftover_writes = _read_spool(spool_path)
+        with open(spool_path, "w", encoding="utf-8"):
+            pass
+
+        threading.Thread(target=self._run, daemon=True, name="orchestrator_writer").start()
+        atexit.register(self.flush)
+
+        if leftover_writes:
+            self.log_info(f"{len(leftover_writes)} writes to Orchestrator from an earlier run weren't sent. They're sent now.")
+        for write in leftover_writes:
+            self._enqueue(write.time, level=write.level, message=write.message, element_id=write.element_id, status=write.status)
+
+    def log_trace(self, message: str) -> None:
+        """Buffer a trace log."""
+        self._enqueue(datetime.now().isoformat(), level=LogLevel.TRACE.value, message=message)
+
+    def log_info(self, message: str) -> None:
+        """Buffer an info log."""
+        self._enqueue(datetime.now().isoformat(), level=LogLevel.INFO.value, message=message)
+
+    def log_error(self, message: str) -> None:
+        """Buffer an error log."""
+        self._enqueue(datetime.now().isoformat(), level=LogLevel.ERROR.value, message=message)
+
+    def set_queue_element_status(self, element_id: UUID | str, status: QueueStatus, message: str | None = None) -> None:
+        """Send a status change of a queue element together with the logs before it, and wait until it's sent."""
+        self._enqueue(datetime.now().isoformat(), message=message, element_id=str(element_id), status=status.value)
+        self.flush()
+
+    def create_queue_element(self, *args, **kwargs) -> QueueElement:
+        """Create a queue element right away. See OrchestratorConnection.create_queue_element."""
+        return self._connection.create_queue_element(*args, **kwargs)
+
+    def flush(self) -> None:
+        """Wait until all buffered writes have been handled and drop the sent writes from the spool."""
+        self._queue.join()
+        with self._lock:
+            if self._queue.unfinished_tasks == 0:
+                with open(self._spool_path, "w", encoding="utf-8") as file:
+                    for write in self._failed:
+                        file.write(json.dumps(asdict(write)) + "\n")
+                    if self._failed:
+                        file.flush()
+                        os.fsync(file.fileno())
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._connection, name)
+        if not callable(attribute):
+            return attribute
+
+        def flushed_call(*args, **kwargs):
+            self.flush()
+            return attribute(*args, **kwargs)
+        return flushed_call
+
+    def _enqueue(self, write_time: str, **fields) -> None:
+        """Spool a write and hand it to the writer thread.
+
+        Args:
+            write_time: The time the write was made in iso format.
+            **fields: The fields of the write.
+        """
+        with self._lock:
+            self._sequence += 1
+            write = _Write(self._sequence, write_time, **fields)
+            with open(self._spool_path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(asdict(write)) + "\n")
+                # Status changes must survive a power cut, logs only a crash of the robot.
+                if write.status:
+                    file.flush()
+                    os.fsync(file.fileno())
+            self._queue.put(write)
+
+    def _run(self) -> None:
+        """Send buffered writes in batches until the process ends."""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < MAX_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._send_batch(batch)
+
+            for _ in batch:
+                self._queue.task_done()
+
+    def _send_batch(self, batch: list[_Write]) -> None:
+        """Send a batch of writes in a single transaction.
+        If the batch keeps failing it's left in the spool to be sent the next time the robot starts.
+
+        Args:
+            batch: The writes to send.
+        """
+        for attempt in range(WRITE_ATTEMPTS):
+            try:
+                _write_to_database(self.process_name, batch)
+                with self._lock:
+                    with open(self._spool_path, "a", encoding="utf-8") as file:
+                        file.write(json.dumps({"committed": [batch[0].sequence, batch[-1].sequence]}) + "\n")
+                return
+            # The writer thread must never die or the robot would hang on the next flush.
+            # pylint: disable-next = broad-exception-caught
+            except Exception as exc:
+                error = exc
+                time.sleep(2 ** attempt)
+
+        with self._lock:
+            self._failed.extend(batch)
+        try:
+            self._connection.log_error(f"{len(batch)} writes to Orchestrator couldn't be sent and are kept in {self._spool_path} "
+                                       f"until the robot starts again: {error!r}")
+        # The database is most likely down, and the writes are reported again from the spool at the next start.
+        # pylint: disable-next = broad-exception-caught
+        except Exception:
+            pass
+
+
+def _write_to_database(process_name: str, batch: list[_Write]) -> None:
+    """Write a batch of logs and status changes to the Orchestrator database.
+    The batch is written in a single transaction if the installed OpenOrchestrator supports it,
+    and one write at a time through db_util otherwise.
+
+    Args:
+        process_name: The name of the process writing the logs.
+        batch: The writes to send.
+    """
+    if not _supports_batch_session():
+        for write in batch:
+            if write.level:
+                db_util.create_log(process_name, LogLevel(write.level), write.message)
+                continue
+            try:
+                db_util.set_queue_element_status(write.element_id, QueueStatus(write.status), write.message)
+            # A queue element that has been deleted is skipped, the same as in a batch
+            except ValueError:
+                pass
+        return
+
+    with _get_batch_session() as session:
+        for write in batch:
+            write_time = datetime.fromisoformat(write.time)
+
+            if write.level:
+                session.add(Log(log_time=write_time, log_level=LogLevel(write.level), process_name=process_name, log_message=truncate_message(write.message)))
+                continue
+
+            element = session.get(QueueElement, UUID(write.element_id))
+            if not element:
+                continue
+
+            status = QueueStatus(write.status)
+            element.status = status
+            if write.message is not None:
+                element.message = write.message
+
+            if status == QueueStatus.IN_PROGRESS:
+                element.start_date = write_time
+            elif status in (QueueStatus.DONE, QueueStatus.FAILED, QueueStatus.ABANDONED):
+                element.end_date = write_time
+
+        session.commit()
+
+
+@functools.cache
+def _supports_batch_session() -> bool:
+    """Check if the installed OpenOrchestrator is a version whose database session is known to work with batches.
+
+    Raises:
+        RuntimeError: If the version is in BATCH_SESSION_VERSIONS but db_util._get_session isn't a function
+            without arguments returning a Session.
+    """
+    version = metadata.version("OpenOrchestrator")
+    if not version.startswith(BATCH_SESSION_VERSIONS):
+        return False
+
+    get_session = getattr(db_util, "_get_session", None)
+    signature = inspect.signature(get_session) if callable(get_session) else None
+    if signature is None or signature.parameters or signature.return_annotation not in (Session, "Session"):
+        raise RuntimeError(f"db_util._get_session has changed in OpenOrchestrator {version} and can't be used to send batches. "
+                           "Check _write_to_database against it or remove the version from BATCH_SESSION_VERSIONS.")
+    return True
+
+
+def _get_batch_session():
+    """Get a session to the Orchestrator database to write a batch in a single transaction.
+    This mirrors db_util.create_log and db_util.set_queue_element_status, which open a session per write.
+    db_util has no public way to write more than one row per transaction, so its private session is
+    only used for the versions in BATCH_SESSION_VERSIONS.
+
+    Returns:
+        A database session.
+    """
+    return db_util._get_session()  # pylint: disable=protected-access
+
+
+def _read_spool(spool_path: str) -> list[_Write]:
+    """Read the writes left in the spool that were never sent.
+
+    Args:
+        spool_path: The spool file.
+
+    Returns:
+        The writes that weren't sent, in order.
+    """
+    if not os.path.exists(spool_path):
+        return []
+
+    writes = []
+    committed = []
+    with open(spool_path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            if "committed" in entry:
+                committed.append(entry["committed"])
+            else:
+                writes.append(_Write(**entry))
+
+    return [write for write in writes if not any(first <= write.sequence <= last for first, last in committed)]
+
+
+def flush(orchestrator_connection: OrchestratorConnection | BufferedOrchestratorConnection) -> None:
+    """Wait for all buffered writes to be sent if the connection is buffered.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+    """
+    if isinstance(orchestrator_connection, BufferedOrchestratorConnection):
+        orchestrator_connection.flush()
@@ -0,0 +1,117 @@
+"""This module filters the cases from the search by the rules in CASE_FILTER_RULES in config.
+
+The rules are compiled once per run into predicates: case types are compared as sets
+and the date is looked up once. A case is rejected by the first rule it fails, and the
+number of cases rejected by each rule is counted so it's clear why cases were dropped.
+"""
+
+from datetime import date
+from typing import Callable, Iterable, Iterator
+
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+from itk_dev_shared_components.eflyt.eflyt_case import Case
+
+from robot_framework import config
+
+Predicate = Callable[[Case], bool]
+
+
+class CaseFilter:
+    """A compiled set of rules and the number of cases each rule has rejected."""
+
+    def __init__(self, rules: list[tuple[str, Predicate]]):
+        """
+        Args:
+            rules: The name and predicate of each rule, in the order they are checked.
+        """
+        self.rules = rules
+        self.accepted = 0
+        self.rejections = {name: 0 for name, _ in rules}
+
+    def matches(self, case: Case) -> bool:
+        """Check a case against the rules and count the rule that rejects it, if any.
+
+        Args:
+            case: The case to check.
+
+        Returns:
+            True if the case passes all rules.
+        """
+        for name, predicate in self.rules:
+            if not predicate(case):
+                self.rejections[name] += 1
+                return False
+
+        self.accepted += 1
+        return True
+
+    def filter(self, cases: Iterable[Case]) -> Iterator[Case]:
+        """Filter cases lazily, counting the rejections as the cases are read.
+
+        Args:
+            cases: The cases to filter.
+
+        Returns:
+            An iterator of the cases that pass, in the same order.
+        """
+        return filter(self.matches, cases)
+
+    def log_rejections(self, orchestrator_connection: OrchestratorConnection) -> None:
+        """Log how many cases each rule has rejected.
+
+        Args:
+            orchestrator_connection: The connection to Orchestrator.
+        """
+        lines = ["Cases rejected by each filter rule:"]
+        for name, count in self.rejections.items():
+            lines.append(f"{name}: {count}")
+        orchestrator_connection.log_info("\n".join(lines))
+
+
+def compile_rules(rules: Iterable[dict] | None = None, today: date | None = None) -> CaseFilter:
+    """Compile a rule set into a case filter.
+
+    Args:
+        rules (Optional): The rules in the format of CASE_FILTER_RULES in config. Defaults to CASE_FILTER_RULES.
+        today (Optional): The date deadlines are compared to. Defaults to today.
+
+    Returns:
+        The compiled filter.
+
+    Raises:
+        ValueError: If a rule has an unknown type.
+    """
+    if rules is None:
+        rules = config.CASE_FILTER_RULES
+    today = today or date.today()
+
+    compiled = []
+    for rule in rules:
+        compiled.append((rule["name"], _compile_rule(rule, today)))
+    return CaseFilter(compiled)
+
+
+def _compile_rule(rule: dict, today: date) -> Predicate:
+    """Compile a single rule into a predicate.
+
+    Args:
+        rule: The rule.
+        today: The date deadlines are compared to.
+
+    Returns:
+        A predicate that is true for the cases that pass the rule.
+
+    Raises:
+        ValueError: If the rule has an unknown type.
+    """
+    match rule["type"]:
+        case "deadline_passed":
+            return lambda case: bool(case.deadline) and case.deadline.date() < today
+        case "any_case_type":
+            case_types = frozenset(rule["case_types"])
+            return lambda case: not case_types.isdisjoint(case.case_types)
+        case "no_case_type":
+            case_types = frozenset(rule["case_types"])
+            return lambda case: case_types.isdisjoint(case.case_types)
+        case _:
+            raise ValueError(f"Unknown case filter rule type '{rule['type']}' in rule '{rule['name']}'.")
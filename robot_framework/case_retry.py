@@ -0,0 +1,123 @@
+"""This module handles a case with retries, so a single flaky case doesn't stop the whole run.
+
+Errors that may go away on a new attempt, like stale elements, timeouts and a browser
+that stopped responding, are retried with a growing delay after the session has been
+recovered. The session is recovered by closing any open alert and checking it's still
+alive and logged in, logging in again or relaunching the browser if it isn't. The case
+is then opened again and resumed from the journal, so no step is done twice.
+
+A case that fails with any other error, or keeps failing, is marked as failed and
+the robot moves on to the next case. Business errors still stop the robot.
+"""
+
+import time
+from typing import TYPE_CHECKING
+
+from selenium import webdriver
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+from OpenOrchestrator.database.constants import Credential
+from OpenOrchestrator.database.queues import QueueElement
+from itk_dev_shared_components.eflyt.eflyt_case import Case
+
+from robot_framework import config, eflyt, load_controller, tab_tracker
+from robot_framework.checkpoint_journal import Journal
+from robot_framework.exceptions import BusinessError, handle_error
+from robot_framework.queue_index import QueueIndex
+from robot_framework.session_manager import sessions
+from robot_framework.transient_errors import is_transient
+
+if TYPE_CHECKING:
+    from robot_framework.prefetch import Prefetcher
+
+
+def handle_case(browser: webdriver.Chrome, case: Case, credentials: Credential, orchestrator_connection: OrchestratorConnection, queue_index: QueueIndex,
+                journal: Journal, download_dir: str, slot: str = "main", prefetcher: "Prefetcher | None" = None) -> webdriver.Chrome:
+    """Handle a case with eflyt.handle_case, retrying it after transient errors.
+    A case that can't be handled is marked as failed with exceptions.handle_error.
+
+    Args:
+        browser: The webdriver browser object of the session.
+        case: The case to handle.
+        credentials: The eFlyt credentials used to log in again.
+        orchestrator_connection: The connection to Orchestrator.
+        queue_index: The in-memory index of the queue.
+        journal: The journal of the robot's progress.
+        download_dir: The folder the browser downloads letters to.
+        slot (Optional): The name of the browser session in the session manager.
+        prefetcher (Optional): A prefetcher that has read the letter and sagslog of the case ahead of time.
+
+    Returns:
+        The browser to use for the next case. It's a new browser if the session had to be relaunched.
+
+    Raises:
+        BusinessError: If a business rule is broken.
+        Exception: Any error raised while recovering the session, e.g. if eFlyt can't be logged in to.
+    """
+    for attempt in range(1, config.CASE_ATTEMPTS + 1):
+        try:
+            with load_controller.case_slot():
+                eflyt.handle_case(browser, case, orchestrator_connection, queue_index, journal, download_dir, prefetcher)
+            return browser
+
+        except BusinessError:
+            raise
+
+        # Any error in a single case is isolated to that case.
+        # pylint: disable-next = broad-exception-caught
+        except Exception as error:
+            if not is_transient(error) or attempt == config.CASE_ATTEMPTS:
+                handle_error(f"Case {case.case_number} failed after {attempt} attempt(s)", error,
+                             _get_queue_element(case, queue_index, journal), orchestrator_connection, browser)
+                return browser
+
+            delay = config.CASE_RETRY_DELAY * 2 ** (attempt - 1)
+            orchestrator_connection.log_info(f"Attempt {attempt} of case {case.case_number} failed: {error!r}. Retrying in {delay} s.")
+            time.sleep(delay)
+            browser = recover_session(browser, credentials, orchestrator_connection, slot, download_dir)
+
+    return browser
+
+
+def recover_session(browser: webdriver.Chrome, credentials: Credential, orchestrator_connection: OrchestratorConnection, slot: str, download_dir: str) -> webdriver.Chrome:
+    """Get the session back to a usable state after an error.
+    An open alert is closed, and the browser is logged in again or relaunched if it needs it.
+
+    Args:
+        browser: The webdriver browser object of the session.
+        credentials: The eFlyt credentials.
+        orchestrator_connection: The connection to Orchestrator.
+        slot: The name of the browser session in the session manager.
+        download_dir: The folder the browser downloads letters to.
+
+    Returns:
+        A logged in browser, which may be a new one.
+    """
+    try:
+        browser.switch_to.alert.dismiss()
+    # There's usually no alert, and a dead browser is relaunched below.
+    # pylint: disable-next = broad-exception-caught
+    except Exception:
+        pass
+
+    browser = sessions.get_browser(credentials, orchestrator_connection, slot=slot)
+    browser.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_dir})
+    tab_tracker.forget_tab(browser)
+    return browser
+
+
+def _get_queue_element(case: Case, queue_index: QueueIndex, journal: Journal) -> QueueElement | None:
+    """Get the queue element created for the case in this run, if it got that far.
+
+    Args:
+        case: The case.
+        queue_index: The in-memory index of the queue.
+        journal: The journal of the robot's progress.
+
+    Returns:
+        The queue element or None if the case has none in the journal.
+    """
+    element_id = journal.get_result(case.case_number, "queue_element")
+    for queue_element in queue_index.get_elements(case.case_number):
+        if str(queue_element.id) == element_id:
+            return queue_element
+    return None
@@ -0,0 +1,241 @@
+"""This module contains a local write-ahead journal of the robot's progress.
+The journal lets a retry after an error skip the search and resume an interrupted case
+at the step it got to, instead of starting over and risking duplicate letters.
+
+The journal is a file with a JSON object per line. Each line is flushed to disk before
+the robot moves on, and a line cut off by a crash is dropped when the journal is loaded.
+Cases are journaled with only the fields needed to handle them, so no CPR numbers or
+names of citizens are written to disk.
+"""
+
+from datetime import date, datetime
+import json
+import os
+import threading
+from typing import Any, Callable, Iterable, Iterator
+
+from itk_dev_shared_components.eflyt.eflyt_case import Case
+
+# The file the journal is stored in.
+JOURNAL_PATH = os.path.join(os.path.expanduser("~"), ".eflyt_journal.jsonl")
+
+
+class Journal:
+    """A journal of the filtered cases of the current run and the completed steps of each unfinished case.
+    The journal is safe to share between threads.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: The file the journal is stored in.
+        """
+        self.path = path
+        self._search: dict | None = None
+        self._steps: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """Load the journal from disk if it exists."""
+        self._search = None
+        self._steps = {}
+
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, encoding="utf-8") as file:
+            content = file.read()
+
+        complete, _, partial = content.rpartition("\n")
+        entries = [json.loads(line) for line in complete.splitlines()]
+
+        # Journals written before cases were journaled without personal data have the whole case
+        old_cases = [entry for entry in entries if entry["type"] == "case" and entry["case"].keys() != _JOURNALED_FIELDS]
+        for entry in old_cases:
+            entry["case"] = _case_to_entry(_case_from_entry(entry["case"]))
+
+        if partial or old_cases:
+            # Drop a line cut off by a crash so new lines aren't appended to it, and the personal data of old cases
+            with open(self.path, "w", encoding="utf-8") as file:
+                file.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+
+        for entry in entries:
+            if entry["type"] == "search":
+                self._search = entry
+            elif entry["type"] == "case":
+                self._search["cases"].append(entry["case"])
+            elif entry["type"] == "search_complete":
+                self._search["complete"] = True
+            elif entry["type"] == "step":
+                self._steps.setdefault(entry["case"], {})[entry["step"]] = entry["result"]
+            elif entry["type"] == "finish":
+                self._steps.pop(entry["case"], None)
+
+    def get_cases(self) -> list[Case] | None:
+        """Get the filtered cases recorded earlier by the same robot run.
+
+        Returns:
+            The recorded cases or None if no complete search has been recorded by this run.
+        """
+        if not self._search or not self._search.get("complete") or self._search["pid"] != os.getpid() or self._search["date"] != date.today().isoformat():
+            return None
+
+        return [_case_from_entry(case_entry) for case_entry in self._search["cases"]]
+
+    def record_cases(self, cases: Iterable[Case]) -> Iterator[Case]:
+        """Record the filtered cases of the search as they are found.
+        Each case is passed on once it's on disk. The search only counts as recorded,
+        and is returned by get_cases, once all cases have been passed on.
+
+        Args:
+            cases: The filtered cases.
+
+        Yields:
+            The cases after they've been recorded.
+        """
+        entry = {"type": "search", "pid": os.getpid(), "date": date.today().isoformat(), "cases": [], "complete": False}
+        self._append(entry)
+        self._search = entry
+
+        for case in cases:
+            case_entry = _case_to_entry(case)
+            self._append({"type": "case", "case": case_entry})
+            entry["cases"].append(case_entry)
+            yield case
+
+        self._append({"type": "search_complete"})
+        entry["complete"] = True
+
+    def get_result(self, case_number: str, step: str, default: Any = None) -> Any:
+        """Get the recorded result of a completed step.
+
+        Args:
+            case_number: The case the step belongs to.
+            step: The name of the step.
+            default: The value to return if the step hasn't been completed.
+
+        Returns:
+            The result of the step or the default value.
+        """
+        with self._lock:
+            return self._steps.get(case_number, {}).get(step, default)
+
+    def record_step(self, case_number: str, step: str, result: Any = None) -> None:
+        """Record that a step of a case has been completed.
+
+        Args:
+            case_number: The case the step belongs to.
+            step: The name of the step.
+            result: The JSON serializable result of the step.
+        """
+        self._append({"type": "step", "case": case_number, "step": step, "result": result})
+        with self._lock:
+            self._steps.setdefault(case_number, {})[step] = result
+
+    def run_step(self, case_number: str, step: str, function: Callable, *args) -> Any:
+        """Run a step of a case unless it has already been completed.
+        The result of the step is recorded so it can be returned again without running the step.
+
+        Args:
+            case_number: The case the step belongs to.
+            step: The name of the step.
+            function: The function doing the step. The result must be JSON serializable.
+            *args: The arguments to the function.
+
+        Returns:
+            The result of the function, either from running it or from the journal.
+        """
+        with self._lock:
+            case_steps = self._steps.get(case_number, {})
+            if step in case_steps:
+                return case_steps[step]
+
+        result = function(*args)
+        self.record_step(case_number, step, result)
+        return result
+
+    def finish_case(self, case_number: str) -> None:
+        """Record that a case is done and forget its steps.
+
+        Args:
+            case_number: The case that is done.
+        """
+        self._append({"type": "finish", "case": case_number})
+        with self._lock:
+            self._steps.pop(case_number, None)
+
+    def clear(self) -> None:
+        """Delete the journal when the run has completed."""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._search = None
+            self._steps = {}
+
+    def _append(self, entry: dict) -> None:
+        """Append an entry to the journal file and flush it to disk.
+
+        Args:
+            entry: The JSON serializable entry.
+        """
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+
+
+# The fields of a case that are journaled.
+_JOURNALED_FIELDS = {"case_number", "deadline", "case_types"}
+
+
+def _case_to_entry(case: Case) -> dict:
+    """Get the fields of a case that are needed to handle it.
+    The status, CPR number, name and case worker are left out.
+
+    Args:
+        case: The case.
+
+    Returns:
+        The JSON serializable fields of the case.
+    """
+    return {
+        "case_number": case.case_number,
+        "deadline": case.deadline.isoformat() if case.deadline else None,
+        "case_types": case.case_types
+    }
+
+
+def _case_from_entry(case_entry: dict) -> Case:
+    """Create a case from its journaled fields. The fields that aren't journaled are None.
+
+    Args:
+        case_entry: The fields written by _case_to_entry.
+
+    Returns:
+        The case.
+    """
+    deadline = case_entry["deadline"]
+    return Case(
+        case_number=case_entry["case_number"],
+        deadline=datetime.fromisoformat(deadline) if deadline else None,
+        case_types=case_entry["case_types"],
+        status=None,
+        cpr=None,
+        name=None,
+        case_worker=None
+    )
+
+
+def load_journal(path: str = JOURNAL_PATH) -> Journal:
+    """Create and load the journal.
+
+    Args:
+        path: The file the journal is stored in.
+
+    Returns:
+        The loaded journal.
+    """
+    journal = Journal(path)
+    journal.load()
+    return journal
@@ -0,0 +1,145 @@
+"""This module profiles the WebDriver commands the robot sends to the browser.
+Every command is a round trip to the browser, so the number of commands per case
+is a good measure of how much time is spent waiting on the browser.
+
+When profiling is turned on with PROFILE_WEBDRIVER in config, each command is counted, timed
+and tagged with the function in eflyt.py that sent it and the case being handled.
+A report is logged per case and a warning is logged when a case uses more commands than
+WEBDRIVER_COMMAND_BUDGET.
+"""
+
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import inspect
+import os
+import time
+
+from selenium import webdriver
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+
+from robot_framework import config
+
+_EFLYT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eflyt.py")
+
+
+@dataclass
+class CaseProfile:
+    """The WebDriver commands sent while handling a single case."""
+    case_number: str
+    command_count: int = 0
+    seconds: float = 0
+    by_function: Counter = field(default_factory=Counter)
+    by_command: Counter = field(default_factory=Counter)
+
+    def add(self, command: str, function: str, seconds: float) -> None:
+        """Add a command to the profile.
+
+        Args:
+            command: The name of the WebDriver command.
+            function: The function in eflyt.py that sent the command.
+            seconds: The duration of the command.
+        """
+        self.command_count += 1
+        self.seconds += seconds
+        self.by_function[function] += 1
+        self.by_command[command] += 1
+
+
+# The profile of the case handled in the current thread, if any.
+_current_profile: ContextVar[CaseProfile | None] = ContextVar("current_profile", default=None)
+
+
+def attach(browser: webdriver.Chrome) -> None:
+    """Start profiling the commands of a browser if profiling is turned on.
+    Commands are only recorded while a case is being profiled with profile_case.
+
+    Args:
+        browser: The webdriver browser object.
+    """
+    if not config.PROFILE_WEBDRIVER or getattr(browser, "_profiler_attached", False):
+        return
+
+    original_execute = browser.execute
+
+    def execute(driver_command: str, params: dict | None = None) -> dict:
+        profile = _current_profile.get()
+        if profile is None:
+            return original_execute(driver_command, params)
+
+        start = time.perf_counter()
+        try:
+            return original_execute(driver_command, params)
+        finally:
+            profile.add(driver_command, _find_caller(), time.perf_counter() - start)
+
+    browser.execute = execute
+    browser._profiler_attached = True  # pylint: disable=protected-access
+
+
+def profile_case(case_number: str, orchestrator_connection: OrchestratorConnection):
+    """Profile the WebDriver commands sent while handling a case.
+    A report is logged when the case is done.
+
+    Usage:
+        with command_profiler.profile_case(case.case_number, orchestrator_connection):
+            ...
+
+    Args:
+        case_number: The case being handled.
+        orchestrator_connection: The connection to Orchestrator.
+
+    Returns:
+        A context manager. It does nothing if profiling is off.
+    """
+    if not config.PROFILE_WEBDRIVER:
+        return nullcontext()
+    return _profile_case(case_number, orchestrator_connection)
+
+
+@contextmanager
+def _profile_case(case_number: str, orchestrator_connection: OrchestratorConnection):
+    profile = CaseProfile(case_number)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        _log_profile(profile, orchestrator_connection)
+
+
+def _find_caller() -> str:
+    """Find the function in eflyt.py that sent the current command.
+
+    Returns:
+        The name of the function.
+    """
+    frame = inspect.currentframe()
+    while frame:
+        if frame.f_code.co_filename == _EFLYT_FILE:
+            return frame.f_code.co_name
+        frame = frame.f_back
+    return "(outside eflyt.py)"
+
+
+def _log_profile(profile: CaseProfile, orchestrator_connection: OrchestratorConnection) -> None:
+    """Log the report of a case and warn if the case went over the command budget.
+
+    Args:
+        profile: The profile of the case.
+        orchestrator_connection: The connection to Orchestrator.
+    """
+    by_function = ", ".join(f"{name} {count}" for name, count in profile.by_function.most_common())
+    by_command = ", ".join(f"{name} {count}" for name, count in profile.by_command.most_common())
+    orchestrator_connection.log_trace(
+        f"WebDriver commands for case {profile.case_number}: {profile.command_count} in {profile.seconds:.1f} s.\n"
+        f"By function: {by_function}\n"
+        f"By command: {by_command}"
+    )
+
+    if profile.command_count > config.WEBDRIVER_COMMAND_BUDGET:
+        orchestrator_connection.log_info(
+            f"Warning: Case {profile.case_number} used {profile.command_count} WebDriver commands, "
+            f"more than the budget of {config.WEBDRIVER_COMMAND_BUDGET}."
+        )
@@ -6,11 +6,129 @@ MAX_RETRY_COUNT = 5
 # Whether the robot should be marked as failed if MAX_RETRY_COUNT is reached.
 FAIL_ROBOT_ON_TOO_MANY_ERRORS = False
 
+# The number of logged in eFlyt sessions handling cases at the same time.
+# With a value of 1 all cases are handled one after another in a single session.
+WORKER_COUNT = 1
+
+# Whether letters are fetched straight into memory instead of being downloaded to the downloads folder.
+FETCH_LETTERS_IN_MEMORY = False
+
+# Whether a second, read-only session reads the letter and sagslog of the next cases while the main session handles a case.
+# Only used when WORKER_COUNT is 1. PREFETCH_DEPTH is the max number of read cases waiting to be handled.
+PREFETCH_NEXT_CASE = False
+PREFETCH_DEPTH = 1
+
+# Whether names read from letters are cached locally so the same letter is only parsed once.
+USE_LETTER_CACHE = True
+
+# The max number of letters kept in the letter cache and the max age of an entry in days.
+LETTER_CACHE_MAX_ENTRIES = 10_000
+LETTER_CACHE_MAX_AGE_DAYS = 90
+
+# Whether the steps of each case are timed and summarized at the end of the process.
+TIME_STEPS = False
+
+# Whether the step timing summary is also sent to the event log.
+EMIT_STEP_TIMINGS = False
+
+# Whether the WebDriver commands of each case are counted, timed and reported.
+PROFILE_WEBDRIVER = False
+
+# The number of WebDriver commands a case is expected to use at most. Cases using more are logged with a warning.
+WEBDRIVER_COMMAND_BUDGET = 150
+
+# Whether logs and queue element status changes are sent to Orchestrator in batches from a background thread.
+BUFFER_ORCHESTRATOR_WRITES = True
+
+# The rules a case from the search must pass to be handled, checked in order. Each rule has a name
+# used when logging how many cases it rejected, a type, and the arguments of the type:
+#   deadline_passed: The deadline of the case is before today.
+#   any_case_type: The case has at least one of case_types.
+#   no_case_type: The case has none of case_types.
+CASE_FILTER_RULES = (
+    {"name": "Deadline passed", "type": "deadline_passed"},
+    {"name": "Logivært or boligselskab", "type": "any_case_type", "case_types": ("Logivært", "Boligselskab")},
+    {"name": "No skipped case types", "type": "no_case_type", "case_types": (
+        "Børneflytning 1",
+        "Børneflytning 2",
+        "Børneflytning 3",
+        "Barn",
+        "Mindreårig",
+        "Sommerhus",
+        "Nordisk land"
+    )},
+)
+
+# The number of times a case is tried before it's marked as failed, when it fails with an error
+# caused by eFlyt or the browser, e.g. a stale element or a timeout. Other errors fail the case right away.
+CASE_ATTEMPTS = 3
+
+# Seconds to wait before a case is tried again. The wait doubles with each attempt.
+CASE_RETRY_DELAY = 2
+
+# Whether the number of cases handled at the same time adapts to how fast eFlyt responds,
+# and all calls to eFlyt are paused by a circuit breaker when eFlyt degrades.
+USE_LOAD_CONTROLLER = True
+
+# The normal max response time in seconds of the calls to eFlyt watched by the load controller.
+# Slower calls lower the number of cases handled at the same time.
+LOAD_LATENCY_TARGETS = {
+    "open_case": 5,
+    "change_tab": 3,
+    "send_letter_to_logivaert": 15,
+    "send_letter_to_anmelder": 15,
+}
+
+# The circuit breaker opens when this share of the last BREAKER_WINDOW calls failed or took
+# more than twice their target. It stays open for BREAKER_PAUSE seconds, doubled for each failed test call.
+BREAKER_WINDOW = 10
+BREAKER_FAILURE_RATE = 0.5
+BREAKER_PAUSE = 30
+
+# Whether cases are handled most overdue first instead of in the order of the search result.
+# Ranking needs the whole search result before the first case is handled, so it turns off
+# the streaming of cases from the search into handle_case. The two can't be used together.
+SCHEDULE_BY_DEADLINE = False
+
+# Extra days of priority by case type when cases are ranked by how overdue they are.
+# A case gets the highest priority of its case types.
+CASE_TYPE_PRIORITY_DAYS = {"Logivært": 0, "Boligselskab": 0}
+
+# The minutes a run may spend on cases. A case is only started if it's estimated to finish in time. None means no limit.
+RUN_TIME_BUDGET = None
+
+# The estimated seconds to handle a case, used until the robot has timed its own cases.
+CASE_TIME_ESTIMATE = 60
+
+# Whether browser sessions are launched with the lean profile in browser_factory instead of the default profile of eflyt_login.
+# Off until the lean profile has been compared with the default one with benchmarks/throughput_benchmark.py --profile.
+USE_LEAN_BROWSER = False
+
+# Whether the lean browser runs without a window.
+HEADLESS_BROWSER = False
+
+# Requests the lean browser blocks, as Chrome URL patterns. Fonts aren't needed to read or fill in eFlyt.
+# Images aren't blocked: the letter and template buttons are image buttons and the case tabs are an image map,
+# which can't be clicked reliably without their images.
+BLOCKED_URL_PATTERNS = (
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+)
+
+# The default number of seconds to wait for elements that load after a postback, e.g. the receiver of a letter.
+WAIT_TIMEOUT = 5
+
 # Error screenshot config
 SMTP_SERVER = "smtp.aarhuskommune.local"
 SMTP_PORT = 25
 SCREENSHOT_SENDER = "robot@friend.dk"
 
+# Seconds repeated errors are collected before they are sent as a single mail.
+ERROR_MAIL_WINDOW = 60
+
+# The max width in pixels and the number of colors of error screenshots.
+SCREENSHOT_MAX_WIDTH = 1280
+SCREENSHOT_COLORS = 256
+
 # Constant/Credential names
 ERROR_EMAIL = "Error Email"
 EFLYT_CREDS = "Eflyt2"
@@ -0,0 +1,150 @@
+"""This module waits for browser downloads to finish in a download folder.
+On Linux the folder is watched with inotify so a finished download is seen the moment it's renamed in place.
+Everywhere else the folder is polled, quickly at first and then less often.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+
+# The extension Chrome gives files while they are being downloaded.
+PARTIAL_EXTENSION = ".crdownload"
+
+# The first and the largest interval in seconds between polls when inotify isn't available.
+MIN_POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 0.5
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+
+
+class DownloadWatcher:
+    """Waits for a new finished file to appear in a download folder.
+    The watcher must be started before the download is triggered,
+    so files already in the folder are never mistaken for the download.
+
+    Usage:
+        with DownloadWatcher(folder, ".pdf") as watcher:
+            button.click()
+            file_path = watcher.wait(timeout=20)
+    """
+
+    def __init__(self, folder: str, file_extension: str):
+        """
+        Args:
+            folder: The absolute path of the download folder.
+            file_extension: The file extension of the download with the dot.
+        """
+        self.folder = folder
+        self.file_extension = file_extension
+        self._existing_files: set[str] = set()
+        self._inotify_fd: int | None = None
+
+    def __enter__(self) -> "DownloadWatcher":
+        self._inotify_fd = _start_inotify(self.folder)
+        self._existing_files = set(os.listdir(self.folder))
+        return self
+
+    def __exit__(self, *_) -> None:
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+
+    def wait(self, timeout: float) -> str:
+        """Wait for the download to finish.
+
+        Args:
+            timeout: The number of seconds to wait for the download.
+
+        Returns:
+            The absolute path to the downloaded file.
+
+        Raises:
+            TimeoutError: If the download didn't finish within the given timeout.
+        """
+        deadline = time.monotonic() + timeout
+        poll_interval = MIN_POLL_INTERVAL
+
+        while True:
+            file_path = self._find_finished_file()
+            if file_path:
+                return file_path
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Downloaded file didn't appear within {timeout} seconds.")
+
+            if self._inotify_fd is not None:
+                self._wait_for_events(remaining)
+            else:
+                time.sleep(min(poll_interval, remaining))
+                poll_interval = min(poll_interval * 2, MAX_POLL_INTERVAL)
+
+    def _find_finished_file(self) -> str | None:
+        """Look for a new file with the right extension.
+        While a new partial download is in the folder nothing is considered finished,
+        since Chrome may reserve the final file name before the download is done.
+        Partial files left in the folder by earlier downloads are ignored.
+
+        Returns:
+            The absolute path to the file if one was found.
+        """
+        new_files = [file for file in os.listdir(self.folder) if file not in self._existing_files]
+        if any(file.endswith(PARTIAL_EXTENSION) for file in new_files):
+            return None
+
+        for file in new_files:
+            if not file.endswith(self.file_extension):
+                continue
+
+            file_path = os.path.join(self.folder, file)
+            if os.path.getsize(file_path) > 0:
+                return file_path
+
+        return None
+
+    def _wait_for_events(self, timeout: float) -> None:
+        """Block until a file in the folder is renamed or closed after writing, or the timeout runs out.
+        The events are only used as a wake up call and are thrown away, the folder is checked afterwards.
+
+        Args:
+            timeout: The max number of seconds to block.
+        """
+        readable, _, _ = select.select([self._inotify_fd], [], [], timeout)
+        if readable:
+            try:
+                while os.read(self._inotify_fd, 64 * 1024):
+                    pass
+            except BlockingIOError:
+                pass
+
+
+def _start_inotify(folder: str) -> int | None:
+    """Start watching a folder with inotify.
+
+    Args:
+        folder: The absolute path of the folder to watch.
+
+    Returns:
+        The inotify file descriptor or None if inotify isn't available.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+
+    library_name = ctypes.util.find_library("c")
+    if not library_name:
+        return None
+
+    libc = ctypes.CDLL(library_name, use_errno=True)
+    fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        return None
+
+    if libc.inotify_add_watch(fd, os.fsencode(folder), _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+        os.close(fd)
+        return None
+
+    return fd
@@ -1,28 +1,43 @@
 """This module contains all logic related to the Eflyt system."""
 
-from datetime import date, timedelta
+from collections import deque
+from datetime import date, datetime, timedelta
+import base64
 import os
+from typing import TYPE_CHECKING, Iterator
 
-import pypdf
-from pypdf.errors import PyPdfError
 from selenium import webdriver
 from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support.select import Select
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
-from OpenOrchestrator.database.queues import QueueStatus
-from itk_dev_shared_components.eflyt import eflyt_case, eflyt_search
+from OpenOrchestrator.database.queues import QueueElement, QueueStatus
+from itk_dev_shared_components.eflyt import eflyt_search
 from itk_dev_shared_components.eflyt.eflyt_case import Case
-from itk_dev_shared_components.misc import file_util
 import itk_dev_event_log
 
-from robot_framework import config, letters
+from robot_framework import case_filter, command_profiler, config, letters, load_controller, step_timer, table_snapshot, tab_tracker, waits
+from robot_framework.checkpoint_journal import Journal
+from robot_framework.download_watcher import DownloadWatcher
+from robot_framework.queue_index import QueueIndex
+
+if TYPE_CHECKING:
+    from robot_framework.prefetch import Prefetcher
+
+# The folder Chrome downloads letters to when no other folder has been set on the session.
+DOWNLOAD_DIR = os.path.join(os.path.expanduser("~"), "Downloads")
+
+LETTER_TIMEOUT = 20  # Seconds to wait for a letter to download.
+
+
+# The table of search results and its columns as named in the header.
+SEARCH_TABLE_ID = "ctl00_ContentPlaceHolder2_GridViewSearchResult"
+SEARCH_COLUMNS = ("Sagsnr.", "Flyttetype", "Status", "CPR-nr.", "Navn", "Sagsbehandler")
 
 
 def filter_cases(cases: list[Case]) -> list[Case]:
-    """Filter cases from the case table.
+    """Filter cases from the case table by the rules in CASE_FILTER_RULES in config.
 
     Args:
         cases: A list of cases to filter.
@@ -30,114 +45,223 @@ def filter_cases(cases: list[Case]) -> list[Case]:
     Returns:
         A list of filtered case objects.
     """
-    case_types_to_skip = (
-        "Børneflytning 1",
-        "Børneflytning 2",
-        "Børneflytning 3",
-        "Barn",
-        "Mindreårig",
-        "Sommerhus",
-        "Nordisk land"
-    )
-
-    filtered_cases = [
-        case for case in cases
-        if case.deadline and case.deadline.date() < date.today()
-        and ("Logivært" in case.case_types or "Boligselskab" in case.case_types)
-        and not any(case_type in case_types_to_skip for case_type in case.case_types)
-    ]
-
-    return filtered_cases
-
-
-def handle_case(browser: webdriver.Chrome, case: Case, orchestrator_connection: OrchestratorConnection) -> None:
+    return list(case_filter.compile_rules().filter(cases))
+
+
+def stream_cases(browser: webdriver.Chrome, orchestrator_connection: OrchestratorConnection) -> Iterator[Case]:
+    """Read the cases from the case table and yield the relevant ones one at a time.
+    Requires a search to have been performed immediately before.
+    This reads the same cases as eflyt_search.extract_cases followed by filter_cases, but the table
+    is read in a single call to the browser and each row is only turned into a case and filtered when
+    the previous case has been handled, so the first case is handled as soon as the table is read.
+    The number of cases rejected by each filter rule is logged when all cases have been read.
+
+    Args:
+        browser: The webdriver browser object.
+        orchestrator_connection: The connection to Orchestrator.
+
+    Yields:
+        The relevant cases in the order of the table.
+
+    Raises:
+        ValueError: If a column is missing from the table.
+    """
+    headlines, rows = table_snapshot.get_table_text(browser, SEARCH_TABLE_ID)
+    orchestrator_connection.log_info(f"Total cases found: {len(rows)}")
+
+    columns = {name: headlines.index(name) for name in SEARCH_COLUMNS}
+    # eFlyt has an additional empty column before "Sagsbehandler" with no header text
+    columns["Sagsbehandler"] += 1
+    deadline_column = headlines.index("Deadline") if "Deadline" in headlines else None
+
+    # Rows are dropped as they're read so only the rows that are left are kept in memory
+    rows = deque(rows)
+    rules = case_filter.compile_rules()
+    while rows:
+        row = rows.popleft()
+        deadline_text = row[deadline_column] if deadline_column is not None else ""
+        case = Case(
+            case_number=row[columns["Sagsnr."]],
+            deadline=datetime.strptime(deadline_text, "%d-%m-%Y") if deadline_text else None,
+            case_types=row[columns["Flyttetype"]].split(", "),
+            status=row[columns["Status"]],
+            cpr=row[columns["CPR-nr."]],
+            name=row[columns["Navn"]],
+            case_worker=row[columns["Sagsbehandler"]]
+        )
+
+        if rules.matches(case):
+            yield case
+
+    orchestrator_connection.log_info(f"Relevant cases found: {rules.accepted}")
+    rules.log_rejections(orchestrator_connection)
+
+
+def handle_case(browser: webdriver.Chrome, case: Case, orchestrator_connection: OrchestratorConnection, queue_index: QueueIndex, journal: Journal, download_dir: str, prefetcher: "Prefetcher | None" = None) -> None:
     """Handle a single case with all steps included.
+    Each completed step is recorded in the journal, so a case interrupted by an error
+    is resumed at the step it got to, reusing its queue element.
 
     Args:
         browser: The webdriver browser object.
         case: The case to handle.
         orchestrator_connection: The connection to Orchestrator.
+        queue_index: The in-memory index of the queue.
+        journal: The journal of the robot's progress.
+        download_dir: The folder the browser downloads letters to.
+        prefetcher (Optional): A prefetcher that has read the letter and sagslog of the case ahead of time.
     """
-    if not check_queue(case, orchestrator_connection):
+    with command_profiler.profile_case(case.case_number, orchestrator_connection):
+        _handle_case(browser, case, orchestrator_connection, queue_index, journal, download_dir, prefetcher)
+
+
+def _handle_case(browser: webdriver.Chrome, case: Case, orchestrator_connection: OrchestratorConnection, queue_index: QueueIndex, journal: Journal, download_dir: str, prefetcher: "Prefetcher | None") -> None:
+    """Do the steps of handle_case. See handle_case for details."""
+    if not step_timer.timed(check_queue)(case, queue_index, orchestrator_connection):
         return
 
-    # Create a queue element to indicate the case is being handled
-    queue_element = orchestrator_connection.create_queue_element(config.QUEUE_NAME, reference=case.case_number)
-    orchestrator_connection.set_queue_element_status(queue_element.id, QueueStatus.IN_PROGRESS)
+    queue_element = get_queue_element(case, queue_index, journal, orchestrator_connection)
+    prefetched = prefetcher.get(case.case_number) if prefetcher else None
 
-    orchestrator_connection.log_info(f"Beginning case: {case.case_number}")
+    def open_case() -> None:
+        step_timer.timed(load_controller.controlled(eflyt_search.open_case))(browser, case.case_number)
+        tab_tracker.forget_tab(browser)
 
-    eflyt_search.open_case(browser, case.case_number)
+    def run_step(step: str, function, *args):
+        return journal.run_step(case.case_number, step, step_timer.timed(function), *args)
 
-    if not check_sagslog(browser):
-        orchestrator_connection.set_queue_element_status(queue_element.id, QueueStatus.DONE, message="Sprunget over pga. sagslog.")
+    def finish(message: str) -> None:
+        queue_index.set_status(queue_element, QueueStatus.DONE, message=message)
+        journal.finish_case(case.case_number)
+
+    # Switches to the already active tab are skipped, but the steps keep their original order:
+    # the sagslog is checked before the letter is read, and the note, check-off and deadline
+    # come before the letter to the anmelder, so a failed anmelder letter can't lead to a second rykker.
+    # If the case was prefetched the reads are already done and the case is only opened to write to it.
+    if prefetched:
+        sagslog_ok = journal.run_step(case.case_number, "check_sagslog", lambda: prefetched.sagslog_ok)
+    else:
+        open_case()
+        sagslog_ok = run_step("check_sagslog", check_sagslog, browser)
+
+    if not sagslog_ok:
         orchestrator_connection.log_info("Skipping: Activity in sagslog.")
+        finish("Sprunget over pga. sagslog.")
         return
 
-    eflyt_case.change_tab(browser, tab_index=0)
-    try:
-        letter_title, logivaert_name = get_information_from_letter(browser)
-    except PyPdfError:
-        eflyt_case.add_note(browser, "Logiværtserklæringen kunne ikke læses.")
-        orchestrator_connection.set_queue_element_status(queue_element.id, QueueStatus.DONE, message="Logiværtserklæringen kunne ikke læses.")
+    if prefetched:
+        letter_information = journal.run_step(case.case_number, "read_letter", lambda: prefetched.letter_information)
+        open_case()
+    else:
+        letter_information = run_step("read_letter", read_letter, browser, download_dir)
+
+    if letter_information is None:
+        run_step("note_unreadable_letter", tab_tracker.add_note, browser, "Logiværtserklæringen kunne ikke læses.")
+        finish("Logiværtserklæringen kunne ikke læses.")
         return
 
+    letter_title, logivaert_name = letter_information
+
     if "beboer" in letter_title:
-        eflyt_case.change_tab(browser, tab_index=1)
-        if not check_beboer(browser, logivaert_name):
-            eflyt_case.add_note(browser, f"Logiværten, {logivaert_name}, bor ikke længere på adressen, så der er ikke afsendt en automatisk rykker.")
-            orchestrator_connection.set_queue_element_status(queue_element.id, QueueStatus.DONE, message="Sprunget over da logivært ikke længere er beboer.")
+        # The beboer table is only rendered on its own tab
+        tab_tracker.change_tab(browser, tab_index=1)
+        if not run_step("check_beboer", check_beboer, browser, logivaert_name):
+            run_step("note_not_beboer", tab_tracker.add_note, browser, f"Logiværten, {logivaert_name}, bor ikke længere på adressen, så der er ikke afsendt en automatisk rykker.")
+            finish("Sprunget over da logivært ikke længere er beboer.")
             return
 
-    if send_letter_to_logivaert(browser, letter_title, logivaert_name):
-        eflyt_case.add_note(browser, f"Rykker sendt til logivært {logivaert_name}.")
-        itk_dev_event_log.emit(orchestrator_connection.process_name, "Letter sent to host.")
-    else:
-        eflyt_case.add_note(browser, f"Brev kunne ikke sendes til logivært {logivaert_name}, da de ikke er tilmeldt digital post.")
-        orchestrator_connection.set_queue_element_status(queue_element.id, QueueStatus.DONE, message="Logivært kan ikke modtage Digital Post.")
+    if not run_step("letter_to_logivaert", load_controller.controlled(send_letter_to_logivaert), browser, letter_title, logivaert_name):
+        run_step("note_logivaert_not_sent", tab_tracker.add_note, browser, f"Brev kunne ikke sendes til logivært {logivaert_name}, da de ikke er tilmeldt digital post.")
+        finish("Logivært kan ikke modtage Digital Post.")
         return
+    run_step("emit_letter_to_logivaert", itk_dev_event_log.emit, orchestrator_connection.process_name, "Letter sent to host.")
 
-    check_off_original_letter(browser)
-    change_deadline(browser)
-    eflyt_case.add_note(browser, "Deadline flyttet.")
+    run_step("note_logivaert_sent", tab_tracker.add_note, browser, f"Rykker sendt til logivært {logivaert_name}.")
+    run_step("check_off_original_letter", check_off_original_letter, browser)
+    run_step("change_deadline", change_deadline, browser)
+    run_step("note_deadline", tab_tracker.add_note, browser, "Deadline flyttet.")
 
-    if send_letter_to_anmelder(browser, case, letter_title):
-        eflyt_case.add_note(browser, "Brev sendt til anmelder.")
-        itk_dev_event_log.emit(orchestrator_connection.process_name, "Letter sent to notifier.")
+    if run_step("letter_to_anmelder", load_controller.controlled(send_letter_to_anmelder), browser, case, letter_title):
+        run_step("note_anmelder_sent", tab_tracker.add_note, browser, "Brev sendt til anmelder.")
+        run_step("emit_letter_to_anmelder", itk_dev_event_log.emit, orchestrator_connection.process_name, "Letter sent to notifier.")
     else:
-        eflyt_case.add_note(browser, "Brev kunne ikke sendes til anmelder, da de ikke er tilmeldt digital post.")
-        orchestrator_connection.set_queue_element_status(queue_element.id, QueueStatus.DONE, message="Anmelder kan ikke modtage Digital Post.")
+        run_step("note_anmelder_not_sent", tab_tracker.add_note, browser, "Brev kunne ikke sendes til anmelder, da de ikke er tilmeldt digital post.")
+        finish("Anmelder kan ikke modtage Digital Post.")
         return
 
-    orchestrator_connection.set_queue_element_status(queue_element.id, QueueStatus.DONE, message="Sag færdigbehandlet.")
+    finish("Sag færdigbehandlet.")
 
 
-def check_queue(case: Case, orchestrator_connection: OrchestratorConnection) -> bool:
-    """Check if a case has been handled before by checking the job queue i Orchestrator.
+def get_queue_element(case: Case, queue_index: QueueIndex, journal: Journal, orchestrator_connection: OrchestratorConnection) -> QueueElement:
+    """Get the queue element of a case that was interrupted earlier in the run,
+    or create a new one to indicate the case is being handled.
+
+    Args:
+        case: The case being handled.
+        queue_index: The in-memory index of the queue.
+        journal: The journal of the robot's progress.
+        orchestrator_connection: The connection to Orchestrator.
+
+    Returns:
+        The queue element of the case.
+    """
+    element_id = journal.get_result(case.case_number, "queue_element")
+    for queue_element in queue_index.get_elements(case.case_number):
+        if str(queue_element.id) == element_id:
+            orchestrator_connection.log_info(f"Resuming case: {case.case_number}")
+            return queue_element
+
+    queue_element = queue_index.create_element(case.case_number)
+    queue_index.set_status(queue_element, QueueStatus.IN_PROGRESS)
+    journal.record_step(case.case_number, "queue_element", str(queue_element.id))
+
+    orchestrator_connection.log_info(f"Beginning case: {case.case_number}")
+    return queue_element
+
+
+def check_queue(case: Case, queue_index: QueueIndex, orchestrator_connection: OrchestratorConnection) -> bool:
+    """Check if a case has been handled before by checking the index of the job queue i Orchestrator.
 
     Args:
         case: The case to check.
+        queue_index: The in-memory index of the queue.
         orchestrator_connection: The connection to Orchestrator.
 
     Return:
         bool: True if the element should be handled, False if it should be skipped.
     """
-    queue_elements = orchestrator_connection.get_queue_elements(queue_name=config.QUEUE_NAME, reference=case.case_number)
+    skip_reason = get_skip_reason(case, queue_index)
+    if skip_reason:
+        orchestrator_connection.log_info(f"Skipping: {skip_reason}")
+        return False
+
+    return True
+
+
+def get_skip_reason(case: Case, queue_index: QueueIndex) -> str | None:
+    """Get the reason a case should be skipped based on its elements in the job queue.
+
+    Args:
+        case: The case to check.
+        queue_index: The in-memory index of the queue.
+
+    Returns:
+        The reason to skip the case, or None if it should be handled.
+    """
+    queue_elements = queue_index.get_elements(case.case_number)
 
     if len(queue_elements) == 0:
-        return True
+        return None
 
     # If the case has been tried more than once before skip it
     if len(queue_elements) > 1:
-        orchestrator_connection.log_info("Skipping: Case has failed in the past.")
-        return False
+        return "Case has failed in the past."
 
     # If it has been marked as done, skip it
     if queue_elements[0].status == QueueStatus.DONE:
-        orchestrator_connection.log_info("Skipping: Case already marked as done.")
-        return False
+        return "Case already marked as done."
 
-    return True
+    return None
 
 
 def check_sagslog(browser: webdriver.Chrome) -> bool:
@@ -149,17 +273,16 @@ def check_sagslog(browser: webdriver.Chrome) -> bool:
     Returns:
         bool: True if the case should be handled, False if it should be skipped.
     """
-    eflyt_case.change_tab(browser, tab_index=2)
+    tab_tracker.change_tab(browser, tab_index=2)
 
-    sagslog_table = browser.find_element(By.ID, "ctl00_ContentPlaceHolder2_ptFanePerson_sgcPersonTab_GridViewSagslog")
-    rows = sagslog_table.find_elements(By.TAG_NAME, "tr")
+    rows = table_snapshot.get_table_rows(browser, "ctl00_ContentPlaceHolder2_ptFanePerson_sgcPersonTab_GridViewSagslog")
 
     # Remove header row
     rows.pop(0)
 
     for row in rows:
-        aktivitet = row.find_element(By.XPATH, "td[1]").text
-        handling = row.find_element(By.XPATH, "td[4]/span[1]").text
+        aktivitet = row[0].text
+        handling = row[3].get_span(0)
 
         if aktivitet == "Online svar fra borger":
             return False
@@ -170,11 +293,12 @@ def check_sagslog(browser: webdriver.Chrome) -> bool:
     return True
 
 
-def get_information_from_letter(browser: webdriver.Chrome) -> tuple[str]:
+def get_information_from_letter(browser: webdriver.Chrome, download_dir: str) -> tuple[str]:
     """Find the latest letter sent. Extract the name of the letter and the receiver from the top of the letter.
 
     Args:
         browser: The webdriver browser object.
+        download_dir: The folder the browser downloads the letter to.
 
     Returns:
         (str, str): The title of the letter and the name of the receiver.
@@ -182,40 +306,114 @@ def get_information_from_letter(browser: webdriver.Chrome) -> tuple[str]:
     Raises:
         PyPdfError: If the PDF file couldn't be read.
     """
+    # The PDF reader is only loaded once a letter is read
+    from robot_framework import letter_cache, letter_text  # pylint: disable=import-outside-toplevel
+
     last_letter = browser.find_element(By.XPATH, '(//input[contains(@id, "_imbOpgave")])[last()]')
-    last_letter.click()
 
-    dir_path = os.path.join(os.path.expanduser("~"), "Downloads")
-    file_path = file_util.wait_for_download(dir_path, file_name=None, file_extension=".pdf", timeout=20)
+    if config.FETCH_LETTERS_IN_MEMORY:
+        pdf_bytes = fetch_letter(browser, last_letter)
+    else:
+        pdf_bytes = download_letter(last_letter, download_dir)
+
+    if config.USE_LETTER_CACHE:
+        logivaert_name = letter_cache.read_top_text(pdf_bytes)
+    else:
+        logivaert_name = letter_text.read_top_text(pdf_bytes)
+
+    letter_title = last_letter.find_element(By.XPATH, "../..//span").text
+
+    return (letter_title, logivaert_name)
+
+
+def read_letter(browser: webdriver.Chrome, download_dir: str) -> tuple[str, str] | None:
+    """Read the title and receiver of the latest letter sent.
+
+    Args:
+        browser: The webdriver browser object.
+        download_dir: The folder the browser downloads the letter to.
+
+    Returns:
+        The title of the letter and the name of the receiver, or None if the PDF file couldn't be read.
+    """
+    from pypdf.errors import PyPdfError  # pylint: disable=import-outside-toplevel
 
+    tab_tracker.change_tab(browser, tab_index=0)
     try:
-        reader = pypdf.PdfReader(file_path)
-    except PyPdfError as e:
-        os.remove(file_path)
-        raise e
-
-    text_parts = []
-
-    # pylint: disable-next=unused-argument
-    def visitor(text, cm, tm, fd, fs):
-        """A visitor function that
-        extracts all non whitespace text together with the y coordinate
-        of the text.
-        """
-        y = tm[5]
-        if text.strip():
-            text = text.replace("\xa0", " ").strip()
-            text_parts.append((y, text))
-
-    reader.pages[0].extract_text(visitor_text=visitor)
+        return step_timer.timed(get_information_from_letter)(browser, download_dir)
+    except PyPdfError:
+        return None
+
+
+def download_letter(letter_button: WebElement, download_dir: str) -> bytes:
+    """Download a letter through the browser and read it into memory.
+    The downloaded file is deleted afterwards.
+
+    Args:
+        letter_button: The image button that opens the letter.
+        download_dir: The folder the browser downloads the letter to.
+
+    Returns:
+        The content of the PDF file.
+    """
+    with DownloadWatcher(download_dir, ".pdf") as watcher:
+        letter_button.click()
+        file_path = watcher.wait(timeout=LETTER_TIMEOUT)
+
+    with open(file_path, "rb") as file:
+        pdf_bytes = file.read()
     os.remove(file_path)
 
-    # Get the top most text
-    logivaert_name = sorted(text_parts)[0][1]
+    return pdf_bytes
+
+
+# Posts the form of the letter button the same way a click does and returns the response as base64.
+# The fetch runs inside the page so it reuses the session cookies.
+_FETCH_LETTER_SCRIPT = """
+const button = arguments[0];
+const done = arguments[arguments.length - 1];
+const body = new URLSearchParams(new FormData(button.form));
+body.append(button.name + ".x", "1");
+body.append(button.name + ".y", "1");
+
+fetch(button.form.action, {method: "POST", body: body, credentials: "same-origin", signal: AbortSignal.timeout(arguments[1])})
+    .then(response => {
+        const contentType = response.headers.get("Content-Type") || "";
+        if (!response.ok || !contentType.includes("pdf")) {
+            throw new Error(`Unexpected response: ${response.status} ${contentType}`);
+        }
+        return response.blob();
+    })
+    .then(blob => {
+        const reader = new FileReader();
+        reader.onload = () => done({data: reader.result.split(",")[1]});
+        reader.onerror = () => done({error: String(reader.error)});
+        reader.readAsDataURL(blob);
+    })
+    .catch(error => done({error: String(error)}));
+"""
+
+
+def fetch_letter(browser: webdriver.Chrome, letter_button: WebElement) -> bytes:
+    """Fetch a letter straight into memory without going through the downloads folder.
 
-    letter_title = last_letter.find_element(By.XPATH, "../..//span").text
+    Args:
+        browser: The webdriver browser object.
+        letter_button: The image button that opens the letter.
 
-    return (letter_title, logivaert_name)
+    Returns:
+        The content of the PDF file.
+
+    Raises:
+        RuntimeError: If the letter couldn't be fetched.
+    """
+    browser.set_script_timeout(LETTER_TIMEOUT + 5)
+    result = browser.execute_async_script(_FETCH_LETTER_SCRIPT, letter_button, LETTER_TIMEOUT * 1000)
+
+    if "error" in result:
+        raise RuntimeError(f"The letter couldn't be fetched: {result['error']}")
+
+    return base64.b64decode(result["data"])
 
 
 def check_beboer(browser: webdriver.Chrome, beboer_name: str):
@@ -229,24 +427,27 @@ def check_beboer(browser: webdriver.Chrome, beboer_name: str):
     Returns:
         True if the beboer_name is on the list.
     """
-    beboer_table = browser.find_element(By.ID, "ctl00_ContentPlaceHolder2_ptFanePerson_becPersonTab_GridViewBeboere")
-    rows = beboer_table.find_elements(By.TAG_NAME, "tr")
+    rows = table_snapshot.get_table_rows(browser, "ctl00_ContentPlaceHolder2_ptFanePerson_becPersonTab_GridViewBeboere")
     rows.pop(0)
 
     for row in rows:
-        name = row.find_element(By.XPATH, "td[3]").text
+        name = row[2].text
         if name.replace(" ", "") == beboer_name.replace(" ", ""):
             return True
 
     return False
 
 
-def clear_downloads(orchestrator_connection: OrchestratorConnection):
-    """Remove all pdf files in the downloads folder."""
+def clear_downloads(orchestrator_connection: OrchestratorConnection, dir_path: str = DOWNLOAD_DIR):
+    """Remove all pdf files in the downloads folder.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+        dir_path: The folder to clear. Defaults to the user's downloads folder.
+    """
     delete_count = 0
     error_count = 0
 
-    dir_path = os.path.join(os.path.expanduser("~"), "Downloads")
     for file in os.listdir(dir_path):
         if file.endswith(".pdf"):
             file_path = os.path.join(dir_path, file)
@@ -270,7 +471,7 @@ def send_letter_to_anmelder(browser: webdriver.Chrome, case: Case, original_lett
     Returns:
         bool: True if the letter was sent.
     """
-    eflyt_case.change_tab(browser, tab_index=3)
+    tab_tracker.change_tab(browser, tab_index=3)
 
     click_letter_template(browser, "- Logivært svarer ikke - brev til anmelder - partshø")
 
@@ -319,7 +520,7 @@ def send_letter_to_logivaert(browser: webdriver.Chrome, original_letter: str, lo
     Raises:
         ValueError: If the correct letter template couldn't be found.
     """
-    eflyt_case.change_tab(browser, tab_index=3)
+    tab_tracker.change_tab(browser, tab_index=3)
 
     # Pick the correct letter template
     if "beboer" in original_letter and "manuel" in original_letter:
@@ -358,7 +559,7 @@ def check_off_original_letter(browser: webdriver.Chrome) -> None:
     Args:
         browser: The webdriver browser object.
     """
-    eflyt_case.change_tab(browser, tab_index=0)
+    tab_tracker.change_tab(browser, tab_index=0)
     opgave_table = browser.find_element(By.ID, "ctl00_ContentPlaceHolder2_ptFanePerson_moPersonTab_gvManuelOpfolgning")
     check_box = opgave_table.find_element(By.XPATH, "(//input[contains(@id, '_chkSvarmodtaget')])[last()]")
     check_box.click()
@@ -370,7 +571,7 @@ def change_deadline(browser: webdriver.Chrome) -> None:
     Args:
         browser: The webdriver browser object.
     """
-    eflyt_case.change_tab(browser, tab_index=0)
+    tab_tracker.change_tab(browser, tab_index=0)
 
     new_deadline = (date.today() + timedelta(days=14)).strftime("%d-%m-%Y")
 
@@ -391,13 +592,11 @@ def click_letter_template(browser: webdriver.Chrome, letter_name: str):
     Raises:
         ValueError: If the letter wasn't found in the list.
     """
-    letter_table = browser.find_element(By.ID, "ctl00_ContentPlaceHolder2_ptFanePerson_bcPersonTab_GridViewBreveNew")
-    rows = letter_table.find_elements(By.TAG_NAME, "tr")
+    rows = table_snapshot.get_table_rows(browser, "ctl00_ContentPlaceHolder2_ptFanePerson_bcPersonTab_GridViewBreveNew")
 
     for row in rows:
-        text = row.find_element(By.XPATH, "td[2]").text
-        if text == letter_name:
-            row.find_element(By.XPATH, "td[1]/input").click()
+        if len(row) > 1 and row[1].text == letter_name:
+            row[0].get_input().click()
             return
 
     raise ValueError(f"Template with the name '{letter_name}' was not found.")
@@ -435,36 +634,35 @@ def select_letter_receiver(browser: webdriver.Chrome, receiver_name: str) -> Non
         ValueError: If the given name isn't found in the select options.
         ValueError: If the given name doesn't match the static label.
     """
-    # Check if there is a select for the receiver name
-    try:
-        # Wait for the dropdown to be present
-        name_select_element = WebDriverWait(browser, 2).until(
-            EC.presence_of_element_located((By.ID, "ctl00_ContentPlaceHolder2_ptFanePerson_bcPersonTab_ddlModtager"))
-        )
-        name_select = Select(name_select_element)
+    def dropdown_ready(driver: webdriver.Chrome) -> Select | bool:
+        elements = driver.find_elements(By.ID, "ctl00_ContentPlaceHolder2_ptFanePerson_bcPersonTab_ddlModtager")
+        if elements:
+            name_select = Select(elements[0])
+            # The dropdown is ready when it has more than one option
+            if len(name_select.options) > 1:
+                return name_select
+        return False
 
-        # Wait until the dropdown has more than one option
-        WebDriverWait(browser, 2).until(lambda browser: len(name_select.options) > 1)
+    # Wait for either a select or a label for the receiver name
+    try:
+        found, element = waits.wait_for_any(browser, {
+            "dropdown": dropdown_ready,
+            "label": waits.element_present("ctl00_ContentPlaceHolder2_ptFanePerson_bcPersonTab_lblModtagerName")
+        }, "letter_receiver")
+    except TimeoutException as exc:
+        raise ValueError("Receiver dropdown or name label did not load in time.") from exc
 
-        for i, option in enumerate(name_select.options):
+    if found == "dropdown":
+        for i, option in enumerate(element.options):
             if receiver_name.replace(" ", "") in option.text.replace(" ", ""):
-                name_select.select_by_index(i)
+                element.select_by_index(i)
                 return
 
         raise ValueError(f"'{receiver_name}' wasn't found on the list of possible receivers.")
 
-    except TimeoutException:
-        pass  # Continue to the next check if the dropdown is not found
-
     # If there's simply a label for the receiver, check if the name matches
-    try:
-        name_label = WebDriverWait(browser, 2).until(
-            EC.presence_of_element_located((By.ID, "ctl00_ContentPlaceHolder2_ptFanePerson_bcPersonTab_lblModtagerName"))
-        )
-        if receiver_name.replace(" ", "") not in name_label.text.replace(" ", ""):
-            raise ValueError(f"'{receiver_name}' didn't match the predefined receiver.")
-    except TimeoutException as exc:
-        raise ValueError("Receiver name label did not load in time.") from exc
+    if receiver_name.replace(" ", "") not in element.text.replace(" ", ""):
+        raise ValueError(f"'{receiver_name}' didn't match the predefined receiver.")
 
 
 def check_digital_post_warning(browser: webdriver.Chrome) -> bool:
@@ -477,5 +675,12 @@ def check_digital_post_warning(browser: webdriver.Chrome) -> bool:
     Returns:
         bool: True if the warning has appeared.
     """
-    warning_text = browser.find_elements(By.XPATH, "//font[@color='red']")
-    return len(warning_text) != 0 and "Dokumentet skal sendes manuelt" in warning_text[0].text
+    # Wait no longer for the warning than the browser's implicit wait did
+    try:
+        _, warning_text = waits.wait_for_any(browser, {
+            "warning": lambda driver: driver.find_elements(By.XPATH, "//font[@color='red']")
+        }, "digital_post_warning", timeout=waits.IMPLICIT_WAIT)
+    except TimeoutException:
+        return False
+
+    return "Dokumentet skal sendes manuelt" in warning_text[0].text
@@ -1,45 +1,284 @@
-"""This module has functionality to send error screenshots via smtp."""
+"""This module has functionality to send error screenshots via smtp.
 
-import smtplib
+Error mails are sent from a background thread so the robot isn't blocked by the mail server.
+Errors with the same signature, i.e. the same process, error type and place in the code,
+are collected for ERROR_MAIL_WINDOW seconds and sent as a single mail.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
 from email.message import EmailMessage
-import base64
+import atexit
+import html
+import queue
+import threading
+import time
 import traceback
 from io import BytesIO
-
-from PIL import ImageGrab
+from typing import TYPE_CHECKING
 
 from robot_framework import config
 
+if TYPE_CHECKING:
+    import smtplib
+    from selenium import webdriver
+    from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+
+
+@dataclass
+class _ErrorMail:  # pylint: disable=too-many-instance-attributes
+    """An error mail collecting all occurrences of an error signature within the window."""
+    to_address: str | list[str]
+    process_name: str
+    error_type: str
+    error_message: str
+    trace: str
+    screenshot: bytes | None
+    first_seen: float
+    occurrences: list[datetime] = field(default_factory=list)
+    orchestrator_connection: "OrchestratorConnection | None" = None
+
+
+class ErrorMailer:
+    """Sends error mails from a background thread over a single reused SMTP connection."""
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self._pending: dict[tuple, _ErrorMail] = {}
+        self._smtp: "smtplib.SMTP | None" = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def report(self, to_address: str | list[str], exception: Exception, process_name: str, screenshot: bytes | None,
+               orchestrator_connection: "OrchestratorConnection | None" = None) -> None:
+        """Queue an error to be mailed. This returns right away.
+
+        Args:
+            to_address: Email address or list of addresses to send the error report.
+            exception: The exception that triggered the error.
+            process_name: Name of the process from OpenOrchestrator.
+            screenshot: A PNG screenshot, if any.
+            orchestrator_connection (Optional): The connection a failure to send the mail is logged to.
+        """
+        frames = traceback.extract_tb(exception.__traceback__)
+        place = (frames[-1].filename, frames[-1].lineno) if frames else None
+        signature = (process_name, type(exception).__name__, place)
+
+        mail = _ErrorMail(
+            to_address=to_address,
+            process_name=process_name,
+            error_type=type(exception).__name__,
+            error_message=str(exception),
+            trace="".join(traceback.format_exception(exception)),
+            screenshot=screenshot,
+            first_seen=time.monotonic(),
+            occurrences=[datetime.now()],
+            orchestrator_connection=orchestrator_connection
+        )
+
+        self._start()
+        self._queue.put((signature, mail))
+
+    def flush(self) -> None:
+        """Send all collected mails now and wait until they are sent."""
+        if not self._thread:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self) -> None:
+        """Send all collected mails and close the SMTP connection."""
+        import smtplib  # pylint: disable=import-outside-toplevel
+
+        self.flush()
+        with self._lock:
+            if self._smtp:
+                try:
+                    self._smtp.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self._smtp = None
+
+    def _start(self) -> None:
+        """Start the background thread if it isn't running."""
+        with self._lock:
+            if self._thread:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True, name="error_mailer")
+            self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        """Collect reported errors and send them when their window ends."""
+        while True:
+            due_times = [mail.first_seen + config.ERROR_MAIL_WINDOW for mail in self._pending.values()]
+            timeout = max(0, min(due_times) - time.monotonic()) if due_times else None
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, threading.Event):
+                self._send_due(send_all=True)
+                item.set()
+                continue
+
+            if item:
+                signature, mail = item
+                if signature in self._pending:
+                    self._pending[signature].occurrences.extend(mail.occurrences)
+                else:
+                    self._pending[signature] = mail
+
+            self._send_due(send_all=False)
+
+    def _send_due(self, send_all: bool) -> None:
+        """Send the mails whose window has ended.
+
+        Args:
+            send_all: Whether to send all mails regardless of their window.
+        """
+        now = time.monotonic()
+        for signature, mail in list(self._pending.items()):
+            if send_all or now >= mail.first_seen + config.ERROR_MAIL_WINDOW:
+                del self._pending[signature]
+                try:
+                    self._send(_create_message(mail))
+                # A failing mail server must not stop the thread or the robot.
+                # pylint: disable-next = broad-exception-caught
+                except Exception as exc:
+                    if mail.orchestrator_connection:
+                        mail.orchestrator_connection.log_error(f"Error screenshot of {mail.error_type} couldn't be sent: {exc!r}")
+
+    def _send(self, msg: EmailMessage) -> None:
+        """Send a message on the open SMTP connection.
+        The connection is opened again if the server has closed it.
+
+        Args:
+            msg: The message to send.
+        """
+        import smtplib  # pylint: disable=import-outside-toplevel
+
+        with self._lock:
+            try:
+                self._get_smtp().send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                self._smtp = None
+                self._get_smtp().send_message(msg)
+
+    def _get_smtp(self) -> "smtplib.SMTP":
+        """Get an open SMTP connection, reusing the existing one if it's still alive.
+        The connection is always upgraded with STARTTLS, since screenshots contain personal data.
+
+        Returns:
+            The SMTP connection.
+        """
+        import smtplib  # pylint: disable=import-outside-toplevel
+
+        if self._smtp:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp.close()
+
+        self._smtp = smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT, timeout=30)
+        self._smtp.starttls()
+        return self._smtp
 
-def send_error_screenshot(to_address: str | list[str], exception: Exception, process_name: str):
-    """Sends an email with an error report, including a screenshot, when an exception occurs.
-    Configuration details such as SMTP server, port, sender email, etc., should be set in 'config' module.
+
+def send_error_screenshot(to_address: str | list[str], exception: Exception, process_name: str, browser: "webdriver.Chrome | None" = None,
+                          orchestrator_connection: "OrchestratorConnection | None" = None):
+    """Sends an email with an error report, including a screenshot of the browser, when an exception occurs.
+    The screenshot is taken right away, but the mail is sent in the background and
+    merged with repeated errors. Configuration details such as SMTP server, port,
+    sender email, etc., should be set in 'config' module.
 
     Args:
         to_address: Email address or list of addresses to send the error report.
         exception: The exception that triggered the error.
         process_name: Name of the process from OpenOrchestrator.
+        browser (Optional): The browser the error happened in. Defaults to the browser of the main session.
+        orchestrator_connection (Optional): The connection a failure to send the mail is logged to.
+    """
+    mailer.report(to_address, exception, process_name, take_screenshot(browser), orchestrator_connection)
+
+
+def take_screenshot(browser: "webdriver.Chrome | None" = None) -> bytes | None:
+    """Take a screenshot of the robot's browser.
+
+    Args:
+        browser (Optional): The browser to take a screenshot of. Defaults to the browser of the main session.
+
+    Returns:
+        The screenshot as PNG, or None if there's no browser that responds.
+    """
+    from robot_framework.session_manager import sessions  # pylint: disable=import-outside-toplevel
+
+    browser = browser or sessions.peek()
+    if not browser:
+        return None
+
+    try:
+        return browser.get_screenshot_as_png()
+    # A dead browser raises connection errors instead of WebDriverExceptions.
+    # pylint: disable-next = broad-exception-caught
+    except Exception:
+        return None
+
+
+def compress_screenshot(png: bytes) -> bytes:
+    """Downscale a screenshot to SCREENSHOT_MAX_WIDTH and reduce it to SCREENSHOT_COLORS colors.
+    Browser screenshots are mostly flat colors and text, which a palette PNG keeps sharp and small.
+
+    Args:
+        png: The screenshot as PNG.
+
+    Returns:
+        The compressed screenshot as PNG.
+    """
+    from PIL import Image  # pylint: disable=import-outside-toplevel
+
+    image = Image.open(BytesIO(png)).convert("RGB")
+    if image.width > config.SCREENSHOT_MAX_WIDTH:
+        height = round(image.height * config.SCREENSHOT_MAX_WIDTH / image.width)
+        image = image.resize((config.SCREENSHOT_MAX_WIDTH, height), Image.LANCZOS)
+
+    buffer = BytesIO()
+    image.quantize(config.SCREENSHOT_COLORS).save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def _create_message(mail: _ErrorMail) -> EmailMessage:
+    """Create the mail of an error with the screenshot as an attachment.
+
+    Args:
+        mail: The error and its occurrences.
+
+    Returns:
+        The message ready to send.
     """
-    # Create message
     msg = EmailMessage()
-    msg['to'] = to_address
+    msg['to'] = mail.to_address
     msg['from'] = config.SCREENSHOT_SENDER
-    msg['subject'] = f"Error screenshot: {process_name}"
+    subject = f"Error screenshot: {mail.process_name}"
+    if len(mail.occurrences) > 1:
+        subject += f" ({len(mail.occurrences)} times)"
+    msg['subject'] = subject
 
-    # Take screenshot and convert to base64
-    screenshot = ImageGrab.grab()
-    buffer = BytesIO()
-    screenshot.save(buffer, format='PNG')
-    screenshot_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    times = ", ".join(occurrence.strftime("%H:%M:%S") for occurrence in mail.occurrences)
 
-    # Create an HTML message with the exception and screenshot
+    # Create an HTML message with the exception
     html_message = f"""
     <html>
         <body>
-            <p>Error type: {type(exception).__name__}</p>
-            <p>Error message: {exception}</p>
-            <p>{traceback.format_exc()}</p>
-            <img src="data:image/png;base64,{screenshot_base64}" alt="Screenshot">
+            <p>Error type: {html.escape(mail.error_type)}</p>
+            <p>Error message: {html.escape(mail.error_message)}</p>
+            <p>Occurred {len(mail.occurrences)} time(s): {times}</p>
+            <pre>{html.escape(mail.trace)}</pre>
         </body>
     </html>
     """
@@ -47,7 +286,11 @@ def send_error_screenshot(to_address: str | list[str], exception: Exception, pro
     msg.set_content("Please enable HTML to view this message.")
     msg.add_alternative(html_message, subtype='html')
 
-    # Send message
-    with smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT) as smtp:
-        smtp.starttls()
-        smtp.send_message(msg)
+    if mail.screenshot:
+        msg.add_attachment(compress_screenshot(mail.screenshot), maintype="image", subtype="png", filename="screenshot.png")
+
+    return msg
+
+
+# The error mailer of the robot, shared by all error handlers.
+mailer = ErrorMailer()
@@ -1,19 +1,24 @@
 """This module contains various functions and classes to handle errors in the framework."""
 
 import traceback
+from typing import TYPE_CHECKING
 
 from OpenOrchestrator.database.queues import QueueElement, QueueStatus
 from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
 
+from robot_framework import buffered_orchestrator
 from robot_framework import config
-from robot_framework import error_screenshot
+
+if TYPE_CHECKING:
+    from selenium import webdriver
 
 
 class BusinessError(Exception):
     """An empty exception used to identify errors caused by breaking business rules"""
 
 
-def handle_error(message: str, error: Exception, queue_element: QueueElement | None, orchestrator_connection: OrchestratorConnection) -> None:
+def handle_error(message: str, error: Exception, queue_element: QueueElement | None, orchestrator_connection: OrchestratorConnection,
+                 browser: "webdriver.Chrome | None" = None) -> None:
     """Handles an error caught during the process.
     Logs an error to OpenOrchestrator.
     Marks the queue element (if any) as failed.
@@ -24,14 +29,18 @@ def handle_error(message: str, error: Exception, queue_element: QueueElement | N
         error: The exception that should be handled.
         queue_element: The queue element to fail, if any.
         orchestrator_connection: A connection to OpenOrchestrator.
+        browser (Optional): The browser the error happened in. Defaults to the browser of the main session.
     """
+    # The screenshot and mail dependencies are only loaded when an error happens
+    from robot_framework import error_screenshot  # pylint: disable=import-outside-toplevel
+
     error_msg = f"{message}: {repr(error)}\n\nTrace:\n{traceback.format_exc()}"
     error_email = orchestrator_connection.get_constant(config.ERROR_EMAIL).value
 
     orchestrator_connection.log_error(error_msg)
     if queue_element:
         orchestrator_connection.set_queue_element_status(queue_element.id, QueueStatus.FAILED, error_msg)
-    error_screenshot.send_error_screenshot(error_email, error, orchestrator_connection.process_name)
+    error_screenshot.send_error_screenshot(error_email, error, orchestrator_connection.process_name, browser, orchestrator_connection)
 
 
 def log_exception(orchestrator_connection: OrchestratorConnection) -> callable:
@@ -52,5 +61,6 @@ def log_exception(orchestrator_connection: OrchestratorConnection) -> callable:
             f"Trace:\n{trace}"
         ]
         orchestrator_connection.log_error("\n".join(lines))
+        buffered_orchestrator.flush(orchestrator_connection)
 
     return inner
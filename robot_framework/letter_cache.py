@@ -0,0 +1,143 @@
+"""This module contains a persistent local cache of the names read from letters.
+Letters are keyed by a hash of their content so the same letter is only parsed once
+across retries and runs.
+"""
+
+from contextlib import closing
+import hashlib
+import os
+import sqlite3
+import time
+
+from pypdf.errors import PyPdfError
+
+from robot_framework import config, letter_text
+
+# The SQLite file the cache is stored in.
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".eflyt_letter_cache.sqlite3")
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS letters (
+    key TEXT PRIMARY KEY,
+    logivaert_name TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+
+def get_key(pdf_bytes: bytes) -> str:
+    """Get the cache key of a letter.
+
+    Args:
+        pdf_bytes: The content of the PDF file.
+
+    Returns:
+        The hex encoded sha256 hash of the content.
+    """
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def read_top_text(pdf_bytes: bytes, cache_path: str = CACHE_PATH) -> str:
+    """Read the text at the top of a letter, using the cache when the letter has been read before.
+    Letters that couldn't be read are cached as well and raise the same error again.
+    If the cache itself can't be used the letter is simply parsed.
+
+    Args:
+        pdf_bytes: The content of the PDF file.
+        cache_path: The SQLite file of the cache.
+
+    Returns:
+        The text at the top of the letter.
+
+    Raises:
+        PyPdfError: If the PDF file couldn't be read.
+    """
+    key = get_key(pdf_bytes)
+
+    try:
+        entry = _get_entry(cache_path, key)
+    except sqlite3.Error:
+        return letter_text.read_top_text(pdf_bytes)
+
+    if entry:
+        logivaert_name, error = entry
+        if error is not None:
+            raise PyPdfError(error)
+        return logivaert_name
+
+    try:
+        logivaert_name = letter_text.read_top_text(pdf_bytes)
+    except PyPdfError as exc:
+        _try_put_entry(cache_path, key, None, str(exc))
+        raise
+
+    _try_put_entry(cache_path, key, logivaert_name, None)
+    return logivaert_name
+
+
+def _connect(cache_path: str) -> sqlite3.Connection:
+    """Open a connection to the cache and make sure the table exists.
+    A new connection is opened per call so the cache is safe to use from several threads.
+
+    Args:
+        cache_path: The SQLite file of the cache.
+
+    Returns:
+        The open connection.
+    """
+    connection = sqlite3.connect(cache_path, timeout=10)
+    connection.execute(_CREATE_TABLE)
+    return connection
+
+
+def _get_entry(cache_path: str, key: str) -> tuple[str | None, str | None] | None:
+    """Look up a letter in the cache and mark it as used.
+    Entries older than the max age are ignored.
+
+    Args:
+        cache_path: The SQLite file of the cache.
+        key: The cache key of the letter.
+
+    Returns:
+        The cached name and error message, or None if the letter isn't cached.
+    """
+    now = time.time()
+    with closing(_connect(cache_path)) as connection:
+        with connection:
+            entry = connection.execute(
+                "SELECT logivaert_name, error FROM letters WHERE key = ? AND created >= ?",
+                (key, now - config.LETTER_CACHE_MAX_AGE_DAYS * 86400)
+            ).fetchone()
+            if entry:
+                connection.execute("UPDATE letters SET last_used = ? WHERE key = ?", (now, key))
+        return entry
+
+
+def _try_put_entry(cache_path: str, key: str, logivaert_name: str | None, error: str | None) -> None:
+    """Store a letter in the cache and evict old entries.
+    Entries older than the max age are removed and only the most recently used entries are kept.
+    Errors from the cache are ignored since the result has already been read.
+
+    Args:
+        cache_path: The SQLite file of the cache.
+        key: The cache key of the letter.
+        logivaert_name: The name read from the letter, if any.
+        error: The error message if the letter couldn't be read.
+    """
+    now = time.time()
+    try:
+        with closing(_connect(cache_path)) as connection:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO letters (key, logivaert_name, error, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, logivaert_name, error, now, now)
+                )
+                connection.execute("DELETE FROM letters WHERE created < ?", (now - config.LETTER_CACHE_MAX_AGE_DAYS * 86400,))
+                connection.execute(
+                    "DELETE FROM letters WHERE key NOT IN (SELECT key FROM letters ORDER BY last_used DESC LIMIT ?)",
+                    (config.LETTER_CACHE_MAX_ENTRIES,)
+                )
+    except sqlite3.Error:
+        pass
@@ -0,0 +1,450 @@
+"""This module extracts text from the PDF letters sent from eFlyt.
+
+The name of the receiver is the top most text run on the first page. pypdf's text
+extraction parses and decodes the whole page to find it, which is slow. Instead the
+content stream is scanned with a light tokenizer that only tracks the text matrix.
+Each text block (BT ... ET) gets the lowest y coordinate it can reach, and only the
+blocks that can hold the top most run are handed to pypdf for decoding. Everything
+else is reduced to the state operators pypdf reacts to (fonts, leading etc.) so the
+blocks that are decoded see the same state as in the full page.
+
+Files with content the tokenizer doesn't handle fall back to pypdf on the full page.
+"""
+
+from dataclasses import dataclass
+from io import BytesIO
+import re
+
+import pypdf
+from pypdf.errors import PdfReadError
+from pypdf.generic import DecodedStreamObject, NameObject
+
+# Whitespace is left out of the pattern so finditer skips it. Comments match without a group.
+_TOKEN = re.compile(
+    rb"(?P<string>\((?:[^()\\]|\\.)*\))"
+    rb"|(?P<nested>\()"
+    rb"|(?P<operand><[0-9A-Fa-f\x00\t\n\x0c\r ]*>|<<|>>|[\[\]]|/[^\x00\t\n\x0c\r ()<>\[\]{}/%]*)"
+    rb"|(?P<number>[+-]?(?:\d+\.?\d*|\.\d+)(?![^\x00\t\n\x0c\r ()<>\[\]{}/%]))"
+    rb"|(?P<word>[^\x00\t\n\x0c\r ()<>\[\]{}/%]+)"
+    rb"|(?P<invalid>[){}])"
+    rb"|%[^\r\n]*",
+    re.DOTALL
+)
+
+_LITERALS = (b"true", b"false", b"null")
+_TEXT_SHOWING = (b"Tj", b"TJ", b"'", b'"')
+_POSITIONING = (b"Td", b"TD", b"Tm", b"T*")
+# Outside the decoded blocks only the operators pypdf's text extraction reacts to are kept.
+# Repeated state setters are collapsed to the last one, the rest are kept in order.
+_STATE_SETTERS = (b"Tf", b"TL", b"Tw", b"Tz")
+_STATE_STACK = (b"q", b"Q", b"cm")
+
+
+class _UnsupportedContent(Exception):
+    """Raised when the content stream has something the fast path doesn't handle."""
+
+
+@dataclass
+class _Operation:
+    """An operator in the content stream with its numeric operands and byte span."""
+    operator: bytes
+    numbers: list[bytes]
+    start: int
+    end: int
+
+
+@dataclass
+class _TextBlock:
+    """A BT ... ET block with the lowest y coordinate of the text matrix inside it."""
+    first: int
+    last: int
+    min_y: float | None
+
+
+def read_top_text(pdf_bytes: bytes) -> str:
+    """Read the top most text on the first page of a letter.
+    In the letters from eFlyt this is the name of the receiver.
+
+    Args:
+        pdf_bytes: The content of the PDF file.
+
+    Returns:
+        The top most text on the first page.
+
+    Raises:
+        PyPdfError: If the PDF file couldn't be read or the first page has no text.
+    """
+    page = pypdf.PdfReader(BytesIO(pdf_bytes)).pages[0]
+
+    try:
+        top_run = _find_top_run_fast(page)
+    except _UnsupportedContent:
+        top_run = _find_top_run(page)
+
+    if top_run is None:
+        return _find_first_line(page)
+
+    return top_run[1]
+
+
+def _find_top_run(page: pypdf.PageObject) -> tuple[float, str] | None:
+    """Find the text run with the lowest y coordinate in the text matrix using pypdf.
+    Only the current best run is kept while scanning, and runs below it
+    are skipped before their text is cleaned.
+    Ties are broken by the text itself so the result is the same as
+    sorting all (y, text) pairs and taking the first.
+
+    Args:
+        page: The page to scan.
+
+    Returns:
+        The y coordinate and text of the top most run or None if the page had no text.
+    """
+    best_y: float | None = None
+    best_text = ""
+
+    # pylint: disable-next=unused-argument
+    def visitor(text, cm, tm, fd, fs):
+        """A visitor function that keeps the top most non whitespace text."""
+        nonlocal best_y, best_text
+        y = tm[5]
+        if best_y is not None and y > best_y:
+            return
+
+        if text.strip():
+            text = text.replace("\xa0", " ").strip()
+            if best_y is None or (y, text) < (best_y, best_text):
+                best_y, best_text = y, text
+
+    page.extract_text(visitor_text=visitor)
+
+    if best_y is None:
+        return None
+    return (best_y, best_text)
+
+
+def _find_top_run_fast(page: pypdf.PageObject) -> tuple[float, str] | None:
+    """Find the top most text run by decoding only the text blocks that can hold it.
+    Blocks are added in order of their lowest y coordinate until a run is found.
+    Then every block that could tie or beat that run is added before the final decode.
+
+    Args:
+        page: The page to scan. Its content is replaced while scanning.
+
+    Returns:
+        The y coordinate and text of the top most run or None if the page had no text.
+
+    Raises:
+        _UnsupportedContent: If the page has content the fast path doesn't handle.
+    """
+    _check_xobjects(page)
+
+    contents = page.get_contents()
+    if contents is None:
+        return None
+    data = contents.get_data()
+
+    operations = _scan_operations(data)
+    blocks = _find_text_blocks(operations)
+    order = sorted((block for block in blocks if block.min_y is not None), key=lambda block: block.min_y)
+
+    selected = set()
+    index = 0
+    while index < len(order):
+        # Add the next block together with any blocks tied with it
+        lowest = order[index].min_y
+        while index < len(order) and order[index].min_y <= lowest:
+            selected.add(order[index].first)
+            index += 1
+
+        top_run = _decode_blocks(page, data, operations, blocks, selected)
+        if top_run is None:
+            continue
+
+        contenders = [block.first for block in order[index:] if block.min_y <= top_run[0]]
+        if contenders:
+            selected.update(contenders)
+            top_run = _decode_blocks(page, data, operations, blocks, selected)
+
+        return top_run
+
+    return None
+
+
+def _check_xobjects(page: pypdf.PageObject) -> None:
+    """Make sure the page has no form XObjects, since pypdf reports their text
+    at the text matrix of the surrounding content.
+
+    Raises:
+        _UnsupportedContent: If the page has form XObjects or inherited resources.
+    """
+    if "/Resources" not in page:
+        raise _UnsupportedContent()
+
+    xobjects = page["/Resources"].get_object().get("/XObject")
+    if xobjects is None:
+        return
+
+    for xobject in xobjects.get_object().values():
+        if xobject.get_object().get("/Subtype") != "/Image":
+            raise _UnsupportedContent()
+
+
+def _scan_operations(data: bytes) -> list[_Operation]:
+    """Split a content stream into operations.
+    Only numeric operands are kept since they are all the text matrix needs.
+    They are kept as bytes and only converted for the operators that use them.
+
+    Args:
+        data: The decoded content stream.
+
+    Returns:
+        The operations in the stream.
+
+    Raises:
+        _UnsupportedContent: If the stream has inline images or can't be tokenized.
+    """
+    operations = []
+    numbers = []
+    start = None
+    pos = 0
+
+    while pos is not None:
+        matches = _TOKEN.finditer(data, pos)
+        pos = None
+
+        for match in matches:
+            kind = match.lastgroup
+
+            if kind == "word" and match.group() not in _LITERALS:
+                operator = match.group()
+                if operator == b"BI":
+                    raise _UnsupportedContent()
+                operations.append(_Operation(operator, numbers, match.start() if start is None else start, match.end()))
+                numbers = []
+                start = None
+                continue
+
+            if kind is None:
+                continue
+            if kind == "invalid":
+                raise _UnsupportedContent()
+            if kind == "number":
+                numbers.append(match.group())
+            if start is None:
+                start = match.start()
+
+            # Strings with nested parentheses are skipped by hand and the scan restarts after them
+            if kind == "nested":
+                pos = _skip_string(data, match.start())
+                break
+
+    return operations
+
+
+def _skip_string(data: bytes, pos: int) -> int:
+    """Find the end of a literal string with balanced parentheses and escapes.
+
+    Args:
+        data: The content stream.
+        pos: The position of the opening parenthesis.
+
+    Returns:
+        The position right after the closing parenthesis.
+
+    Raises:
+        _UnsupportedContent: If the string is never closed.
+    """
+    depth = 0
+    while pos < len(data):
+        char = data[pos]
+        if char == 0x5C:  # A backslash escapes the next byte
+            pos += 1
+        elif char == 0x28:
+            depth += 1
+        elif char == 0x29:
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        pos += 1
+
+    raise _UnsupportedContent()
+
+
+def _find_text_blocks(operations: list[_Operation]) -> list[_TextBlock]:
+    """Find the text blocks and track the text matrix the same way pypdf does.
+
+    Args:
+        operations: The operations in the content stream.
+
+    Returns:
+        The text blocks in the order they appear.
+
+    Raises:
+        _UnsupportedContent: If text is shown outside a block or before it has been positioned.
+    """
+    blocks = []
+    block_start = None
+    positioned = False
+    min_y = None
+    tm = [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+    leading = 0.0
+    leading_stack = []
+
+    for i, operation in enumerate(operations):
+        operator, numbers = operation.operator, operation.numbers
+
+        if operator == b"BT":
+            if block_start is not None:
+                raise _UnsupportedContent()
+            block_start, positioned, min_y = i, False, None
+            tm = [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+            continue
+
+        if operator == b"ET":
+            if block_start is None:
+                raise _UnsupportedContent()
+            blocks.append(_TextBlock(block_start, i, min_y))
+            block_start = None
+            continue
+
+        if operator == b"q":
+            leading_stack.append(leading)
+        elif operator == b"Q" and leading_stack:
+            leading = leading_stack.pop()
+        elif operator == b"TL":
+            leading = _operands(numbers, 1)[0]
+
+        if operator not in _POSITIONING and operator not in _TEXT_SHOWING:
+            continue
+
+        showing = operator in (b"Tj", b"TJ")
+        if block_start is None or (showing and not positioned):
+            raise _UnsupportedContent()
+        if showing:
+            continue
+
+        leading = _move_text_matrix(tm, operator, numbers, leading)
+        positioned = True
+        min_y = tm[5] if min_y is None else min(min_y, tm[5])
+
+    if block_start is not None:
+        raise _UnsupportedContent()
+
+    return blocks
+
+
+def _move_text_matrix(tm: list[float], operator: bytes, numbers: list[bytes], leading: float) -> float:
+    """Update the text matrix in place for a positioning operator.
+    The arithmetic is the same as pypdf's so the y coordinates match exactly.
+
+    Args:
+        tm: The text matrix to update.
+        operator: The positioning operator or ' or ".
+        numbers: The numeric operands of the operator.
+        leading: The current text leading.
+
+    Returns:
+        The text leading after the operator.
+    """
+    if operator == b"Tm":
+        tm[:] = _operands(numbers, 6)
+    elif operator in (b"Td", b"TD"):
+        tx, ty = _operands(numbers, 2)
+        if operator == b"TD":
+            leading = -ty
+        tm[4] += tx * tm[0] + ty * tm[2]
+        tm[5] += tx * tm[1] + ty * tm[3]
+    else:
+        # T*, ' and " all move to the next line
+        if operator == b'"':
+            _operands(numbers, 2)
+        tm[5] -= leading
+
+    return leading
+
+
+def _operands(numbers: list[bytes], count: int) -> list[float]:
+    """Convert the numeric operands of an operator and check the count.
+
+    Raises:
+        _UnsupportedContent: If the operator has an unexpected number of numeric operands.
+    """
+    if len(numbers) != count:
+        raise _UnsupportedContent()
+    return [float(number) for number in numbers]
+
+
+def _decode_blocks(page: pypdf.PageObject, data: bytes, operations: list[_Operation],
+                   blocks: list[_TextBlock], selected: set[int]) -> tuple[float, str] | None:
+    """Let pypdf decode a copy of the content where only the selected text blocks are kept whole.
+
+    Args:
+        page: The page to decode. Its content is replaced.
+        data: The original content stream.
+        operations: The operations in the content stream.
+        blocks: All text blocks in the content stream.
+        selected: The index of the first operation of each text block to keep whole.
+
+    Returns:
+        The y coordinate and text of the top most run in the selected blocks or None.
+    """
+    kept = set()
+    for block in blocks:
+        if block.first in selected:
+            kept.update(range(block.first, block.last + 1))
+
+    parts = []
+    pending: dict[bytes, bytes] = {}
+    for i, operation in enumerate(operations):
+        operator = operation.operator
+        if i in kept or operator in _STATE_STACK:
+            parts.extend(pending.values())
+            pending.clear()
+            parts.append(data[operation.start:operation.end])
+        elif operator in _STATE_SETTERS:
+            pending[operator] = data[operation.start:operation.end]
+        elif operator == b"TD":
+            pending[b"TL"] = _number(-float(operation.numbers[1])) + b" TL"
+        elif operator == b'"':
+            pending[b"Tw"] = operation.numbers[0] + b" Tw"
+    parts.extend(pending.values())
+
+    stream = DecodedStreamObject()
+    stream.set_data(b"\n".join(parts))
+    page[NameObject("/Contents")] = stream
+
+    return _find_top_run(page)
+
+
+def _number(value: float) -> bytes:
+    """Write a number so pypdf reads back the exact same float.
+
+    Raises:
+        _UnsupportedContent: If the number can only be written in scientific notation.
+    """
+    text = repr(value)
+    if "e" in text or "n" in text:
+        raise _UnsupportedContent()
+    return text.encode()
+
+
+def _find_first_line(page: pypdf.PageObject) -> str:
+    """Fallback for unusual files where no text run was found.
+    Use the first non empty line of pypdf's plain text extraction.
+
+    Args:
+        page: The page to read.
+
+    Returns:
+        The first line of text on the page.
+
+    Raises:
+        PdfReadError: If the page has no text at all.
+    """
+    for line in page.extract_text().splitlines():
+        line = line.replace("\xa0", " ").strip()
+        if line:
+            return line
+
+    raise PdfReadError("No text was found on the first page of the letter.")
@@ -8,18 +8,24 @@ import sys
 from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
 
 from robot_framework import initialize
-from robot_framework import reset
 from robot_framework.exceptions import BusinessError, handle_error, log_exception
-from robot_framework import process
 from robot_framework import config
+from robot_framework.buffered_orchestrator import BufferedOrchestratorConnection
 
 
 def main():
     """The entry point for the framework. Should be called as the first thing when running the robot."""
     orchestrator_connection = OrchestratorConnection.create_connection_from_args()
+    if config.BUFFER_ORCHESTRATOR_WRITES:
+        orchestrator_connection = BufferedOrchestratorConnection(orchestrator_connection)
     sys.excepthook = log_exception(orchestrator_connection)
 
     orchestrator_connection.log_trace("Robot Framework started.")
+
+    # The process and its browser dependencies are imported after the exception hook
+    # is in place, so startup is fast and import errors are logged in Orchestrator.
+    from robot_framework import process, reset  # pylint: disable=import-outside-toplevel
+
     initialize.initialize(orchestrator_connection)
 
     error_count = 0
@@ -41,7 +47,7 @@ def main():
             handle_error(f"Process Error #{error_count}", error, None, orchestrator_connection)
 
     reset.clean_up(orchestrator_connection)
-    # reset.close_all(orchestrator_connection)
+    reset.close_all(orchestrator_connection)
     # reset.kill_all(orchestrator_connection)
 
     if config.FAIL_ROBOT_ON_TOO_MANY_ERRORS and error_count == config.MAX_RETRY_COUNT:
@@ -0,0 +1,298 @@
+"""This module keeps the robot from overloading eFlyt by watching how eFlyt responds.
+
+The calls that load eFlyt the most, opening a case, changing tab and sending letters,
+are timed and their errors counted. The number of cases handled at the same time is
+controlled like TCP congestion control (AIMD): it's raised slowly while calls are fast
+and halved when a call is slower than its target in LOAD_LATENCY_TARGETS or fails
+with a transient error.
+
+If too many of the recent calls fail or are far over their target, a circuit breaker
+opens and every session waits for a pause before a single call is let through to test
+eFlyt. The breaker closes again if that call succeeds, and the pause doubles if it doesn't.
+
+Every change of state is logged, and a summary is logged at the end of the process.
+The controller is turned on with USE_LOAD_CONTROLLER in config.
+"""
+
+from collections import deque
+from contextlib import contextmanager, nullcontext
+import functools
+import threading
+import time
+from typing import Callable
+
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+
+from robot_framework import config
+from robot_framework.transient_errors import is_transient
+
+# The factor the limit is multiplied by when eFlyt is slow or fails.
+DECREASE_FACTOR = 0.5
+
+# Seconds after a decrease where further slow calls don't lower the limit again,
+# so calls that were already running when eFlyt slowed down only count once.
+DECREASE_COOLDOWN = 5
+
+# A call counts as failed by the circuit breaker when it's this many times slower than its target.
+SLOW_CALL_FACTOR = 2
+
+# The max pause of the circuit breaker as a multiple of BREAKER_PAUSE.
+MAX_PAUSE_FACTOR = 8
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class LoadController:  # pylint: disable=too-many-instance-attributes
+    """Limits the number of cases handled at the same time and pauses all calls to eFlyt when it degrades.
+    The controller is safe to share between threads.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        self._orchestrator_connection: OrchestratorConnection | None = None
+        self._reset(1)
+
+    def _reset(self, max_limit: int) -> None:
+        """Reset the limit, the circuit breaker and the statistics."""
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.state = CLOSED
+        self._window: deque[bool] = deque()
+        self._open_until = 0.0
+        self._pause = 0.0
+        self._probing = False
+        self._last_decrease = 0.0
+        self.stats = {"calls": 0, "errors": 0, "slow": 0, "decreases": 0, "trips": 0, "waited": 0.0, "min_limit": self.limit}
+
+    def start(self, orchestrator_connection: OrchestratorConnection, max_limit: int) -> None:
+        """Reset the controller for a new run.
+
+        Args:
+            orchestrator_connection: The connection state changes are logged to.
+            max_limit: The max number of cases handled at the same time, e.g. the number of sessions.
+        """
+        with self._condition:
+            self._orchestrator_connection = orchestrator_connection
+            self._reset(max(1, max_limit))
+            self._condition.notify_all()
+
+    @contextmanager
+    def case_slot(self):
+        """Wait until a case can be started and hold its place while in the context."""
+        with self._condition:
+            wait_start = time.monotonic()
+            while self.in_flight >= int(self.limit) or self.state == OPEN:
+                self._condition.wait(self._get_wait_time())
+                self._update_breaker()
+            self.stats["waited"] += time.monotonic() - wait_start
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def controlled(self, function: Callable) -> Callable:
+        """Wrap a function that calls eFlyt so it waits for the circuit breaker and its latency and errors are recorded.
+
+        Args:
+            function: The function to wrap.
+
+        Returns:
+            The wrapped function.
+        """
+        target = config.LOAD_LATENCY_TARGETS.get(function.__name__, max(config.LOAD_LATENCY_TARGETS.values()))
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            # A call made inside another controlled call, e.g. a tab change while sending a letter, is part of the outer call
+            if getattr(self._local, "in_call", False):
+                return function(*args, **kwargs)
+
+            probe = self._wait_for_breaker()
+            self._local.in_call = True
+            call_start = time.perf_counter()
+            error = None
+            try:
+                return function(*args, **kwargs)
+            except Exception as exc:
+                error = exc
+                raise
+            finally:
+                self._local.in_call = False
+                self._record(function.__name__, time.perf_counter() - call_start, target, error, probe)
+        return wrapper
+
+    def _wait_for_breaker(self) -> bool:
+        """Wait until the circuit breaker lets a call through.
+
+        Returns:
+            True if the call is the single test call of a half-open breaker.
+        """
+        with self._condition:
+            wait_start = time.monotonic()
+            while True:
+                self._update_breaker()
+                if self.state == CLOSED:
+                    break
+                if self.state == HALF_OPEN and not self._probing:
+                    self._probing = True
+                    break
+                self._condition.wait(self._get_wait_time())
+            self.stats["waited"] += time.monotonic() - wait_start
+            return self.state == HALF_OPEN
+
+    def _record(self, name: str, seconds: float, target: float, error: Exception | None, probe: bool) -> None:
+        """Update the limit and the circuit breaker with the result of a call.
+
+        Args:
+            name: The name of the function called.
+            seconds: The duration of the call.
+            target: The latency target of the call.
+            error: The error raised by the call, if any.
+            probe: Whether the call was the test call of a half-open breaker.
+        """
+        # Errors caused by the case, e.g. a missing letter template, say nothing about the load on eFlyt
+        failed = error is not None and is_transient(error)
+        slow = seconds > target
+
+        with self._condition:
+            self.stats["calls"] += 1
+            self.stats["errors"] += failed
+            self.stats["slow"] += slow
+
+            if failed or slow:
+                self._decrease(f"{name} {'failed' if failed else 'was slow'} ({seconds:.1f} s)")
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+            broken = failed or seconds > target * SLOW_CALL_FACTOR
+            if probe:
+                self._probing = False
+                if broken:
+                    self._trip(f"the test call to {name} {'failed' if failed else f'took {seconds:.1f} s'}")
+                else:
+                    self._close()
+            elif self.state == CLOSED:
+                self._window.append(broken)
+                while len(self._window) > config.BREAKER_WINDOW:
+                    self._window.popleft()
+                if len(self._window) == config.BREAKER_WINDOW and sum(self._window) >= config.BREAKER_FAILURE_RATE * config.BREAKER_WINDOW:
+                    self._trip(f"{sum(self._window)} of the last {config.BREAKER_WINDOW} calls failed or were too slow")
+
+            self._condition.notify_all()
+
+    def _decrease(self, reason: str) -> None:
+        """Lower the limit unless it was lowered within the cooldown."""
+        now = time.monotonic()
+        if now - self._last_decrease < DECREASE_COOLDOWN or self.limit <= 1:
+            return
+        self._last_decrease = now
+        self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+        self.stats["decreases"] += 1
+        self.stats["min_limit"] = min(self.stats["min_limit"], self.limit)
+        self._log(f"Load limit lowered to {int(self.limit)} parallel cases: {reason}.")
+
+    def _trip(self, reason: str) -> None:
+        """Open the circuit breaker. The pause doubles with each trip in a row."""
+        self._pause = min(self._pause * 2, config.BREAKER_PAUSE * MAX_PAUSE_FACTOR) if self._pause else config.BREAKER_PAUSE
+        self._open_until = time.monotonic() + self._pause
+        self.state = OPEN
+        self.stats["trips"] += 1
+        self._log(f"Circuit breaker opened for {self._pause:.0f} s: {reason}.")
+
+    def _close(self) -> None:
+        """Close the circuit breaker after a successful test call."""
+        self.state = CLOSED
+        self._pause = 0.0
+        self._window.clear()
+        self._log("Circuit breaker closed: eFlyt responds normally again.")
+
+    def _update_breaker(self) -> None:
+        """Let the breaker go from open to half-open when the pause is over."""
+        if self.state == OPEN and time.monotonic() >= self._open_until:
+            self.state = HALF_OPEN
+            self._log("Circuit breaker half-open: testing eFlyt with a single call.")
+
+    def _get_wait_time(self) -> float | None:
+        """Get the seconds until the breaker's pause is over, or None if waiting for another thread."""
+        if self.state == OPEN:
+            return max(0.0, self._open_until - time.monotonic())
+        return None
+
+    def _log(self, message: str) -> None:
+        if self._orchestrator_connection:
+            self._orchestrator_connection.log_info(message)
+
+    def get_summary(self) -> str:
+        """Get a summary of the run.
+
+        Returns:
+            The summary as a single line.
+        """
+        with self._condition:
+            stats = dict(self.stats)
+            return (f"Load controller: {stats['calls']} calls, {stats['errors']} transient errors, {stats['slow']} slow calls. "
+                    f"Limit {int(self.limit)} of {self.max_limit} parallel cases (lowest {int(stats['min_limit'])}, lowered {stats['decreases']} times). "
+                    f"Circuit breaker {self.state}, opened {stats['trips']} times, {stats['waited']:.0f} s waited in total.")
+
+
+def controlled(function: Callable) -> Callable:
+    """Wrap a function that calls eFlyt with the load controller if it's turned on.
+
+    Usage:
+        load_controller.controlled(eflyt_search.open_case)(browser, case_number)
+
+    Args:
+        function: The function to wrap.
+
+    Returns:
+        The wrapped function, or the function itself if the controller is off.
+    """
+    if not config.USE_LOAD_CONTROLLER:
+        return function
+    return controller.controlled(function)
+
+
+def case_slot():
+    """Wait until a case can be started if the controller is turned on.
+
+    Usage:
+        with load_controller.case_slot():
+            eflyt.handle_case(...)
+
+    Returns:
+        A context manager holding the case's place.
+    """
+    if not config.USE_LOAD_CONTROLLER:
+        return nullcontext()
+    return controller.case_slot()
+
+
+def start(orchestrator_connection: OrchestratorConnection, max_limit: int) -> None:
+    """Reset the controller for a new run.
+
+    Args:
+        orchestrator_connection: The connection state changes are logged to.
+        max_limit: The max number of cases handled at the same time.
+    """
+    controller.start(orchestrator_connection, max_limit)
+
+
+def log_summary(orchestrator_connection: OrchestratorConnection) -> None:
+    """Log a summary of the controller's run if it's turned on.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+    """
+    if config.USE_LOAD_CONTROLLER:
+        orchestrator_connection.log_info(controller.get_summary())
+
+
+# The load controller of the robot shared by all sessions.
+controller = LoadController()
@@ -0,0 +1,154 @@
+"""This module reads the next cases ahead of the main session in a second, read-only session.
+While the main session handles a case, the prefetch session opens the following cases,
+reads their letter and checks their sagslog. The main session then only has to open a case to write to it,
+and cases the sagslog rules out are finished without being opened in the main session at all.
+
+The prefetch session never writes to a case, so a prefetch that fails or falls behind
+only means the main session does the reads itself.
+"""
+
+from dataclasses import dataclass
+import os
+import queue
+import threading
+
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+from OpenOrchestrator.database.constants import Credential
+from itk_dev_shared_components.eflyt import eflyt_search
+from itk_dev_shared_components.eflyt.eflyt_case import Case
+
+from robot_framework import config, eflyt, load_controller, step_timer, tab_tracker
+from robot_framework.queue_index import QueueIndex
+from robot_framework.session_manager import is_alive, sessions
+
+# Marks the end of the prefetched cases.
+_DONE = None
+
+
+@dataclass
+class PrefetchResult:
+    """The read-only information of a case read by the prefetch session."""
+    position: int
+    case_number: str
+    letter_information: tuple[str, str] | None = None
+    sagslog_ok: bool = True
+    error: Exception | None = None
+
+
+class Prefetcher:  # pylint: disable=too-many-instance-attributes
+    """Reads cases ahead of the main session in a background thread.
+    The results are handed over in the order of the cases through a bounded queue,
+    so the prefetch session is never more than PREFETCH_DEPTH cases ahead.
+
+    Usage:
+        with Prefetcher(cases, credentials, orchestrator_connection, queue_index) as prefetcher:
+            for case in cases:
+                eflyt.handle_case(..., prefetcher=prefetcher)
+    """
+
+    def __init__(self, cases: list[Case], credentials: Credential, orchestrator_connection: OrchestratorConnection, queue_index: QueueIndex):
+        """
+        Args:
+            cases: The cases the main session will handle, in order.
+            credentials: The eFlyt credentials used to log in the prefetch session.
+            orchestrator_connection: The connection to Orchestrator.
+            queue_index: The in-memory index of the queue.
+        """
+        self.cases = cases
+        self.credentials = credentials
+        self.orchestrator_connection = orchestrator_connection
+        self.queue_index = queue_index
+        self.download_dir = os.path.join(eflyt.DOWNLOAD_DIR, "eflyt_prefetch")
+
+        self._positions = {case.case_number: i for i, case in enumerate(cases)}
+        self._results: queue.Queue[PrefetchResult | None] = queue.Queue(maxsize=config.PREFETCH_DEPTH)
+        self._next: PrefetchResult | None = None
+        self._finished = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="eflyt_prefetch")
+
+    def __enter__(self) -> "Prefetcher":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self._stop.set()
+        # Unblock the thread if it's waiting for room in the queue
+        while self._thread.is_alive():
+            try:
+                self._results.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    def get(self, case_number: str) -> PrefetchResult | None:
+        """Get the prefetched information of a case, waiting for it if the prefetch session is still reading it.
+        Results of cases the main session has passed are thrown away.
+
+        Args:
+            case_number: The case the main session is handling.
+
+        Returns:
+            The result of the case, or None if it wasn't prefetched or the prefetch failed.
+        """
+        position = self._positions.get(case_number)
+        if position is None:
+            return None
+
+        while True:
+            if self._next is None:
+                if self._finished:
+                    return None
+                self._next = self._results.get()
+                if self._next is _DONE:
+                    self._finished = True
+                    return None
+
+            if self._next.position > position:
+                return None
+
+            result, self._next = self._next, None
+            if result.position == position:
+                return None if result.error else result
+
+    def _run(self) -> None:
+        """Read the cases in order on the prefetch session until all are read or the prefetcher is closed."""
+        try:
+            os.makedirs(self.download_dir, exist_ok=True)
+            browser = sessions.get_browser(self.credentials, self.orchestrator_connection, slot="prefetch")
+            browser.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": self.download_dir})
+
+            for position, case in enumerate(self.cases):
+                if self._stop.is_set():
+                    break
+                if eflyt.get_skip_reason(case, self.queue_index):
+                    continue
+
+                result = PrefetchResult(position, case.case_number)
+                try:
+                    step_timer.timed(load_controller.controlled(eflyt_search.open_case))(browser, case.case_number)
+                    tab_tracker.forget_tab(browser)
+                    result.sagslog_ok = eflyt.check_sagslog(browser)
+                    # Cases ruled out by the sagslog are skipped before their letter is read, like in the main session
+                    if result.sagslog_ok:
+                        result.letter_information = eflyt.read_letter(browser, self.download_dir)
+                # The main session reads the case itself if the prefetch fails.
+                # pylint: disable-next = broad-exception-caught
+                except Exception as error:
+                    result.error = error
+
+                self._results.put(result)
+
+                if not config.FETCH_LETTERS_IN_MEMORY:
+                    eflyt.clear_downloads(self.orchestrator_connection, self.download_dir)
+
+                # Stop prefetching if the session no longer responds
+                if result.error and not is_alive(browser):
+                    self.orchestrator_connection.log_trace(f"Prefetch session stopped responding: {result.error!r}")
+                    break
+
+        # A failed prefetch session only means the main session does the reads itself.
+        # pylint: disable-next = broad-exception-caught
+        except Exception as error:
+            self.orchestrator_connection.log_trace(f"Prefetch session failed: {error!r}")
+
+        self._results.put(_DONE)
@@ -1,13 +1,19 @@
 """This module contains the main process of the robot."""
 
 import os
+from contextlib import nullcontext
 from datetime import date
 
 from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
-from itk_dev_shared_components.eflyt import eflyt_login, eflyt_search
+from itk_dev_shared_components.eflyt import eflyt_search
 import itk_dev_event_log
 
-from robot_framework import eflyt
+from robot_framework import case_retry, config, eflyt, load_controller, step_timer, waits, worker_pool
+from robot_framework.checkpoint_journal import load_journal
+from robot_framework.prefetch import Prefetcher
+from robot_framework.queue_index import load_queue_index
+from robot_framework.scheduler import scheduler
+from robot_framework.session_manager import sessions
 
 
 def process(orchestrator_connection: OrchestratorConnection) -> None:
@@ -17,21 +23,55 @@ def process(orchestrator_connection: OrchestratorConnection) -> None:
     event_log = orchestrator_connection.get_constant("Event Log")
     itk_dev_event_log.setup_logging(event_log.value)
 
+    # The time budget of the run starts before the search, which counts towards it
+    scheduler.start(orchestrator_connection)
+
+    orchestrator_connection.log_trace("Loading queue elements")
+    queue_index = load_queue_index(orchestrator_connection)
+    orchestrator_connection.log_trace(f"{len(queue_index)} queue elements loaded.")
+
+    journal = load_journal()
+
     orchestrator_connection.log_trace("Logging in to eflyt")
     credentials = orchestrator_connection.get_credential("Eflyt")
-    browser = eflyt_login.login(credentials.username, credentials.password)
+    browser = sessions.get_browser(credentials, orchestrator_connection)
+
+    cases = journal.get_cases()
+    if cases is None:
+        orchestrator_connection.log_trace("Searching cases")
+        eflyt_search.search(browser, case_state="I gang", case_status="Svarfrist overskredet", to_date=date.today())
+
+        # Cases are handed to handle_case as they're read from the search result
+        cases = journal.record_cases(eflyt.stream_cases(browser, orchestrator_connection))
+    else:
+        orchestrator_connection.log_info(f"Relevant cases loaded from journal: {len(cases)}")
+
+    if config.SCHEDULE_BY_DEADLINE:
+        # Ranking reads the whole search result first, so cases are no longer streamed
+        cases = scheduler.rank(cases)
+    elif config.WORKER_COUNT > 1 or config.PREFETCH_NEXT_CASE:
+        # The workers and the prefetch session need all cases up front
+        cases = list(cases)
 
-    orchestrator_connection.log_trace("Searching cases")
-    eflyt_search.search(browser, case_state="I gang", case_status="Svarfrist overskredet", to_date=date.today())
+    load_controller.start(orchestrator_connection, config.WORKER_COUNT)
 
-    cases = eflyt_search.extract_cases(browser)
-    orchestrator_connection.log_info(f"Total cases found: {len(cases)}")
-    cases = eflyt.filter_cases(cases)
-    orchestrator_connection.log_info(f"Relevant cases found: {len(cases)}")
+    try:
+        if config.WORKER_COUNT > 1:
+            worker_pool.run_workers(cases, credentials, config.WORKER_COUNT, orchestrator_connection, queue_index, journal)
+        else:
+            prefetcher = Prefetcher(cases, credentials, orchestrator_connection, queue_index) if config.PREFETCH_NEXT_CASE else None
+            with prefetcher or nullcontext():
+                for case in scheduler.schedule(cases, queue_index):
+                    browser = case_retry.handle_case(browser, case, credentials, orchestrator_connection, queue_index, journal, eflyt.DOWNLOAD_DIR, prefetcher=prefetcher)
+                    if not config.FETCH_LETTERS_IN_MEMORY:
+                        eflyt.clear_downloads(orchestrator_connection)
+    finally:
+        step_timer.log_summary(orchestrator_connection)
+        waits.log_summary(orchestrator_connection)
+        load_controller.log_summary(orchestrator_connection)
+        scheduler.finish(orchestrator_connection)
 
-    for case in cases:
-        eflyt.handle_case(browser, case, orchestrator_connection)
-        eflyt.clear_downloads(orchestrator_connection)
+    journal.clear()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,104 @@
+"""This module contains an in-memory index of the robot's queue elements in Orchestrator."""
+
+import threading
+
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+from OpenOrchestrator.database.queues import QueueElement, QueueStatus
+
+from robot_framework import config
+
+# The number of queue elements fetched per database query when loading the index.
+PAGE_SIZE = 1000
+
+
+class QueueIndex:
+    """An in-memory copy of the queue's elements keyed by reference.
+    All queue elements are loaded in bulk once and the index is kept up to date
+    as elements are created and their status changes.
+    The index is safe to share between threads.
+    """
+
+    def __init__(self, orchestrator_connection: OrchestratorConnection, queue_name: str):
+        """
+        Args:
+            orchestrator_connection: The connection to Orchestrator.
+            queue_name: The name of the queue to index.
+        """
+        self.orchestrator_connection = orchestrator_connection
+        self.queue_name = queue_name
+        self._elements: dict[str, list[QueueElement]] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """Load all elements in the queue from Orchestrator, page by page."""
+        elements: dict[str, list[QueueElement]] = {}
+        offset = 0
+        while True:
+            page = self.orchestrator_connection.get_queue_elements(queue_name=self.queue_name, offset=offset, limit=PAGE_SIZE)
+            for element in page:
+                elements.setdefault(element.reference, []).append(element)
+
+            if len(page) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+
+        with self._lock:
+            self._elements = elements
+
+    def get_elements(self, reference: str) -> list[QueueElement]:
+        """Get the queue elements with the given reference.
+
+        Args:
+            reference: The reference to look up.
+
+        Returns:
+            A list of the queue elements with the reference, newest first.
+        """
+        with self._lock:
+            return list(self._elements.get(reference, []))
+
+    def create_element(self, reference: str) -> QueueElement:
+        """Create a new queue element in Orchestrator and add it to the index.
+
+        Args:
+            reference: The reference of the new queue element.
+
+        Returns:
+            The created queue element.
+        """
+        element = self.orchestrator_connection.create_queue_element(self.queue_name, reference=reference)
+        with self._lock:
+            self._elements.setdefault(reference, []).insert(0, element)
+        return element
+
+    def set_status(self, element: QueueElement, status: QueueStatus, message: str | None = None) -> None:
+        """Set the status of a queue element in Orchestrator and in the index.
+
+        Args:
+            element: The queue element to update.
+            status: The new status of the queue element.
+            message (Optional): The message to attach to the queue element.
+        """
+        self.orchestrator_connection.set_queue_element_status(element.id, status, message)
+        with self._lock:
+            element.status = status
+            if message is not None:
+                element.message = message
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(elements) for elements in self._elements.values())
+
+
+def load_queue_index(orchestrator_connection: OrchestratorConnection) -> QueueIndex:
+    """Create and load an index of the robot's queue.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+
+    Returns:
+        The loaded queue index.
+    """
+    queue_index = QueueIndex(orchestrator_connection, config.QUEUE_NAME)
+    queue_index.load()
+    return queue_index
@@ -2,32 +2,37 @@
 
 from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
 
-from robot_framework import eflyt
+from robot_framework import buffered_orchestrator, eflyt, error_screenshot
+from robot_framework.session_manager import sessions
 
 
 def reset(orchestrator_connection: OrchestratorConnection) -> None:
-    """Clean up, close/kill all programs and start them again. """
+    """Clean up and close any browser sessions that no longer respond.
+    Healthy sessions are kept open so the process can reuse them.
+    """
     orchestrator_connection.log_trace("Resetting.")
     clean_up(orchestrator_connection)
-    # close_all(orchestrator_connection)
-    # kill_all(orchestrator_connection)
-    # open_all(orchestrator_connection)
+    sessions.close_broken(orchestrator_connection)
 
 
 def clean_up(orchestrator_connection: OrchestratorConnection) -> None:
     """Do any cleanup needed to leave a blank slate."""
     orchestrator_connection.log_trace("Doing cleanup.")
     eflyt.clear_downloads(orchestrator_connection)
+    buffered_orchestrator.flush(orchestrator_connection)
 
 
 def close_all(orchestrator_connection: OrchestratorConnection) -> None:
     """Gracefully close all applications used by the robot."""
     orchestrator_connection.log_trace("Closing all applications.")
+    error_screenshot.mailer.close()
+    sessions.close_all()
 
 
 def kill_all(orchestrator_connection: OrchestratorConnection) -> None:
     """Forcefully close all applications used by the robot."""
     orchestrator_connection.log_trace("Killing all applications.")
+    sessions.kill_all()
 
 
 def open_all(orchestrator_connection: OrchestratorConnection) -> None:
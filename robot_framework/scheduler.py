@@ -0,0 +1,175 @@
+"""This module decides the order cases are handled in and when to stop within the run's time budget.
+
+When SCHEDULE_BY_DEADLINE in config is set, cases are ranked so the most overdue are handled
+first. A case type can be given extra days of priority in CASE_TYPE_PRIORITY_DAYS. When RUN_TIME_BUDGET in config is set,
+a new case is only started if the estimated time of a case fits in what's left of the
+budget, so the run stops cleanly between cases instead of being cut off in the middle of one.
+
+The estimate is a moving average of the time of the cases handled, carried over between
+runs in a small state file. The cases left when the budget runs out are logged and saved
+in the state file, and reported again at the start of the next run.
+"""
+
+from datetime import date, datetime
+import json
+import os
+import threading
+import time
+from typing import Iterable, Iterator
+
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+from itk_dev_shared_components.eflyt.eflyt_case import Case
+
+from robot_framework import config, eflyt
+from robot_framework.queue_index import QueueIndex
+
+# The file the case time estimate and the skipped cases are stored in between runs.
+STATE_PATH = os.path.join(os.path.expanduser("~"), ".eflyt_schedule.json")
+
+# The weight of the latest case in the moving average of the case time.
+ESTIMATE_WEIGHT = 0.2
+
+# A case is only started if this many times the estimated case time is left of the budget.
+SAFETY_FACTOR = 1.5
+
+
+class CaseScheduler:
+    """Ranks the cases of a run and hands them out while there's time left in the budget.
+    The scheduler is safe to share between threads.
+    """
+
+    def __init__(self, state_path: str = STATE_PATH):
+        """
+        Args:
+            state_path: The file the state is stored in between runs.
+        """
+        self.state_path = state_path
+        self.case_seconds = float(config.CASE_TIME_ESTIMATE)
+        self.skipped: list[str] = []
+        self._deadline: float | None = None
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self, orchestrator_connection: OrchestratorConnection) -> None:
+        """Start the time budget and load the state of the last run.
+        The budget is started by the first call only, so retries of the process share it.
+
+        Args:
+            orchestrator_connection: The connection to Orchestrator.
+        """
+        if self._started:
+            return
+        self._started = True
+
+        if config.RUN_TIME_BUDGET:
+            self._deadline = time.monotonic() + config.RUN_TIME_BUDGET * 60
+
+        state = self._load_state()
+        self.case_seconds = state.get("case_seconds", self.case_seconds)
+        if state.get("skipped"):
+            orchestrator_connection.log_info(f"The run on {state['date']} ran out of time before {len(state['skipped'])} cases: {', '.join(state['skipped'])}")
+
+    def rank(self, cases: Iterable[Case]) -> list[Case]:
+        """Sort cases by how many days they are overdue, plus the priority days of their case types.
+        Cases with the same rank keep their order.
+
+        Args:
+            cases: The cases to rank.
+
+        Returns:
+            The cases, most urgent first.
+        """
+        today = date.today()
+        priorities = config.CASE_TYPE_PRIORITY_DAYS
+
+        def urgency(case: Case) -> int:
+            overdue = (today - case.deadline.date()).days if case.deadline else 0
+            return overdue + max((priorities.get(case_type, 0) for case_type in case.case_types), default=0)
+
+        return sorted(cases, key=urgency, reverse=True)
+
+    def schedule(self, cases: Iterable[Case], queue_index: QueueIndex) -> Iterator[Case]:
+        """Yield the cases as long as the next case is estimated to fit in the budget.
+        The time until the next case is requested is recorded as the time of the case.
+        Cases that will be skipped because of the queue are yielded without a check.
+
+        Args:
+            cases: The cases in the order to handle them.
+            queue_index: The in-memory index of the queue.
+
+        Yields:
+            The cases to handle.
+        """
+        cases = iter(cases)
+        for case in cases:
+            if eflyt.get_skip_reason(case, queue_index):
+                yield case
+                continue
+
+            if not self.has_time():
+                remaining = [c.case_number for c in (case, *cases) if not eflyt.get_skip_reason(c, queue_index)]
+                with self._lock:
+                    self.skipped.extend(remaining)
+                return
+
+            start = time.monotonic()
+            yield case
+            self._record(time.monotonic() - start)
+
+    def has_time(self) -> bool:
+        """Check if the estimated time of a case is left of the budget.
+
+        Returns:
+            True if another case can be started.
+        """
+        if self._deadline is None:
+            return True
+        with self._lock:
+            return self._deadline - time.monotonic() >= self.case_seconds * SAFETY_FACTOR
+
+    def finish(self, orchestrator_connection: OrchestratorConnection) -> None:
+        """Log the cases left when the budget ran out and save the state for the next run.
+        Nothing is saved when scheduling is off. An error saving the state is logged instead of raised,
+        so it doesn't hide an error of the run.
+
+        Args:
+            orchestrator_connection: The connection to Orchestrator.
+        """
+        if not config.SCHEDULE_BY_DEADLINE and not config.RUN_TIME_BUDGET:
+            return
+        with self._lock:
+            skipped = list(self.skipped)
+            self.skipped.clear()
+            case_seconds = self.case_seconds
+
+        if skipped:
+            orchestrator_connection.log_info(f"The time budget of {config.RUN_TIME_BUDGET} minutes ran out before {len(skipped)} cases. "
+                                             f"They're handled by the next run: {', '.join(skipped)}")
+
+        try:
+            self._save_state({"date": datetime.now().isoformat(timespec="minutes"), "case_seconds": case_seconds, "skipped": skipped})
+        except OSError as exc:
+            orchestrator_connection.log_error(f"The schedule state couldn't be saved to {self.state_path}: {exc!r}")
+
+    def _record(self, seconds: float) -> None:
+        """Add the time of a case to the moving average."""
+        with self._lock:
+            self.case_seconds += ESTIMATE_WEIGHT * (seconds - self.case_seconds)
+
+    def _load_state(self) -> dict:
+        """Load the state of the last run, or an empty state if there's none."""
+        try:
+            with open(self.state_path, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state: dict) -> None:
+        """Save the state atomically."""
+        with open(self.state_path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(state, file)
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+
+# The scheduler of the robot shared by the process and the workers.
+scheduler = CaseScheduler()
@@ -0,0 +1,218 @@
+"""This module keeps logged in eFlyt browser sessions alive across the retries of a run.
+Starting Chrome and logging in takes a long time, so a session is only relaunched or
+logged in again when a cheap health check shows it's needed.
+"""
+
+import subprocess
+import sys
+import threading
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+from OpenOrchestrator.database.constants import Credential
+from itk_dev_shared_components.eflyt import eflyt_login
+
+from robot_framework import browser_factory, command_profiler, config
+
+LOGIN_URL = "https://notuskommunal.scandihealth.net/"
+PROBE_URL = "https://notuskommunal.scandihealth.net/web/SearchResulteFlyt.aspx"
+
+PROBE_TIMEOUT = 10  # Seconds to wait for the login probe.
+
+# Requests a page that requires login from inside the browser.
+# An expired login redirects to or shows the login form.
+_LOGIN_PROBE_SCRIPT = """
+const done = arguments[arguments.length - 1];
+fetch(arguments[0], {credentials: "same-origin", signal: AbortSignal.timeout(arguments[1])})
+    .then(response => response.text().then(text => done(response.ok && !response.redirected && !text.includes("Login1_UserName"))))
+    .catch(() => done(false));
+"""
+
+
+class SessionManager:
+    """Keeps a browser session per named slot, e.g. one for the main process and one per worker.
+    The manager is safe to share between threads as long as each slot is only used by one thread at a time.
+    """
+
+    def __init__(self):
+        self._browsers: dict[str, webdriver.Chrome] = {}
+        self._lock = threading.Lock()
+
+    def get_browser(self, credentials: Credential, orchestrator_connection: OrchestratorConnection, slot: str = "main") -> webdriver.Chrome:
+        """Get a healthy logged in browser for the slot.
+        The existing browser is reused if it's alive and still logged in,
+        logged in again if it's alive but logged out, and relaunched otherwise.
+
+        Args:
+            credentials: The eFlyt credentials.
+            orchestrator_connection: The connection to Orchestrator.
+            slot: The name of the session.
+
+        Returns:
+            A logged in browser.
+        """
+        with self._lock:
+            browser = self._browsers.get(slot)
+
+        if browser and is_alive(browser):
+            if is_logged_in(browser):
+                orchestrator_connection.log_trace(f"Reusing browser session '{slot}'.")
+                return browser
+
+            orchestrator_connection.log_trace(f"Logging in again on browser session '{slot}'.")
+            try:
+                log_in(browser, credentials.username, credentials.password)
+                return browser
+            except (RuntimeError, WebDriverException):
+                orchestrator_connection.log_trace(f"Login failed on browser session '{slot}'.")
+
+        if browser:
+            _quit(browser)
+
+        orchestrator_connection.log_trace(f"Launching browser session '{slot}'.")
+        if config.USE_LEAN_BROWSER:
+            browser = browser_factory.create_browser(browser_factory.get_download_dir(slot))
+            try:
+                log_in(browser, credentials.username, credentials.password)
+            except Exception:
+                _quit(browser)
+                raise
+        else:
+            browser = eflyt_login.login(credentials.username, credentials.password)
+        command_profiler.attach(browser)
+        with self._lock:
+            self._browsers[slot] = browser
+        return browser
+
+    def peek(self, slot: str = "main") -> webdriver.Chrome | None:
+        """Get the browser of a slot without checking its health or logging in.
+
+        Args:
+            slot: The name of the session.
+
+        Returns:
+            The browser of the slot, if any.
+        """
+        with self._lock:
+            return self._browsers.get(slot)
+
+    def close_broken(self, orchestrator_connection: OrchestratorConnection) -> None:
+        """Close all sessions that no longer respond.
+
+        Args:
+            orchestrator_connection: The connection to Orchestrator.
+        """
+        with self._lock:
+            browsers = dict(self._browsers)
+
+        for slot, browser in browsers.items():
+            if not is_alive(browser):
+                orchestrator_connection.log_trace(f"Closing unresponsive browser session '{slot}'.")
+                _quit(browser)
+                with self._lock:
+                    self._browsers.pop(slot, None)
+
+    def close_all(self) -> None:
+        """Gracefully close all sessions."""
+        with self._lock:
+            browsers = list(self._browsers.values())
+            self._browsers.clear()
+
+        for browser in browsers:
+            _quit(browser)
+
+    def kill_all(self) -> None:
+        """Forcefully kill the driver and browser processes of all sessions."""
+        with self._lock:
+            browsers = list(self._browsers.values())
+            self._browsers.clear()
+
+        for browser in browsers:
+            process = browser.service.process
+            if not process or process.poll() is not None:
+                continue
+
+            if sys.platform == "win32":
+                # Kill the whole process tree so the Chrome processes go with the driver
+                subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], check=False, capture_output=True)
+            else:
+                process.kill()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._browsers)
+
+
+def is_alive(browser: webdriver.Chrome) -> bool:
+    """Check if the browser still responds.
+
+    Args:
+        browser: The webdriver browser object.
+
+    Returns:
+        True if the browser responded.
+    """
+    try:
+        return len(browser.window_handles) > 0
+    # A browser whose driver has died raises connection errors instead of WebDriverExceptions.
+    # pylint: disable-next = broad-exception-caught
+    except Exception:
+        return False
+
+
+def is_logged_in(browser: webdriver.Chrome) -> bool:
+    """Check if the browser is still logged in to eFlyt without leaving the current page.
+
+    Args:
+        browser: The webdriver browser object.
+
+    Returns:
+        True if the login is still valid.
+    """
+    try:
+        browser.set_script_timeout(PROBE_TIMEOUT + 5)
+        return browser.execute_async_script(_LOGIN_PROBE_SCRIPT, PROBE_URL, PROBE_TIMEOUT * 1000) is True
+    except WebDriverException:
+        return False
+
+
+def log_in(browser: webdriver.Chrome, username: str, password: str) -> None:
+    """Log in to eFlyt on an existing browser.
+    This does the same steps as eflyt_login.login without launching a new browser.
+
+    Args:
+        browser: The webdriver browser object.
+        username: Username for login.
+        password: Password for login.
+
+    Raises:
+        RuntimeError: If the login failed.
+    """
+    browser.get(LOGIN_URL)
+    browser.find_element(By.ID, "Login1_UserName").send_keys(username)
+    browser.find_element(By.ID, "Login1_Password").send_keys(password)
+    browser.find_element(By.ID, "Login1_LoginImageButton").click()
+
+    try:
+        browser.find_element(By.ID, "ctl00_imgLogo")
+    except NoSuchElementException as exc:
+        raise RuntimeError("Login failed") from exc
+
+
+def _quit(browser: webdriver.Chrome) -> None:
+    """Quit a browser, ignoring errors from a browser that is already gone.
+
+    Args:
+        browser: The webdriver browser object.
+    """
+    try:
+        browser.quit()
+    # pylint: disable-next = broad-exception-caught
+    except Exception:
+        pass
+
+
+# The sessions of the robot, shared by the process and the reset functions.
+sessions = SessionManager()
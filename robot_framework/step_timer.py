@@ -0,0 +1,143 @@
+"""This module times the steps of handling a case and summarizes them at the end of a run.
+Timing is turned on with TIME_STEPS in config. When it's off the step functions are
+called directly, so the only overhead is a single check per step.
+"""
+
+from dataclasses import dataclass
+import functools
+import math
+import threading
+import time
+from typing import Callable
+
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+import itk_dev_event_log
+
+from robot_framework import config
+
+
+@dataclass
+class StepSummary:
+    """The timing statistics of a single step in seconds."""
+    name: str
+    count: int
+    p50: float
+    p95: float
+    max: float
+    total: float
+
+
+class StepTimer:
+    """Collects the durations of named steps.
+    The timer is safe to share between threads.
+    """
+
+    def __init__(self):
+        self._durations: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        """Record the duration of a step.
+
+        Args:
+            name: The name of the step.
+            seconds: The duration of the step.
+        """
+        with self._lock:
+            self._durations.setdefault(name, []).append(seconds)
+
+    def timed(self, function: Callable) -> Callable:
+        """Wrap a function so each call is recorded as a step named after the function.
+
+        Args:
+            function: The function to time.
+
+        Returns:
+            The wrapped function.
+        """
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(function.__name__, time.perf_counter() - start)
+        return wrapper
+
+    def get_summary(self) -> list[StepSummary]:
+        """Get the statistics of all recorded steps in the order they were first recorded.
+
+        Returns:
+            A summary per step.
+        """
+        with self._lock:
+            durations = {name: sorted(values) for name, values in self._durations.items()}
+
+        return [
+            StepSummary(name, len(values), _percentile(values, 0.5), _percentile(values, 0.95), values[-1], sum(values))
+            for name, values in durations.items()
+        ]
+
+    def reset(self) -> None:
+        """Forget all recorded durations."""
+        with self._lock:
+            self._durations = {}
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    """Get a percentile of a sorted list using the nearest rank method.
+
+    Args:
+        sorted_values: The values sorted ascending.
+        fraction: The percentile as a fraction between 0 and 1.
+
+    Returns:
+        The value at the percentile.
+    """
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def timed(function: Callable) -> Callable:
+    """Time the calls of a function as a step if step timing is turned on.
+
+    Usage:
+        step_timer.timed(check_sagslog)(browser)
+
+    Args:
+        function: The function to time.
+
+    Returns:
+        The wrapped function, or the function itself if step timing is off.
+    """
+    if not config.TIME_STEPS:
+        return function
+    return timer.timed(function)
+
+
+def log_summary(orchestrator_connection: OrchestratorConnection) -> None:
+    """Log the timing statistics of all steps since the last summary and reset the timer.
+    The statistics are also sent to the event log if EMIT_STEP_TIMINGS is set in config.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+    """
+    summary = timer.get_summary()
+    timer.reset()
+
+    if not summary:
+        return
+
+    lines = ["Step timings in ms (count, p50, p95, max, total):"]
+    for step in summary:
+        lines.append(f"{step.name}: {step.count}, {step.p50 * 1000:.0f}, {step.p95 * 1000:.0f}, {step.max * 1000:.0f}, {step.total * 1000:.0f}")
+    orchestrator_connection.log_info("\n".join(lines))
+
+    if config.EMIT_STEP_TIMINGS:
+        for step in summary:
+            for statistic, seconds in (("p50", step.p50), ("p95", step.p95), ("max", step.max)):
+                itk_dev_event_log.emit(orchestrator_connection.process_name, f"Step {statistic} ms: {step.name}"[:100], round(seconds * 1000))
+
+
+# The timer of the robot shared by all sessions.
+timer = StepTimer()
@@ -0,0 +1,49 @@
+"""This module keeps track of the active tab on the eFlyt case page of each browser session.
+Every tab switch is a full postback, and even finding the active tab is a round trip to the browser,
+so switches to the tab that is already active are skipped without asking the browser.
+"""
+
+from weakref import WeakKeyDictionary
+
+from selenium import webdriver
+from itk_dev_shared_components.eflyt import eflyt_case
+
+from robot_framework import load_controller
+
+# The active tab of each browser session. A session without an entry has an unknown active tab.
+_active_tabs: WeakKeyDictionary[webdriver.Chrome, int] = WeakKeyDictionary()
+
+
+def change_tab(browser: webdriver.Chrome, tab_index: int) -> None:
+    """Change the tab on the case page unless it's already the active tab.
+
+    Args:
+        browser: The webdriver browser object.
+        tab_index: The zero-based index of the tab to select.
+    """
+    if _active_tabs.get(browser) == tab_index:
+        return
+
+    load_controller.controlled(eflyt_case.change_tab)(browser, tab_index)
+    _active_tabs[browser] = tab_index
+
+
+def add_note(browser: webdriver.Chrome, message: str) -> None:
+    """Add a note to the case. Notes are added on the first tab.
+
+    Args:
+        browser: The webdriver browser object.
+        message: The text of the note.
+    """
+    eflyt_case.add_note(browser, message)
+    _active_tabs[browser] = 0
+
+
+def forget_tab(browser: webdriver.Chrome) -> None:
+    """Mark the active tab as unknown. This must be called whenever a new page is opened
+    in the browser e.g. when a new case is opened.
+
+    Args:
+        browser: The webdriver browser object.
+    """
+    _active_tabs.pop(browser, None)
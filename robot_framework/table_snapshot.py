@@ -0,0 +1,148 @@
+"""This module reads whole ASP.NET GridView tables from the browser in a single round trip.
+A cell, span or input that's missing from the snapshot raises NoSuchElementException,
+the same as looking it up in the browser would.
+"""
+
+from dataclasses import dataclass
+
+from selenium import webdriver
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.remote.webelement import WebElement
+
+# Collects the text, direct child spans and first direct child input of every data cell.
+# Non-breaking spaces are replaced the same way WebElement.text does it.
+_SNAPSHOT_SCRIPT = """
+const table = document.getElementById(arguments[0]);
+if (!table) {
+    return null;
+}
+const clean = text => text.replace(/\\u00a0/g, " ").trim();
+return Array.from(table.rows, row => Array.from(row.cells)
+    .filter(cell => cell.tagName === "TD")
+    .map(cell => ({
+        text: clean(cell.innerText),
+        spans: Array.from(cell.querySelectorAll(":scope > span"), span => clean(span.innerText)),
+        input: cell.querySelector(":scope > input")
+    }))
+);
+"""
+
+# Collects the words of the header row and the text of every cell of the other rows.
+# The text of a cell with a link is the text of the link, and a cell cut off with '...' gets its full text from its title.
+_TEXT_SNAPSHOT_SCRIPT = """
+const table = document.getElementById(arguments[0]);
+if (!table) {
+    return null;
+}
+const clean = text => text.replace(/\\u00a0/g, " ").trim();
+const [header, ...rows] = Array.from(table.rows);
+const cellText = cell => {
+    const text = clean((cell.querySelector(":scope > a") || cell).innerText);
+    return text.endsWith("...") && cell.title ? cell.title : text;
+};
+return {
+    headlines: header ? clean(header.innerText).split(/\\s+/) : [],
+    rows: rows.map(row => Array.from(row.cells, cellText))
+};
+"""
+
+
+@dataclass
+class TableCell:
+    """A snapshot of a single cell in a table."""
+    text: str
+    spans: list[str]
+    input: WebElement | None
+    table_id: str
+
+    def get_span(self, index: int) -> str:
+        """Get the text of a direct child span of the cell.
+
+        Args:
+            index: The zero-based index of the span.
+
+        Returns:
+            The text of the span.
+
+        Raises:
+            NoSuchElementException: If the cell has no span with the index.
+        """
+        if index >= len(self.spans):
+            raise NoSuchElementException(f"Span {index} wasn't found in a cell of the table '{self.table_id}'.")
+        return self.spans[index]
+
+    def get_input(self) -> WebElement:
+        """Get the first direct child input of the cell.
+
+        Returns:
+            The input element.
+
+        Raises:
+            NoSuchElementException: If the cell has no input.
+        """
+        if self.input is None:
+            raise NoSuchElementException(f"No input was found in a cell of the table '{self.table_id}'.")
+        return self.input
+
+
+class TableRow(list):
+    """The cells of a row in a table. A missing cell raises NoSuchElementException instead of IndexError."""
+
+    def __init__(self, cells: list, table_id: str):
+        """
+        Args:
+            cells: The cells of the row.
+            table_id: The id of the table the row is in.
+        """
+        super().__init__(cells)
+        self.table_id = table_id
+
+    def __getitem__(self, index):
+        try:
+            return super().__getitem__(index)
+        except IndexError as exc:
+            raise NoSuchElementException(f"Cell {index} wasn't found in a row of the table '{self.table_id}'.") from exc
+
+
+def get_table_rows(browser: webdriver.Chrome, table_id: str) -> list[TableRow]:
+    """Read all rows of a table in a single call to the browser.
+    Header rows made of 'th' cells are kept as empty rows so row indices match the table.
+
+    Args:
+        browser: The webdriver browser object.
+        table_id: The id of the table element.
+
+    Returns:
+        A list of rows, each a list of the row's data cells.
+
+    Raises:
+        NoSuchElementException: If no table with the given id exists.
+    """
+    rows = browser.execute_script(_SNAPSHOT_SCRIPT, table_id)
+
+    if rows is None:
+        raise NoSuchElementException(f"No table with the id '{table_id}' was found.")
+
+    return [TableRow([TableCell(cell["text"], cell["spans"], cell["input"], table_id) for cell in row], table_id) for row in rows]
+
+
+def get_table_text(browser: webdriver.Chrome, table_id: str) -> tuple[list[str], list[TableRow]]:
+    """Read the text of all rows of a table in a single call to the browser.
+    The header row is split into words, the same way the shared components read it.
+
+    Args:
+        browser: The webdriver browser object.
+        table_id: The id of the table element.
+
+    Returns:
+        The words of the header row and a list of rows, each a list of the text of the row's cells.
+
+    Raises:
+        NoSuchElementException: If no table with the given id exists.
+    """
+    snapshot = browser.execute_script(_TEXT_SNAPSHOT_SCRIPT, table_id)
+
+    if snapshot is None:
+        raise NoSuchElementException(f"No table with the id '{table_id}' was found.")
+
+    return snapshot["headlines"], [TableRow(row, table_id) for row in snapshot["rows"]]
@@ -0,0 +1,30 @@
+"""This module tells errors caused by the state of eFlyt or the browser apart from errors caused by the case.
+The first kind may go away on a new attempt, while the second fails the same way every time.
+"""
+
+from selenium.common.exceptions import InvalidArgumentException, InvalidSelectorException, WebDriverException
+from urllib3.exceptions import HTTPError
+
+# Errors caused by the state of eFlyt or the browser rather than the case.
+# A dead driver raises urllib3 errors instead of WebDriverExceptions.
+TRANSIENT_ERRORS = (WebDriverException, TimeoutError, ConnectionError, HTTPError)
+
+# WebDriverExceptions caused by the robot's own code, which fail the same way on every attempt.
+PERMANENT_WEBDRIVER_ERRORS = (InvalidArgumentException, InvalidSelectorException)
+
+
+def is_transient(error: BaseException | None) -> bool:
+    """Check if an error may go away on a new attempt.
+    An error raised from a transient error, e.g. a ValueError raised from a timeout, is also transient.
+
+    Args:
+        error: The error to check.
+
+    Returns:
+        True if the error is transient.
+    """
+    while error:
+        if isinstance(error, TRANSIENT_ERRORS) and not isinstance(error, PERMANENT_WEBDRIVER_ERRORS):
+            return True
+        error = error.__cause__
+    return False
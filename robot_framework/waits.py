@@ -0,0 +1,112 @@
+"""This module waits for elements in eFlyt and records how long the waits take.
+
+A wait is given a number of named conditions and returns as soon as any of them is met,
+so a page that can show one of several elements doesn't have to wait for each in turn.
+The implicit wait of the browser is turned off while polling, so checking for an element
+that isn't there doesn't block.
+
+The duration of every wait is recorded under its name and the condition that was met,
+or 'timeout', and summarized at the end of the process so timeouts can be tuned.
+"""
+
+from contextlib import contextmanager
+import time
+from typing import Any, Callable
+
+from selenium import webdriver
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.support.ui import WebDriverWait
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+
+from robot_framework import config
+from robot_framework.step_timer import StepTimer
+
+# The implicit wait eflyt_login.login and browser_factory set on the browser. It's restored after each wait.
+IMPLICIT_WAIT = 2
+
+POLL_INTERVAL = 0.1  # Seconds between each check of the conditions.
+
+
+def wait_for_any(browser: webdriver.Chrome, conditions: dict[str, Callable[[webdriver.Chrome], Any]], name: str, timeout: float | None = None) -> tuple[str, Any]:
+    """Wait until any of the conditions is met.
+    The conditions are checked in order on each poll.
+
+    Args:
+        browser: The webdriver browser object.
+        conditions: The conditions by name. A condition is met when it returns a truthy value.
+        name: The name the wait is recorded under.
+        timeout (Optional): Seconds to wait before giving up. Defaults to WAIT_TIMEOUT in config.
+
+    Returns:
+        The name of the condition that was met and the value it returned.
+
+    Raises:
+        TimeoutException: If no condition was met in time.
+    """
+    def any_condition(driver: webdriver.Chrome) -> tuple[str, Any] | bool:
+        for condition_name, condition in conditions.items():
+            value = condition(driver)
+            if value:
+                return condition_name, value
+        return False
+
+    start = time.perf_counter()
+    try:
+        with _no_implicit_wait(browser):
+            result = WebDriverWait(browser, timeout or config.WAIT_TIMEOUT, POLL_INTERVAL,
+                                   ignored_exceptions=(StaleElementReferenceException,)).until(any_condition)
+    except TimeoutException:
+        timer.record(f"{name} (timeout)", time.perf_counter() - start)
+        raise
+
+    timer.record(f"{name} ({result[0]})", time.perf_counter() - start)
+    return result
+
+
+def element_present(element_id: str) -> Callable[[webdriver.Chrome], WebElement | bool]:
+    """Create a condition that is met when an element with the given id is present.
+
+    Args:
+        element_id: The id of the element.
+
+    Returns:
+        A condition that returns the element when it's present.
+    """
+    def condition(browser: webdriver.Chrome) -> WebElement | bool:
+        elements = browser.find_elements(By.ID, element_id)
+        return elements[0] if elements else False
+    return condition
+
+
+@contextmanager
+def _no_implicit_wait(browser: webdriver.Chrome):
+    """Turn off the implicit wait of the browser while in the context."""
+    browser.implicitly_wait(0)
+    try:
+        yield
+    finally:
+        browser.implicitly_wait(IMPLICIT_WAIT)
+
+
+def log_summary(orchestrator_connection: OrchestratorConnection) -> None:
+    """Log the duration statistics of all waits since the last summary and reset them.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+    """
+    summary = timer.get_summary()
+    timer.reset()
+
+    if not summary:
+        return
+
+    lines = [f"Wait durations in ms (count, p50, p95, max) with a default timeout of {config.WAIT_TIMEOUT * 1000:.0f} ms:"]
+    for wait in summary:
+        lines.append(f"{wait.name}: {wait.count}, {wait.p50 * 1000:.0f}, {wait.p95 * 1000:.0f}, {wait.max * 1000:.0f}")
+    orchestrator_connection.log_info("\n".join(lines))
+
+
+# The wait durations of the robot shared by all sessions.
+timer = StepTimer()
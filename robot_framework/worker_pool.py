@@ -0,0 +1,136 @@
+"""This module handles cases in parallel across a pool of logged in eFlyt sessions."""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import os
+
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+from OpenOrchestrator.database.constants import Credential
+from itk_dev_shared_components.eflyt.eflyt_case import Case
+
+from robot_framework import case_retry, config, eflyt
+from robot_framework.checkpoint_journal import Journal
+from robot_framework.queue_index import QueueIndex
+from robot_framework.scheduler import scheduler
+from robot_framework.session_manager import sessions
+
+
+@dataclass
+class WorkerResult:
+    """The bookkeeping of a single worker in the pool."""
+    worker_index: int
+    download_dir: str
+    assigned_cases: list[str] = field(default_factory=list)
+    handled_cases: list[str] = field(default_factory=list)
+    error: Exception | None = None
+
+
+def get_download_dir(worker_index: int) -> str:
+    """Get the download folder of a worker.
+    Each worker has its own folder so downloaded letters never get mixed up between sessions.
+
+    Args:
+        worker_index: The zero-based index of the worker.
+
+    Returns:
+        The absolute path to the worker's download folder.
+    """
+    return os.path.join(eflyt.DOWNLOAD_DIR, f"eflyt_worker_{worker_index}")
+
+
+def split_cases(cases: list[Case], worker_count: int) -> list[list[Case]]:
+    """Split the cases into a list per worker.
+    The cases are dealt out in turn so the workers get an even share.
+
+    Args:
+        cases: The cases to split.
+        worker_count: The number of workers to split the cases between.
+
+    Returns:
+        A list of cases for each worker.
+    """
+    return [cases[i::worker_count] for i in range(worker_count)]
+
+
+def run_workers(cases: list[Case], credentials: Credential, worker_count: int, orchestrator_connection: OrchestratorConnection, queue_index: QueueIndex, journal: Journal) -> None:
+    """Handle the cases in parallel across a number of logged in eFlyt sessions.
+    When all workers are done a combined summary is logged.
+
+    Args:
+        cases: The filtered cases to handle.
+        credentials: The eFlyt credentials used to log in each session.
+        worker_count: The number of sessions to run at the same time.
+        orchestrator_connection: The connection to Orchestrator.
+        queue_index: The in-memory index of the queue shared by all workers.
+        journal: The journal of the robot's progress shared by all workers.
+
+    Raises:
+        Exception: The first error raised by any worker, after all workers have stopped.
+    """
+    worker_count = max(1, min(worker_count, len(cases)))
+    orchestrator_connection.log_info(f"Handling {len(cases)} cases across {worker_count} sessions.")
+
+    case_lists = split_cases(cases, worker_count)
+    results = [WorkerResult(i, get_download_dir(i), [case.case_number for case in case_list])
+               for i, case_list in enumerate(case_lists)]
+
+    with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="eflyt_worker") as executor:
+        for result, case_list in zip(results, case_lists):
+            executor.submit(_run_worker, result, case_list, credentials, orchestrator_connection, queue_index, journal)
+
+    _log_summary(results, orchestrator_connection)
+
+    for result in results:
+        if result.error:
+            raise result.error
+
+
+def _run_worker(result: WorkerResult, cases: list[Case], credentials: Credential, orchestrator_connection: OrchestratorConnection, queue_index: QueueIndex, journal: Journal) -> None:
+    """Get the worker's logged in session and handle the given cases on it.
+    The session is kept open so a retry can reuse it.
+    Errors in a single case are retried or the case is failed by case_retry. Any other error,
+    e.g. when the session can't be recovered, stops the worker and is stored on the result instead of being raised.
+
+    Args:
+        result: The bookkeeping object of the worker.
+        cases: The cases assigned to the worker.
+        credentials: The eFlyt credentials.
+        orchestrator_connection: The connection to Orchestrator.
+        queue_index: The in-memory index of the queue.
+        journal: The journal of the robot's progress.
+    """
+    try:
+        os.makedirs(result.download_dir, exist_ok=True)
+        slot = f"worker_{result.worker_index}"
+        browser = sessions.get_browser(credentials, orchestrator_connection, slot=slot)
+        browser.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": result.download_dir})
+
+        for case in scheduler.schedule(cases, queue_index):
+            browser = case_retry.handle_case(browser, case, credentials, orchestrator_connection, queue_index, journal, result.download_dir, slot)
+            if not config.FETCH_LETTERS_IN_MEMORY:
+                eflyt.clear_downloads(orchestrator_connection, result.download_dir)
+            result.handled_cases.append(case.case_number)
+
+    # The error is raised again by run_workers when all workers have stopped.
+    # pylint: disable-next = broad-exception-caught
+    except Exception as error:
+        result.error = error
+
+
+def _log_summary(results: list[WorkerResult], orchestrator_connection: OrchestratorConnection) -> None:
+    """Log a line per worker and a combined summary of the run.
+
+    Args:
+        results: The bookkeeping objects of all workers.
+        orchestrator_connection: The connection to Orchestrator.
+    """
+    for result in results:
+        line = f"Worker {result.worker_index}: {len(result.handled_cases)} of {len(result.assigned_cases)} cases handled."
+        if result.error:
+            line += f" Stopped by error: {repr(result.error)}"
+        orchestrator_connection.log_info(line)
+
+    handled = sum(len(result.handled_cases) for result in results)
+    assigned = sum(len(result.assigned_cases) for result in results)
+    failed = sum(1 for result in results if result.error)
+    orchestrator_connection.log_info(f"Workers done: {handled} of {assigned} cases handled across {len(results)} sessions. {failed} sessions stopped by errors.")